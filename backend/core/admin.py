@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import AudioBlob, Job
+
+
+@admin.register(AudioBlob)
+class AudioBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'name', 'size', 'ref_count', 'created_at']
+    search_fields = ['sha256', 'name']
+    readonly_fields = ['sha256', 'name', 'size', 'ref_count', 'created_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'run_after', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at']
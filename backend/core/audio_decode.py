@@ -0,0 +1,114 @@
+"""
+Decoding of stored audio to mono float32 PCM for analysis
+"""
+import os
+import shutil
+import struct
+import subprocess
+from typing import Optional, Tuple
+import numpy as np
+from .audio_probe import probe_path
+
+
+class DecodeError(Exception):
+    """Raised when audio cannot be decoded here"""
+
+
+def load_pcm(path: str, sample_rate: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """
+    Mono float32 samples in [-1, 1] and their sample rate.
+    PCM WAV is read directly (and resampled with NumPy if `sample_rate`
+    differs); everything else is decoded and resampled by ffmpeg.
+    """
+    wav = _read_wav(path)
+    if wav is None:
+        return _decode_with_ffmpeg(path, sample_rate)
+    samples, rate = wav
+    if sample_rate is not None and rate != sample_rate:
+        return resample(samples, rate, sample_rate), sample_rate
+    return samples, rate
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """Band-limited resampling in the frequency domain"""
+    target_length = int(round(samples.size * target_rate / rate))
+    if samples.size == 0 or target_length == 0:
+        return np.zeros(target_length, dtype=np.float32)
+    spectrum = np.fft.rfft(samples)
+    resized = np.zeros(target_length // 2 + 1, dtype=spectrum.dtype)
+    keep = min(resized.size, spectrum.size)
+    resized[:keep] = spectrum[:keep]
+    return (np.fft.irfft(resized, n=target_length) * (target_length / samples.size)).astype(np.float32)
+
+
+def _read_wav(path) -> Optional[Tuple[np.ndarray, int]]:
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        if riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            return None
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                body = f.read(chunk_size + (chunk_size & 1))
+                fmt = struct.unpack('<HHIIHH', body[:16])
+                if fmt[0] == 0xFFFE and len(body) >= 26:
+                    # WAVE_FORMAT_EXTENSIBLE keeps the real format in the sub-format GUID
+                    fmt = (struct.unpack('<H', body[24:26])[0],) + fmt[1:]
+            elif chunk_id == b'data':
+                data_offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+    if fmt is None:
+        return None
+
+    audio_format, channels, sample_rate, _, block_align, bits = fmt
+    if audio_format == 1 and bits in (8, 16, 32):
+        dtype = {8: np.uint8, 16: np.int16, 32: np.int32}[bits]
+    elif audio_format == 3 and bits in (32, 64):
+        dtype = {32: np.float32, 64: np.float64}[bits]
+    elif audio_format == 1 and bits == 24:
+        dtype = None
+    else:
+        return None
+
+    frame_count = max(0, min(chunk_size, os.path.getsize(path) - data_offset)) // block_align
+    if dtype is None:
+        raw = np.fromfile(path, dtype=np.uint8, count=frame_count * block_align, offset=data_offset)
+        raw = raw.reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                   | (raw[:, 2].astype(np.int8).astype(np.int32) << 16))
+        samples = samples.astype(np.float32) / 8388608.0
+    else:
+        samples = np.fromfile(path, dtype=dtype, count=frame_count * channels, offset=data_offset)
+        if dtype is np.uint8:
+            samples = (samples.astype(np.float32) - 128.0) / 128.0
+        elif np.issubdtype(dtype, np.integer):
+            samples = samples.astype(np.float32) / float(np.iinfo(dtype).max + 1)
+        else:
+            samples = samples.astype(np.float32)
+
+    if channels > 1:
+        samples = samples[:samples.size // channels * channels].reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def _decode_with_ffmpeg(path, sample_rate) -> Tuple[np.ndarray, int]:
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise DecodeError('ffmpeg not found')
+
+    if sample_rate is None:
+        probed = probe_path(path)
+        sample_rate = (probed or {}).get('sample_rate') or 16000
+
+    command = [ffmpeg, '-v', 'error', '-nostdin', '-i', path, '-vn',
+               '-ac', '1', '-ar', str(sample_rate), '-f', 'f32le', 'pipe:1']
+    process = subprocess.run(command, capture_output=True)
+    if process.returncode != 0:
+        raise DecodeError(process.stderr.decode(errors='replace').strip())
+    return np.frombuffer(process.stdout, dtype=np.float32), sample_rate
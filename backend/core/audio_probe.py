@@ -0,0 +1,561 @@
+"""
+Fast audio header prober
+
+Reads only container headers (and, where the duration is not stored in the
+header, a short scan near the end of the file) to report duration, sample
+rate, channels and bitrate without decoding any audio.
+Supported: WAV, WebM/Matroska, Ogg (Vorbis/Opus/FLAC), MP3, MP4/M4A, FLAC.
+"""
+import os
+import struct
+from typing import Any, Dict, Optional
+
+TAIL_SCAN_SIZE = 256 * 1024
+
+
+def probe(file_obj) -> Optional[Dict[str, Any]]:
+    """
+    Probe an open binary file. Returns a dict with duration, sample_rate,
+    bit_rate, channels and format, or None if the format is not recognised
+    or the header is damaged.
+    """
+    try:
+        file_obj.seek(0, os.SEEK_END)
+        size = file_obj.tell()
+        file_obj.seek(0)
+        head = file_obj.read(12)
+        if len(head) < 12:
+            return None
+
+        if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+            result = _probe_wav(file_obj, size)
+        elif head[:4] == b'\x1a\x45\xdf\xa3':
+            result = _probe_matroska(file_obj, size)
+        elif head[:4] == b'OggS':
+            result = _probe_ogg(file_obj, size)
+        elif head[:4] == b'fLaC':
+            result = _probe_flac(file_obj, size)
+        elif head[4:8] == b'ftyp':
+            result = _probe_mp4(file_obj, size)
+        elif head[:3] == b'ID3' or (head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+            result = _probe_mp3(file_obj, size)
+        else:
+            return None
+    except (struct.error, ValueError, IndexError, OSError):
+        return None
+    finally:
+        file_obj.seek(0)
+
+    if result is not None and result.get('duration') and not result.get('bit_rate'):
+        result['bit_rate'] = int(size * 8 / result['duration'])
+    return result
+
+
+def probe_path(path: str) -> Optional[Dict[str, Any]]:
+    """Probe a file on disk"""
+    with open(path, 'rb') as f:
+        return probe(f)
+
+
+def _result(fmt, duration=None, sample_rate=None, channels=None, bit_rate=None):
+    return {
+        'format': fmt,
+        'duration': duration,
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'bit_rate': bit_rate,
+    }
+
+
+# WAV ----------------------------------------------------------------------
+
+def _probe_wav(f, size):
+    f.seek(12)
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack('<HHIIHH', f.read(16))
+            f.seek(chunk_size - 16 + (chunk_size & 1), os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            _, channels, sample_rate, byte_rate, _, _ = fmt
+            data_start = f.tell()
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF
+            if chunk_size in (0, 0xFFFFFFFF) or data_start + chunk_size > size:
+                chunk_size = size - data_start
+            duration = chunk_size / byte_rate if byte_rate else None
+            return _result('wav', duration, sample_rate, channels, byte_rate * 8)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+# FLAC ---------------------------------------------------------------------
+
+def _parse_streaminfo(data):
+    # 16+16 bit block sizes, 24+24 bit frame sizes, then 20 bits sample rate,
+    # 3 bits channels-1, 5 bits bits-per-sample-1, 36 bits total samples
+    packed = int.from_bytes(data[10:18], 'big')
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    duration = total_samples / sample_rate if sample_rate and total_samples else None
+    return sample_rate, channels, duration
+
+
+def _probe_flac(f, size):
+    f.seek(4)
+    header = f.read(4)
+    if header[0] & 0x7F != 0:  # STREAMINFO must come first
+        return None
+    sample_rate, channels, duration = _parse_streaminfo(f.read(34))
+    return _result('flac', duration, sample_rate, channels)
+
+
+# Ogg ----------------------------------------------------------------------
+
+def _probe_ogg(f, size):
+    f.seek(0)
+    page = f.read(27)
+    segment_count = page[26]
+    lacing = f.read(segment_count)
+    packet = f.read(sum(lacing))
+
+    if packet[:7] == b'\x01vorbis':
+        channels = packet[11]
+        sample_rate, _, nominal = struct.unpack('<Iii', packet[12:24])
+        granule_rate, pre_skip, fmt = sample_rate, 0, 'ogg'
+        bit_rate = nominal if nominal > 0 else None
+    elif packet[:8] == b'OpusHead':
+        channels = packet[9]
+        pre_skip, sample_rate = struct.unpack('<HI', packet[10:16])
+        # Opus granule positions always count 48 kHz samples
+        granule_rate, fmt, bit_rate = 48000, 'opus', None
+    elif packet[:5] == b'\x7fFLAC':
+        sample_rate, channels, _ = _parse_streaminfo(packet[13:47])
+        granule_rate, pre_skip, fmt, bit_rate = sample_rate, 0, 'ogg', None
+    else:
+        return None
+
+    granule = _last_ogg_granule(f, size)
+    duration = None
+    if granule is not None and granule_rate:
+        duration = max(granule - pre_skip, 0) / granule_rate or None
+    return _result(fmt, duration, sample_rate, channels, bit_rate)
+
+
+def _last_ogg_granule(f, size):
+    """Granule position of the last page, found by scanning back from the end"""
+    window = min(size, 64 * 1024)
+    while True:
+        f.seek(size - window)
+        tail = f.read(window)
+        position = tail.rfind(b'OggS')
+        while position >= 0:
+            if position + 14 <= len(tail) and tail[position + 4] == 0:
+                granule = struct.unpack('<q', tail[position + 6:position + 14])[0]
+                if granule >= 0:
+                    return granule
+            position = tail.rfind(b'OggS', 0, position)
+        if window >= size or window >= TAIL_SCAN_SIZE * 4:
+            return None
+        window = min(size, window * 4)
+
+
+# MP3 ----------------------------------------------------------------------
+
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_BITRATES[(2, 3)] = _MP3_BITRATES[(2, 2)]
+_MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+
+def _probe_mp3(f, size):
+    f.seek(0)
+    audio_start = 0
+    header = f.read(10)
+    if header[:3] == b'ID3':
+        tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        audio_start = 10 + tag_size + (10 if header[5] & 0x10 else 0)
+
+    # Find the first frame sync after the tag
+    f.seek(audio_start)
+    buf = f.read(8192)
+    for offset in range(len(buf) - 4):
+        if buf[offset] == 0xFF and buf[offset + 1] & 0xE0 == 0xE0:
+            frame = _parse_mp3_frame(buf[offset:offset + 4])
+            if frame is not None:
+                break
+    else:
+        return None
+    audio_start += offset
+    version, layer, bit_rate, sample_rate, channels, samples_per_frame = frame
+
+    # Xing/Info (VBR) header sits after the side information
+    if version == 1:
+        side_info = 17 if channels == 1 else 32
+    else:
+        side_info = 9 if channels == 1 else 17
+    frame_data = buf[offset:offset + 4 + side_info + 12]
+    tag = frame_data[4 + side_info:8 + side_info]
+    frame_count = None
+    if tag in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', frame_data[8 + side_info:12 + side_info])[0]
+        if flags & 0x1:
+            frame_count = struct.unpack('>I', frame_data[12 + side_info:16 + side_info])[0]
+    elif buf[offset + 36:offset + 40] == b'VBRI':
+        frame_count = struct.unpack('>I', buf[offset + 50:offset + 54])[0]
+
+    if frame_count:
+        duration = frame_count * samples_per_frame / sample_rate
+        return _result('mp3', duration, sample_rate, channels)
+
+    # Constant bitrate: audio bytes / byte rate
+    audio_end = size
+    f.seek(max(size - 128, 0))
+    if f.read(3) == b'TAG':
+        audio_end -= 128
+    duration = (audio_end - audio_start) * 8 / bit_rate if bit_rate else None
+    return _result('mp3', duration, sample_rate, channels, bit_rate)
+
+
+def _parse_mp3_frame(header):
+    b1, b2, b3 = header[1], header[2], header[3]
+    version_bits = (b1 >> 3) & 0x3
+    layer_bits = (b1 >> 1) & 0x3
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    version = {3: 1, 2: 2, 0: 2.5}[version_bits]
+    layer = 4 - layer_bits
+    bit_rate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    channels = 1 if (b3 >> 6) == 3 else 2
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 2 or version == 1:
+        samples_per_frame = 1152
+    else:
+        samples_per_frame = 576
+    return version, layer, bit_rate, sample_rate, channels, samples_per_frame
+
+
+# MP4 / M4A ----------------------------------------------------------------
+
+def _iter_boxes(f, start, end):
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        box_size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack('>Q', f.read(8))[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - position
+        if box_size < header_size:
+            return
+        yield box_type, position + header_size, position + box_size
+        position += box_size
+
+
+def _find_box(f, start, end, path):
+    for box_type, payload_start, box_end in _iter_boxes(f, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload_start, box_end
+            found = _find_box(f, payload_start, box_end, path[1:])
+            if found:
+                return found
+    return None
+
+
+def _probe_mp4(f, size):
+    moov = _find_box(f, 0, size, [b'moov'])
+    if moov is None:
+        return None
+
+    duration = None
+    mvhd = _find_box(f, moov[0], moov[1], [b'mvhd'])
+    if mvhd:
+        duration = _read_header_duration(f, mvhd)
+
+    sample_rate = channels = None
+    for box_type, trak_start, trak_end in _iter_boxes(f, moov[0], moov[1]):
+        if box_type != b'trak':
+            continue
+        stsd = _find_box(f, trak_start, trak_end, [b'mdia', b'minf', b'stbl', b'stsd'])
+        if stsd is None:
+            continue
+        # Skip version/flags and entry count, then read the first sample entry
+        f.seek(stsd[0] + 8)
+        entry = f.read(36)
+        if entry[4:8] in (b'mp4a', b'alac', b'Opus', b'fLaC', b'ac-3', b'ec-3'):
+            channels = struct.unpack('>H', entry[24:26])[0]
+            sample_rate = struct.unpack('>I', entry[32:36])[0] >> 16
+            # Some muxers leave the movie duration empty but fill in the track's
+            mdhd = _find_box(f, trak_start, trak_end, [b'mdia', b'mdhd'])
+            if duration is None and mdhd:
+                duration = _read_header_duration(f, mdhd)
+            break
+
+    return _result('m4a', duration, sample_rate, channels)
+
+
+def _read_header_duration(f, box):
+    """Duration in seconds of an mvhd or mdhd box; None when it is left unset, as in fragmented files"""
+    f.seek(box[0])
+    version = f.read(4)[0]
+    if version == 1:
+        f.seek(16, os.SEEK_CUR)
+        timescale, length = struct.unpack('>IQ', f.read(12))
+        unset = 0xFFFFFFFFFFFFFFFF
+    else:
+        f.seek(8, os.SEEK_CUR)
+        timescale, length = struct.unpack('>II', f.read(8))
+        unset = 0xFFFFFFFF
+    if not timescale or length in (0, unset):
+        return None
+    return length / timescale
+
+
+# WebM / Matroska ----------------------------------------------------------
+
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TRACKS = 0x1654AE6B
+_CUES = 0x1C53BB6B
+_CLUSTER = 0x1F43B675
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACK_ENTRY = 0xAE
+_AUDIO = 0xE1
+_SAMPLING_FREQUENCY = 0xB5
+_CHANNELS = 0x9F
+_CUE_POINT = 0xBB
+_CUE_TIME = 0xB3
+_CUE_TRACK_POSITIONS = 0xB7
+_CUE_CLUSTER_POSITION = 0xF1
+_CLUSTER_TIMECODE = 0xE7
+_SIMPLE_BLOCK = 0xA3
+_BLOCK_GROUP = 0xA0
+_BLOCK = 0xA1
+_UNKNOWN_SIZE = object()
+
+# Elements that may contain others; everything else is skipped by size
+_MASTER_IDS = {_SEGMENT, _INFO, _TRACKS, _TRACK_ENTRY, _AUDIO, _CUES, _CUE_POINT,
+               _CUE_TRACK_POSITIONS, _CLUSTER, _BLOCK_GROUP}
+
+
+def _read_vint(f, keep_marker=False):
+    first = f.read(1)
+    if not first:
+        raise ValueError('Unexpected end of file')
+    byte = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not byte & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError('Invalid EBML variable length integer')
+    rest = f.read(length - 1)
+    value = byte if keep_marker else byte & (mask - 1)
+    all_ones = (byte & (mask - 1)) == mask - 1
+    for b in rest:
+        value = (value << 8) | b
+        all_ones = all_ones and b == 0xFF
+    return value, length, all_ones
+
+
+def _read_element_header(f):
+    element_id, _, _ = _read_vint(f, keep_marker=True)
+    size, _, unknown = _read_vint(f)
+    return element_id, (_UNKNOWN_SIZE if unknown else size)
+
+
+def _read_uint(f, size):
+    return int.from_bytes(f.read(size), 'big')
+
+
+def _read_float(f, size):
+    data = f.read(size)
+    return struct.unpack('>f' if size == 4 else '>d', data)[0]
+
+
+def _probe_matroska(f, size):
+    f.seek(0)
+    element_id, header_size = _read_element_header(f)
+    f.seek(header_size, os.SEEK_CUR)  # EBML header
+
+    element_id, segment_size = _read_element_header(f)
+    if element_id != _SEGMENT:
+        return None
+    segment_start = f.tell()
+    segment_end = size if segment_size is _UNKNOWN_SIZE else min(size, segment_start + segment_size)
+
+    state = {'scale': 1000000, 'duration': None, 'sample_rate': None, 'channels': None,
+             'cues': None, 'first_cluster': None}
+    _walk_segment(f, segment_start, segment_end, state)
+
+    duration = None
+    if state['duration']:
+        duration = state['duration'] * state['scale'] / 1e9
+    else:
+        # MediaRecorder output has no Duration: find the last block timestamp
+        last = _last_block_timecode(f, size, segment_start, segment_end, state)
+        if last is not None:
+            duration = last * state['scale'] / 1e9
+    return _result('webm', duration, state['sample_rate'], state['channels'])
+
+
+def _walk_segment(f, start, end, state):
+    """Read the top-level Segment children up to the first Cluster"""
+    f.seek(start)
+    while f.tell() < end:
+        position = f.tell()
+        element_id, element_size = _read_element_header(f)
+        payload = f.tell()
+        if element_id == _CLUSTER:
+            state['first_cluster'] = position
+            return
+        if element_size is _UNKNOWN_SIZE:
+            return
+        if element_id == _INFO:
+            _read_info(f, payload, payload + element_size, state)
+        elif element_id == _TRACKS:
+            _read_tracks(f, payload, payload + element_size, state)
+        elif element_id == _CUES:
+            state['cues'] = (payload, payload + element_size)
+        f.seek(payload + element_size)
+
+
+def _children(f, start, end):
+    f.seek(start)
+    while f.tell() < end:
+        element_id, element_size = _read_element_header(f)
+        payload = f.tell()
+        if element_size is _UNKNOWN_SIZE:
+            element_size = end - payload
+        yield element_id, payload, element_size
+        f.seek(payload + element_size)
+
+
+def _read_info(f, start, end, state):
+    for element_id, payload, element_size in _children(f, start, end):
+        if element_id == _TIMECODE_SCALE:
+            state['scale'] = _read_uint(f, element_size)
+        elif element_id == _DURATION:
+            state['duration'] = _read_float(f, element_size)
+
+
+def _read_tracks(f, start, end, state):
+    for element_id, payload, element_size in _children(f, start, end):
+        if element_id != _TRACK_ENTRY:
+            continue
+        for child_id, child_payload, child_size in _children(f, payload, payload + element_size):
+            if child_id != _AUDIO:
+                continue
+            for audio_id, _, audio_size in _children(f, child_payload, child_payload + child_size):
+                if audio_id == _SAMPLING_FREQUENCY:
+                    state['sample_rate'] = int(_read_float(f, audio_size))
+                elif audio_id == _CHANNELS:
+                    state['channels'] = _read_uint(f, audio_size)
+            if state['sample_rate']:
+                return
+
+
+def _last_cue_cluster(f, segment_start, cues):
+    """Position of the cluster referenced by the last cue point"""
+    last = None
+    for element_id, payload, element_size in _children(f, cues[0], cues[1]):
+        if element_id != _CUE_POINT:
+            continue
+        for child_id, child_payload, child_size in _children(f, payload, payload + element_size):
+            if child_id != _CUE_TRACK_POSITIONS:
+                continue
+            for pos_id, _, pos_size in _children(f, child_payload, child_payload + child_size):
+                if pos_id == _CUE_CLUSTER_POSITION:
+                    last = segment_start + _read_uint(f, pos_size)
+    return last
+
+
+def _tail_cluster(f, size, segment_start):
+    """Position of the last Cluster whose header can be found near the end"""
+    window = min(size - segment_start, TAIL_SCAN_SIZE)
+    f.seek(size - window)
+    tail = f.read(window)
+    marker = _CLUSTER.to_bytes(4, 'big')
+    position = tail.rfind(marker)
+    while position >= 0:
+        candidate = size - window + position
+        try:
+            f.seek(candidate)
+            element_id, element_size = _read_element_header(f)
+            child_id, _ = _read_element_header(f)
+            if child_id == _CLUSTER_TIMECODE:
+                return candidate
+        except ValueError:
+            pass
+        position = tail.rfind(marker, 0, position)
+    return None
+
+
+def _last_block_timecode(f, size, segment_start, segment_end, state):
+    """
+    Timestamp (in TimecodeScale units) at which the last block ends.
+    Starts from the last cued cluster, else the last cluster found in the
+    tail of the file, else walks cluster headers from the first cluster,
+    skipping block payloads.
+    """
+    start = None
+    if state['cues']:
+        start = _last_cue_cluster(f, segment_start, state['cues'])
+    if start is None:
+        start = _tail_cluster(f, size, segment_start)
+    if start is None:
+        start = state['first_cluster']
+    if start is None:
+        return None
+
+    last_end = None
+    previous_block = None
+    cluster_timecode = 0
+    f.seek(start)
+    while f.tell() < segment_end:
+        try:
+            element_id, element_size = _read_element_header(f)
+        except ValueError:
+            break
+        payload = f.tell()
+        if element_id in (_CLUSTER, _BLOCK_GROUP):
+            continue  # descend into its children
+        if element_size is _UNKNOWN_SIZE:
+            break
+        if element_id == _CLUSTER_TIMECODE:
+            cluster_timecode = _read_uint(f, element_size)
+        elif element_id in (_SIMPLE_BLOCK, _BLOCK):
+            _read_vint(f)  # track number
+            relative = struct.unpack('>h', f.read(2))[0]
+            timecode = cluster_timecode + relative
+            if previous_block is not None and timecode > previous_block:
+                frame = timecode - previous_block
+            else:
+                frame = 0
+            previous_block = timecode
+            last_end = timecode + frame  # assume the last frame is as long as the one before
+        f.seek(payload + element_size)
+    return last_end
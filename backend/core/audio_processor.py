@@ -1,51 +1,36 @@
 """
 Audio processing utilities for CoughTest platform
 """
-import os
-import tempfile
 import logging
+from django.conf import settings
 from mutagen import File as MutagenFile
+from .audio_probe import probe_path
+from .ingest import probe_upload
+from .truncation import truncate_upload
 
 logger = logging.getLogger(__name__)
 
 class AudioProcessor:
     """Handle audio file processing and validation"""
     
-    MAX_DURATION = 10.0  # 10 seconds
+    MAX_DURATION = settings.MAX_RECORDING_DURATION  # 10 seconds by default
     
     @staticmethod
     def process_audio_file(audio_file):
         """
-        Process uploaded audio file - get metadata and validate duration
+        Process uploaded audio file - get metadata and cut it to MAX_DURATION
         Returns: (processed_file, was_truncated, original_duration)
         """
         try:
-            # Create temporary file to analyze
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as temp_file:
-                for chunk in audio_file.chunks():
-                    temp_file.write(chunk)
-                temp_path = temp_file.name
+            # Probe the container header in place; the result is kept on the
+            # upload so ingest does not parse the file a second time
+            original_duration = probe_upload(audio_file)['duration']
             
-            # Get audio metadata
-            audio_info = MutagenFile(temp_path)
-            original_duration = None
+            truncated = truncate_upload(audio_file, original_duration, AudioProcessor.MAX_DURATION)
+            if truncated is not None:
+                return truncated, True, original_duration
             
-            if audio_info and hasattr(audio_info, 'info'):
-                original_duration = audio_info.info.length
-            
-            # Clean up temp file
-            os.unlink(temp_path)
-            
-            # Reset file pointer
-            audio_file.seek(0)
-            
-            # Check if truncation would be needed
-            was_truncated = False
-            if original_duration and original_duration > AudioProcessor.MAX_DURATION:
-                was_truncated = True
-                logger.info(f"Audio would be truncated from {original_duration:.2f}s to {AudioProcessor.MAX_DURATION}s")
-            
-            return audio_file, was_truncated, original_duration
+            return audio_file, False, original_duration
             
         except Exception as e:
             logger.error(f"Error processing audio file: {e}")
@@ -57,8 +42,11 @@ class AudioProcessor:
     def get_audio_duration(file_path):
         """Get duration of audio file in seconds"""
         try:
+            fast = probe_path(file_path)
+            if fast is not None and fast['duration']:
+                return fast['duration']
             audio_info = MutagenFile(file_path)
-            if audio_info and hasattr(audio_info, 'info'):
+            if audio_info is not None and hasattr(audio_info, 'info'):
                 return audio_info.info.length
             return None
         except Exception as e:
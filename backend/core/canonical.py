@@ -0,0 +1,66 @@
+"""
+Canonical 16 kHz mono FLAC derivatives of stored recordings.
+Derivatives are keyed by the SHA-256 of the source audio, so recordings
+sharing an AudioBlob share one derivative.
+"""
+import logging
+import os
+import shutil
+import subprocess
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+CANONICAL_SAMPLE_RATE = 16000
+CANONICAL_CHANNELS = 1
+
+
+class TranscodeError(Exception):
+    """Raised when ffmpeg is missing or cannot convert a file"""
+
+
+def canonical_path(sha256: str) -> str:
+    """Storage path of the canonical derivative of the given content"""
+    return os.path.join('canonical', sha256[:2], f"{sha256}.flac")
+
+
+def transcode(source_path: str, target_path: str) -> int:
+    """
+    Write `source_path` as 16 kHz mono 16-bit FLAC to `target_path`.
+    Needs no Django state, so it can run in a process pool.
+    Returns the size of the written file.
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise TranscodeError('ffmpeg not found')
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    partial_path = f"{target_path}.{os.getpid()}.part"
+    command = [
+        ffmpeg, '-v', 'error', '-nostdin', '-y', '-i', source_path, '-vn',
+        '-ac', str(CANONICAL_CHANNELS), '-ar', str(CANONICAL_SAMPLE_RATE),
+        '-sample_fmt', 's16', '-c:a', 'flac', '-f', 'flac', partial_path,
+    ]
+    process = subprocess.run(command, capture_output=True)
+    if process.returncode != 0:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise TranscodeError(process.stderr.decode(errors='replace').strip())
+
+    # Readers never see a half-written derivative
+    os.replace(partial_path, target_path)
+    return os.path.getsize(target_path)
+
+
+def ensure_canonical(sha256: str, source_name: str) -> str:
+    """Create the derivative for stored audio unless it exists; returns its storage name"""
+    name = canonical_path(sha256)
+    if not default_storage.exists(name):
+        transcode(default_storage.path(source_name), default_storage.path(name))
+    return name
+
+
+def delete_canonical(sha256: str) -> None:
+    """Remove the derivative of content that is no longer stored"""
+    if sha256:
+        default_storage.delete(canonical_path(sha256))
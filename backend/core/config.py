@@ -18,6 +18,16 @@ class Config:
     # File Upload
     MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 50 * 1024 * 1024))  # 50MB
     ALLOWED_AUDIO_FORMATS = ['wav', 'mp3', 'webm', 'ogg', 'm4a']
+    MAX_RECORDING_DURATION = float(os.getenv('MAX_RECORDING_DURATION', 10.0))  # seconds kept per upload
+    
+    # Write a 16 kHz mono FLAC copy of every new upload (needs ffmpeg)
+    CANONICAL_AUDIO_ENABLED = os.getenv('CANONICAL_AUDIO_ENABLED', 'False').lower() == 'true'
+    
+    # Background jobs
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    
+    # Cache shared by all worker processes ('sqlite') or private to each ('locmem')
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')
     
     # API
     API_RATE_LIMIT = os.getenv('API_RATE_LIMIT', '100/hour')
@@ -0,0 +1,93 @@
+"""
+Fixed-size recording embeddings pooled from feature store frames.
+Each recording becomes the mean and standard deviation of its MFCCs and
+the mean of its level-normalised log-mel spectrum (spectral shape
+independent of loudness). Pooling runs over many recordings at once with
+reduceat over their row ranges.
+"""
+from typing import List, Sequence, Tuple
+import numpy as np
+from . import features
+
+EMBEDDING_DIM = features.N_MELS + 2 * features.N_MFCC
+
+
+def pool(matrix: np.ndarray, offsets: Sequence[int], lengths: Sequence[int]) -> np.ndarray:
+    """
+    Raw embeddings of the frame ranges [offset, offset + length) of a
+    feature matrix, shape (ranges, EMBEDDING_DIM), float32. Ranges must not
+    overlap (one per stored content) and should be passed in chunks, since
+    every row between the first and last range is read.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if offsets.size == 0:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+    # Only the rows from the first to the last range are read from the memory map
+    order = np.argsort(offsets)
+    start, stop = int(offsets.min()), int((offsets + lengths).max())
+    frames = np.asarray(matrix[start:stop], dtype=np.float64)
+    log_mel = frames[:, :features.N_MELS]
+    shape = log_mel - log_mel.mean(axis=1, keepdims=True)
+    mfcc = frames[:, features.N_MELS:]
+    values = np.hstack([shape, mfcc, mfcc ** 2])
+
+    # Sums over every range; a zero row closes the last one for reduceat
+    values = np.vstack([values, np.zeros((1, values.shape[1]))])
+    bounds = np.empty(offsets.size * 2, dtype=np.int64)
+    bounds[0::2] = offsets[order] - start
+    bounds[1::2] = offsets[order] + lengths[order] - start
+    sums = np.add.reduceat(values, bounds, axis=0)[0::2]
+    # reduceat returns the single row at an empty range instead of zero
+    sums[lengths[order] == 0] = 0.0
+
+    counts = np.maximum(lengths[order], 1)[:, None]
+    means = sums / counts
+    shape_mean = means[:, :features.N_MELS]
+    mfcc_mean = means[:, features.N_MELS:features.N_MELS + features.N_MFCC]
+    mfcc_std = np.sqrt(np.maximum(means[:, features.N_MELS + features.N_MFCC:] - mfcc_mean ** 2, 0.0))
+
+    pooled = np.empty((offsets.size, EMBEDDING_DIM), dtype=np.float32)
+    pooled[order] = np.hstack([shape_mean, mfcc_mean, mfcc_std])
+    return pooled
+
+
+def embed(frames: np.ndarray) -> np.ndarray:
+    """Raw embedding of one recording's feature frames"""
+    return pool(frames, [0], [len(frames)])[0]
+
+
+def embed_store(store, recording_ids=None, chunk_rows: int = 200000) -> Tuple[List[str], np.ndarray]:
+    """
+    (recording_ids, raw embeddings) of the given (default: all) recordings in
+    a FeatureStore. Recordings sharing content share one pooled range.
+    """
+    index = store.load_index()
+    entries = index['recordings']
+    wanted = entries.keys() if recording_ids is None else [str(rid) for rid in recording_ids]
+    ranges = {}
+    for rid in wanted:
+        if rid in entries:
+            ranges.setdefault(tuple(entries[rid]), []).append(rid)
+    if not ranges:
+        return [], np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+    matrix = store.load_matrix()
+    ordered = sorted(ranges)
+    pooled = []
+    chunk_start = 0
+    # Chunks of neighbouring ranges bound the rows read at once
+    for position in range(1, len(ordered) + 1):
+        if position == len(ordered) or ordered[position][0] - ordered[chunk_start][0] > chunk_rows:
+            chunk = ordered[chunk_start:position]
+            pooled.append(pool(matrix, [offset for offset, _ in chunk], [frames for _, frames in chunk]))
+            chunk_start = position
+    pooled = np.vstack(pooled)
+
+    ids, rows = [], []
+    for row, key in enumerate(ordered):
+        for rid in ranges[key]:
+            ids.append(rid)
+            rows.append(row)
+    return ids, pooled[rows]
@@ -0,0 +1,243 @@
+"""
+Memory-mapped feature store.
+All feature frames live in one float32 `features.npy` matrix; the index
+maps each recording_id to its (offset, frames) row range. Recordings that
+share stored audio share rows. Appends take a file lock and extend the
+matrix in place.
+
+The index is `index.json` plus `index.journal`, one JSON line per append
+or prune holding only the entries it set or dropped. Replaying the journal
+over index.json gives the current index; once the journal outgrows
+index.json both are folded into a new index.json and an empty journal of
+the next generation. Each process parses the index once and afterwards
+only reads the journal lines added since.
+
+Loading outside Django:
+    store = FeatureStore('/path/to/feature_store')
+    matrix = np.load('features.npy', mmap_mode='r')
+    offset, frames = store.load_index()['recordings'][recording_id]
+    features = matrix[offset:offset + frames]
+"""
+import json
+import os
+import struct
+import threading
+import uuid
+from types import SimpleNamespace
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from django.conf import settings
+from . import features
+from .filelock import FileLock
+
+MATRIX_NAME = 'features.npy'
+INDEX_NAME = 'index.json'
+JOURNAL_NAME = 'index.journal'
+HEADER_SIZE = 128  # fixed, so the row count can be rewritten in place
+INDEX_VERSION = 1
+COMPACT_MIN_BYTES = 1 << 20  # a smaller journal is never folded into index.json
+
+# Parsed index per store directory, with how far the journal was replayed
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def _header(rows: int) -> bytes:
+    """.npy v1.0 header padded to HEADER_SIZE bytes"""
+    text = f"{{'descr': '<f4', 'fortran_order': False, 'shape': ({rows}, {features.N_FEATURES}), }}"
+    text = text.ljust(HEADER_SIZE - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(text)) + text.encode('latin1')
+
+
+class FeatureStore:
+    """Feature matrix and row index in `directory` (default FEATURE_STORE_DIR)"""
+
+    def __init__(self, directory=None):
+        self.directory = str(directory or settings.FEATURE_STORE_DIR)
+        self.matrix_path = os.path.join(self.directory, MATRIX_NAME)
+        self.index_path = os.path.join(self.directory, INDEX_NAME)
+        self.journal_path = os.path.join(self.directory, JOURNAL_NAME)
+        self.lock_path = os.path.join(self.directory, '.lock')
+
+    def load_index(self) -> Dict:
+        """
+        The row index, or an empty one if nothing was stored yet. The dict
+        is shared by every caller in the process and must not be modified.
+        """
+        with _loaded_lock:
+            return self._load().index
+
+    def _load(self) -> SimpleNamespace:
+        """The cached index brought up to date with the journal; call with _loaded_lock held"""
+        state = _loaded.get(self.directory)
+        try:
+            journal = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            journal = None
+        try:
+            # Every journal starts with a header unique to it, so a replaced one is noticed
+            header = journal.readline() if journal is not None else b''
+            key = (self._snapshot_key(), header)
+            if state is None or state.key != key:
+                index = self._read_snapshot()
+                current = bool(header) and json.loads(header)['generation'] == index['generation']
+                state = SimpleNamespace(key=key, index=index, offset=len(header), current=current)
+            # A journal of an older generation was opened just before a compaction folded it in
+            if state.current:
+                journal.seek(state.offset)
+                for line in journal:
+                    if not line.endswith(b'\n'):
+                        break  # left half-written by a crashed writer
+                    self._apply(state.index, json.loads(line))
+                    state.offset += len(line)
+        finally:
+            if journal is not None:
+                journal.close()
+        _loaded[self.directory] = state
+        return state
+
+    def _snapshot_key(self) -> Optional[Tuple]:
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _read_snapshot(self) -> Dict:
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {
+                'version': INDEX_VERSION,
+                'rows': 0,
+                'sample_rate': features.SAMPLE_RATE,
+                'hop_length': features.HOP_LENGTH,
+                'columns': {'log_mel': [0, features.N_MELS],
+                            'mfcc': [features.N_MELS, features.N_FEATURES]},
+                'recordings': {},
+                'hashes': {},
+            }
+        index.setdefault('generation', 0)
+        return index
+
+    @staticmethod
+    def _apply(index: Dict, entry: Dict) -> None:
+        """Replay one journal entry; entries hold absolute values, so replaying twice is harmless"""
+        index['rows'] = entry.get('rows', index['rows'])
+        index['hashes'].update(entry.get('hashes', {}))
+        index['recordings'].update(entry.get('recordings', {}))
+        for rid in entry.get('drop', ()):
+            index['recordings'].pop(rid, None)
+
+    def load_matrix(self, rows: Optional[int] = None) -> np.ndarray:
+        """The whole feature matrix, memory-mapped read-only (no copy)"""
+        if rows is None:
+            rows = self.load_index()['rows']
+        if rows == 0:
+            return np.empty((0, features.N_FEATURES), dtype=np.float32)
+        matrix = np.load(self.matrix_path, mmap_mode='r')
+        # Rows appended after the index was read are not visible yet
+        return matrix[:rows]
+
+    def get(self, recording_id, matrix: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Feature frames of one recording, or None if it has not been extracted"""
+        index = self.load_index()
+        entry = index['recordings'].get(str(recording_id))
+        if entry is None:
+            return None
+        offset, frames = entry
+        matrix = self.load_matrix(index['rows']) if matrix is None else matrix
+        return matrix[offset:offset + frames]
+
+    def append(self, items: Iterable[Tuple[Iterable, str, np.ndarray]]) -> int:
+        """
+        Store features for (recording_ids, file_hash, matrix) items.
+        Content that is already stored only gets new index entries, so the
+        matrix may be None for it.
+        Returns the number of rows written.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with FileLock(self.lock_path), _loaded_lock:
+            index = self._load().index
+            rows = index['rows']
+            written = 0
+            hashes, recordings = {}, {}
+            mode = 'r+b' if os.path.exists(self.matrix_path) else 'w+b'
+            with open(self.matrix_path, mode) as f:
+                # Drop rows a crashed writer left past the indexed end
+                f.truncate(HEADER_SIZE + rows * features.N_FEATURES * 4)
+                f.seek(0, os.SEEK_END)
+                for recording_ids, file_hash, matrix in items:
+                    entry = hashes.get(file_hash) or index['hashes'].get(file_hash)
+                    if entry is None:
+                        if matrix is None:
+                            continue
+                        matrix = np.ascontiguousarray(matrix, dtype='<f4')
+                        f.write(matrix.tobytes())
+                        entry = hashes[file_hash] = [rows + written, len(matrix)]
+                        written += len(matrix)
+                    for recording_id in recording_ids:
+                        recordings[str(recording_id)] = entry
+                f.seek(0)
+                f.write(_header(rows + written))
+
+            if hashes or recordings:
+                self._log({'rows': rows + written, 'hashes': hashes, 'recordings': recordings})
+        return written
+
+    def prune(self, valid_ids: Iterable) -> int:
+        """Forget recordings that no longer exist; returns how many were removed"""
+        valid_ids = {str(rid) for rid in valid_ids}
+        with FileLock(self.lock_path), _loaded_lock:
+            stale = [rid for rid in self._load().index['recordings'] if rid not in valid_ids]
+            if stale:
+                self._log({'drop': stale})
+        return len(stale)
+
+    def clear(self) -> None:
+        """Remove all stored features"""
+        with FileLock(self.lock_path), _loaded_lock:
+            for path in (self.matrix_path, self.index_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            _loaded.pop(self.directory, None)
+
+    def _log(self, entry: Dict) -> None:
+        """
+        Append `entry` to the journal and the cached index, folding the
+        journal into index.json once it outgrows it. Call with the file lock
+        and _loaded_lock held, right after _load().
+        """
+        state = _loaded[self.directory]
+        if not state.current:
+            self._start_journal(state)
+        line = json.dumps(entry, separators=(',', ':')).encode() + b'\n'
+        with open(self.journal_path, 'r+b') as journal:
+            # Cut off a line a crashed writer left unfinished
+            journal.truncate(state.offset)
+            journal.seek(state.offset)
+            journal.write(line)
+        self._apply(state.index, entry)
+        state.offset += len(line)
+
+        snapshot_size = state.key[0][2] if state.key[0] else 0
+        if state.offset > max(COMPACT_MIN_BYTES, snapshot_size):
+            state.index['generation'] += 1
+            self._write_index(state.index)
+            self._start_journal(state)
+
+    def _start_journal(self, state: SimpleNamespace) -> None:
+        """Atomically replace the journal by an empty one for the generation of `state`"""
+        header = json.dumps({'generation': state.index['generation'], 'id': uuid.uuid4().hex}).encode() + b'\n'
+        partial_path = f"{self.journal_path}.{os.getpid()}.part"
+        with open(partial_path, 'wb') as f:
+            f.write(header)
+        os.replace(partial_path, self.journal_path)
+        state.key, state.offset, state.current = (self._snapshot_key(), header), len(header), True
+
+    def _write_index(self, index: Dict) -> None:
+        partial_path = f"{self.index_path}.{os.getpid()}.part"
+        with open(partial_path, 'w') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(partial_path, self.index_path)
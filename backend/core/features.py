@@ -0,0 +1,87 @@
+"""
+Vectorized log-mel and MFCC extraction.
+All frames of a recording are windowed and transformed in one batched FFT.
+"""
+from functools import lru_cache
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .audio_decode import load_pcm
+
+SAMPLE_RATE = 16000
+N_FFT = 512  # 32 ms
+HOP_LENGTH = 160  # 10 ms
+N_MELS = 64
+N_MFCC = 20
+FMIN = 20.0
+FMAX = SAMPLE_RATE / 2
+N_FEATURES = N_MELS + N_MFCC  # columns: log-mel bands, then MFCCs
+LOG_FLOOR = 1e-10
+
+
+def frame_signal(samples: np.ndarray, frame_length: int = N_FFT, hop_length: int = HOP_LENGTH) -> np.ndarray:
+    """Overlapping frames as a strided view, shape (frames, frame_length)"""
+    if samples.size < frame_length:
+        samples = np.pad(samples, (0, frame_length - samples.size))
+    return sliding_window_view(samples, frame_length)[::hop_length]
+
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + np.asarray(hz) / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10.0 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+
+@lru_cache(maxsize=8)
+def mel_filterbank(n_mels: int = N_MELS, n_fft: int = N_FFT, sample_rate: int = SAMPLE_RATE,
+                   fmin: float = FMIN, fmax: float = FMAX) -> np.ndarray:
+    """Triangular mel filters, shape (n_mels, n_fft // 2 + 1)"""
+    bin_freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    edges = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bin_freqs - lower) / (center - lower)
+    falling = (upper - bin_freqs) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def dct_matrix(n_mfcc: int = N_MFCC, n_mels: int = N_MELS) -> np.ndarray:
+    """Orthonormal DCT-II basis, shape (n_mfcc, n_mels)"""
+    k = np.arange(n_mfcc)[:, None]
+    n = np.arange(n_mels)[None, :]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def _window(n_fft: int) -> np.ndarray:
+    return np.hanning(n_fft).astype(np.float32)
+
+
+def log_mel_spectrogram(samples: np.ndarray) -> np.ndarray:
+    """Log mel energies of 16 kHz mono samples, shape (frames, N_MELS)"""
+    frames = frame_signal(samples) * _window(N_FFT)
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    return np.log(power @ mel_filterbank().T + LOG_FLOOR).astype(np.float32)
+
+
+def mfcc(log_mel: np.ndarray) -> np.ndarray:
+    """MFCCs from log mel energies, shape (frames, N_MFCC)"""
+    return log_mel @ dct_matrix().T
+
+
+def extract_features(samples: np.ndarray) -> np.ndarray:
+    """Feature matrix of 16 kHz mono samples, shape (frames, N_FEATURES)"""
+    log_mel = log_mel_spectrogram(samples)
+    return np.hstack([log_mel, mfcc(log_mel)]).astype(np.float32)
+
+
+def extract_file(path: str) -> np.ndarray:
+    """
+    Decode, resample and featurize one file.
+    Needs no Django state, so it can run in a process pool.
+    """
+    samples, _ = load_pcm(path, SAMPLE_RATE)
+    return extract_features(samples)
@@ -0,0 +1,51 @@
+"""
+Advisory file locks shared by processes on one host
+"""
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LockUnavailable(Exception):
+    """Raised when a non-blocking lock is held by someone else"""
+
+
+class FileLock:
+    """
+    Exclusive lock on `<path>`, released on exit or when the process dies.
+    With blocking=False the context raises LockUnavailable instead of waiting.
+    """
+
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self.fd = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                flags = fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(self.fd, flags)
+            else:
+                mode = msvcrt.LK_LOCK if self.blocking else msvcrt.LK_NBLCK
+                msvcrt.locking(self.fd, mode, 1)
+        except OSError:
+            os.close(self.fd)
+            self.fd = None
+            raise LockUnavailable(self.path)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        os.close(self.fd)
+        self.fd = None
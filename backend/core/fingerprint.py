@@ -0,0 +1,144 @@
+"""
+Audio fingerprints for near-duplicate detection.
+Peaks of a smoothed mel spectrogram are paired into (band, band, dt)
+landmarks. The mel envelope survives lossy codecs, which replace the fine
+structure of noisy sounds like coughs, and landmarks only use time
+differences, so padding before the clip does not matter. The landmark set
+is reduced to a MinHash signature whose agreement estimates the Jaccard
+similarity of two sets; groups of ROWS signature values are hashed into LSH
+keys so candidates are found by index lookups, not pairwise comparison.
+"""
+from typing import List, Optional
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .audio_decode import load_pcm
+from .features import frame_signal, mel_filterbank
+
+SAMPLE_RATE = 8000
+N_FFT = 512  # 64 ms
+HOP_LENGTH = 128  # 16 ms
+N_BANDS = 32  # mel bands, 5 bits
+SMOOTHING = 3  # frames averaged before peak picking
+PEAK_TIME = 5  # neighbourhood a peak must dominate, frames
+PEAK_BANDS = 3  # and bands
+PEAK_RANGE_DB = 30.0  # peaks within this range of the loudest point
+PEAKS_PER_SECOND = 30
+FAN_OUT = 10  # later peaks each peak is paired with
+MAX_DT = 63  # frames
+DT_SHIFT = 3  # dt is stored in 8-frame steps so small shifts agree
+NUM_HASHES = 128
+SIMILARITY_THRESHOLD = 0.2  # re-encoded copies score 0.25-1.0, unrelated clips below 0.05
+# A band matches with probability J**ROWS, so content becomes a candidate
+# from about (1 / BANDS) ** (1 / ROWS) = 0.21 on: a copy at J = 0.3 shares a
+# band 98% of the time, an unrelated clip at J = 0.05 only 0.3%. Bands are
+# drawn from the NUM_HASHES values and overlap, so the signature stays small.
+BANDS = 512
+ROWS = 4
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, _PRIME, NUM_HASHES, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_HASHES, dtype=np.uint64)
+_band_rng = np.random.default_rng(0xBA4D)
+_BAND_ROWS = np.stack([_band_rng.choice(NUM_HASHES, ROWS, replace=False) for _ in range(BANDS)])
+_BAND_MUL = _band_rng.integers(0, 1 << 63, (BANDS, ROWS), dtype=np.uint64) | np.uint64(1)
+_BAND_SALT = _band_rng.integers(0, 1 << 63, BANDS, dtype=np.uint64)
+
+
+def _max_filter(values: np.ndarray, size: int, axis: int) -> np.ndarray:
+    """Running maximum of `size` values centred on each position along `axis`"""
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (size // 2, size // 2)
+    padded = np.pad(values, pad, constant_values=-np.inf)
+    return sliding_window_view(padded, size, axis=axis).max(axis=-1)
+
+
+def mel_envelope(samples: np.ndarray) -> np.ndarray:
+    """Time-smoothed mel spectrogram in dB, shape (frames, N_BANDS)"""
+    frames = frame_signal(samples, N_FFT, HOP_LENGTH) * np.hanning(N_FFT)
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    mel = power @ mel_filterbank(N_BANDS, N_FFT, SAMPLE_RATE, 50.0, SAMPLE_RATE / 2).T
+    padded = np.pad(mel, ((SMOOTHING // 2, SMOOTHING // 2), (0, 0)), mode='edge')
+    smoothed = sliding_window_view(padded, SMOOTHING, axis=0).mean(axis=-1)
+    return 10.0 * np.log10(smoothed + 1e-10)
+
+
+def spectral_peaks(samples: np.ndarray):
+    """(frame, band) of the strongest local maxima of the mel envelope, in time order"""
+    envelope = mel_envelope(samples)
+    # A rectangular maximum filter is separable: time, then bands
+    neighbourhood = _max_filter(_max_filter(envelope, PEAK_TIME, 0), PEAK_BANDS, 1)
+    is_peak = (envelope == neighbourhood) & (envelope > envelope.max() - PEAK_RANGE_DB)
+    times, bands = np.nonzero(is_peak)
+
+    limit = max(1, int(PEAKS_PER_SECOND * samples.size / SAMPLE_RATE))
+    if times.size > limit:
+        strongest = np.argsort(envelope[times, bands])[-limit:]
+        times, bands = times[strongest], bands[strongest]
+    order = np.lexsort((bands, times))
+    return times[order], bands[order]
+
+
+def landmarks(samples: np.ndarray) -> np.ndarray:
+    """Unique (band, band, dt) landmark hashes"""
+    times, bands = spectral_peaks(samples)
+    hashes = [np.empty(0, dtype=np.int64)]
+    for k in range(1, FAN_OUT + 1):
+        dt = times[k:] - times[:-k]
+        valid = (dt > 0) & (dt <= MAX_DT)
+        hashes.append((bands[:-k][valid] << 11) | (bands[k:][valid] << 6) | (dt[valid] >> DT_SHIFT))
+    return np.unique(np.concatenate(hashes))
+
+
+def signature_samples(samples: np.ndarray) -> Optional[np.ndarray]:
+    """MinHash signature (NUM_HASHES uint32) of mono 8 kHz samples; None without landmarks"""
+    marks = landmarks(samples)
+    if marks.size == 0:
+        return None
+    return minhash(marks)
+
+
+def minhash(marks: np.ndarray) -> np.ndarray:
+    """MinHash signature (NUM_HASHES uint32) of a non-empty set of non-negative integers"""
+    marks = np.asarray(marks).astype(np.uint64)
+    return ((_A[:, None] * marks[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def signature_file(path: str) -> Optional[np.ndarray]:
+    """
+    Decode and fingerprint one file.
+    Needs no Django state, so it can run in a process pool.
+    """
+    samples, _ = load_pcm(path, SAMPLE_RATE)
+    return signature_samples(samples)
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit LSH key per band"""
+    return band_key_matrix(signature[None, :])[0].tolist()
+
+
+def band_key_matrix(signatures: np.ndarray) -> np.ndarray:
+    """
+    LSH keys of an (n, NUM_HASHES) array of signatures, shape (n, BANDS).
+    Each key is a random linear hash modulo 2**64 of the band's values,
+    salted per band so equal values in different bands do not collide.
+    """
+    values = signatures.astype(np.uint64)
+    keys = np.broadcast_to(_BAND_SALT, (len(values), BANDS)).copy()
+    for row in range(ROWS):
+        keys += values[:, _BAND_ROWS[:, row]] * _BAND_MUL[:, row]
+    return keys.view(np.int64)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the landmark sets behind two signatures"""
+    return float(np.count_nonzero(a == b)) / NUM_HASHES
+
+
+def to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype('<u4').tobytes()
+
+
+def from_bytes(data) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype='<u4')
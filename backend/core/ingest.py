@@ -0,0 +1,193 @@
+"""
+Single-pass ingest of uploaded audio into content-addressed storage
+"""
+import logging
+import os
+from typing import Dict, Any
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from mutagen import File as MutagenFile
+from . import audio_probe
+from .canonical import delete_canonical
+from .models import AudioBlob
+from .truncation import truncate_upload
+from .waveform import delete_peaks
+from .utils import generate_file_hash
+
+logger = logging.getLogger(__name__)
+
+
+def probe_audio(file_obj) -> Dict[str, Any]:
+    """Read audio metadata from the container header of an open file"""
+    metadata = {
+        'duration': None,
+        'sample_rate': None,
+        'bit_rate': None,
+        'channels': None,
+    }
+
+    # The header prober reads a few KB; mutagen is the fallback for
+    # anything it does not recognise
+    fast = audio_probe.probe(file_obj)
+    if fast is not None and fast['duration']:
+        metadata.update({key: fast[key] for key in metadata})
+        return metadata
+
+    try:
+        file_obj.seek(0)
+        audio_info = MutagenFile(file_obj)
+        # FileType objects are falsy when they carry no tags, so test for None
+        if audio_info is not None and hasattr(audio_info, 'info'):
+            metadata.update({
+                'duration': getattr(audio_info.info, 'length', None) or None,
+                'sample_rate': getattr(audio_info.info, 'sample_rate', None),
+                'bit_rate': getattr(audio_info.info, 'bitrate', None),
+                'channels': getattr(audio_info.info, 'channels', None),
+            })
+    except Exception as e:
+        logger.warning(f"Header probe failed: {e}")
+    finally:
+        file_obj.seek(0)
+
+    return metadata
+
+
+def probe_upload(upload) -> Dict[str, Any]:
+    """Probe an uploaded file once and remember the result on the upload"""
+    metadata = getattr(upload, 'audio_metadata', None)
+    if metadata is None:
+        metadata = probe_audio(upload.file if hasattr(upload, 'file') else upload)
+        upload.audio_metadata = metadata
+    return metadata
+
+
+class SpooledUpload(UploadedFile):
+    """A finished spool file presented to ingest like a temporary upload"""
+
+    def __init__(self, path, name, content_type=None):
+        super().__init__(open(path, 'rb'), name, content_type, os.path.getsize(path))
+        self.path = path
+
+    def temporary_file_path(self):
+        # Lets FileSystemStorage move the spool into place instead of copying
+        return self.path
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            pass
+
+
+def content_path(sha256: str, filename: str) -> str:
+    """Storage path of a content-addressed audio blob"""
+    ext = os.path.basename(filename).split('.')[-1].lower()
+    return os.path.join('cough_recordings', sha256[:2], f"{sha256}.{ext}")
+
+
+def write_blob_file(upload, sha256: str) -> str:
+    """Write content to its content-addressed path unless it is already there"""
+    name = content_path(sha256, upload.name)
+    # A file left behind by a rolled back transaction has the same content
+    if not default_storage.exists(name):
+        name = default_storage.save(name, upload)
+    return name
+
+
+def register_blob(sha256: str, name: str, size: int):
+    """
+    Record a reference to content written at `name`.
+    Returns: (blob, was_duplicate)
+    """
+    blob = AudioBlob.objects.acquire(sha256)
+    if blob is None:
+        try:
+            with transaction.atomic():
+                return AudioBlob.objects.create(sha256=sha256, name=name, size=size, ref_count=1), False
+        except IntegrityError:
+            # Another request stored the same content first
+            blob = AudioBlob.objects.acquire(sha256)
+
+    if blob.name != name:
+        default_storage.delete(name)
+    return blob, True
+
+
+def store_blob(upload, sha256: str):
+    """
+    Return the AudioBlob for the given content with one more reference.
+    The upload is only written when no blob with this digest exists yet.
+    Returns: (blob, was_duplicate)
+    """
+    blob = AudioBlob.objects.acquire(sha256)
+    if blob is not None:
+        return blob, True
+    return register_blob(sha256, write_blob_file(upload, sha256), upload.size)
+
+
+def release_blob(sha256: str) -> None:
+    """Drop a reference to a blob and delete its file once it is unused"""
+    if not sha256:
+        return
+    blob = AudioBlob.objects.release(sha256)
+    if blob is not None:
+        name = blob.name
+        blob.delete()
+        transaction.on_commit(lambda: default_storage.delete(name))
+        transaction.on_commit(lambda: delete_canonical(sha256))
+        transaction.on_commit(lambda: delete_peaks(sha256))
+
+
+def describe_upload(upload) -> Dict[str, Any]:
+    """
+    Header metadata, size, format and SHA-256 of an upload, without storing it.
+    The upload handlers have already hashed request files; other sources
+    are hashed with generate_file_hash.
+    """
+    metadata = dict(probe_upload(upload))
+    metadata.update({
+        'file_size': upload.size,
+        'file_format': os.path.basename(upload.name).split('.')[-1].lower(),
+        'file_hash': getattr(upload, 'sha256', None) or generate_file_hash(upload),
+    })
+    return metadata
+
+
+def prepare_upload(upload):
+    """
+    Cut an upload to MAX_RECORDING_DURATION and describe what will be stored.
+    The original length is kept as 'original_duration'.
+    Returns: (upload to store, metadata); the upload is a TruncatedUpload
+    the caller must close when the original was too long.
+    """
+    original_duration = probe_upload(upload)['duration']
+    truncated = truncate_upload(upload, original_duration)
+    if truncated is not None:
+        upload = truncated
+    metadata = describe_upload(upload)
+    metadata['original_duration'] = original_duration
+    return upload, metadata
+
+
+def ingest_upload(field_file) -> Dict[str, Any]:
+    """
+    Store the pending upload of a FileField in content-addressed storage,
+    cut to MAX_RECORDING_DURATION. Content that is already stored is not
+    written again. The header probe
+    reads only the container metadata of the upload, never a copy of it.
+    Returns the metadata for the model row.
+    """
+    upload, metadata = prepare_upload(field_file.file)
+    try:
+        blob, was_duplicate = store_blob(upload, metadata['file_hash'])
+    finally:
+        if upload is not field_file.file:
+            upload.close()
+    field_file.name = blob.name
+    field_file._committed = True
+    if was_duplicate:
+        logger.info(f"Duplicate upload {metadata['file_hash'][:12]}, reusing stored file")
+
+    metadata['was_duplicate'] = was_duplicate
+    return metadata
@@ -0,0 +1,152 @@
+"""
+Database-backed background jobs, run by `manage.py run_workers`.
+Workers claim rows with a conditional UPDATE, so no outside broker is needed.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, Callable] = {}
+
+
+def task(name: str):
+    """Register a function as a background task under `name`"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name: str, payload: Optional[Dict] = None, delay: float = 0,
+            max_attempts: Optional[int] = None) -> Job:
+    """Queue a task; it runs after the current transaction commits"""
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_many(name: str, payloads: List[Dict]) -> List[Job]:
+    """Queue one task per payload with a single INSERT"""
+    if not payloads:
+        return []
+    run_after = timezone.now()
+    return Job.objects.bulk_create([
+        Job(name=name, payload=payload, run_after=run_after, max_attempts=settings.JOB_MAX_ATTEMPTS)
+        for payload in payloads
+    ])
+
+
+def autodiscover():
+    """Import tasks.py from every installed app so tasks are registered"""
+    autodiscover_modules('tasks')
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff in seconds after the given number of attempts"""
+    return settings.JOB_RETRY_BASE_DELAY * (2 ** (attempts - 1))
+
+
+def release_stale_jobs() -> int:
+    """Put back jobs whose worker died while running them"""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return Job.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='pending', locked_by='', locked_at=None
+    )
+
+
+def purge_finished_jobs() -> int:
+    """Delete successful jobs older than JOB_RETENTION_DAYS"""
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    deleted, _ = Job.objects.filter(status='done', finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def claim_next(worker_id: str) -> Optional[Job]:
+    """Atomically take the next due job, or return None if there is none"""
+    while True:
+        now = timezone.now()
+        job_id = Job.objects.filter(
+            status='pending', run_after__lte=now
+        ).order_by('run_after', 'id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+
+        claimed = Job.objects.filter(pk=job_id, status='pending').update(
+            status='running', locked_by=worker_id, locked_at=now,
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+        # Another worker won the race, try the next one
+
+
+def run_job(job: Job) -> bool:
+    """Execute a claimed job and record the outcome. Returns True on success."""
+    func = _registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'No task registered as "{job.name}"')
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            Job.objects.filter(pk=job.pk).update(
+                status='pending', locked_by='', locked_at=None, last_error=error,
+                run_after=timezone.now() + timedelta(seconds=delay)
+            )
+            logger.warning(f"Job {job} failed (attempt {job.attempts}), retrying in {delay:.0f}s")
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status='failed', last_error=error, finished_at=timezone.now()
+            )
+            logger.error(f"Job {job} failed permanently: {error}")
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status='done', last_error='', finished_at=timezone.now())
+    return True
+
+
+def work(worker_id: Optional[str] = None, poll_interval: float = 1.0, once: bool = False) -> int:
+    """
+    Process jobs until interrupted. With once=True, return when the queue
+    has no due jobs left. Returns the number of jobs processed.
+    Every half JOB_LOCK_TIMEOUT the worker also re-queues jobs of workers
+    that died, so they do not wait for the next restart of the pool.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    release_every = settings.JOB_LOCK_TIMEOUT / 2
+    released_at = None
+
+    while True:
+        close_old_connections()
+        if released_at is None or time.monotonic() - released_at >= release_every:
+            released = release_stale_jobs()
+            if released:
+                logger.warning(f"Re-queued {released} jobs from dead workers")
+            released_at = time.monotonic()
+        job = claim_next(worker_id)
+        if job is None:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+
+        run_job(job)
+        processed += 1
@@ -0,0 +1,88 @@
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.sqlite_cache.SQLiteCache',
+}
+KEYS = 1000
+COUNTER = 'benchmark-counter'
+
+
+def _backend(name, location):
+    return import_string(BACKENDS[name])(location, {'OPTIONS': {'MAX_ENTRIES': KEYS * 2}})
+
+
+def _work(name, location, operations, seed):
+    """
+    One worker process: a read-heavy mix of get/set plus an incr of the
+    shared counter, like response caching with rate limiting.
+    Returns (elapsed seconds, gets, hits, incrs).
+    """
+    cache = _backend(name, location)
+    rng = random.Random(seed)
+    payload = {'results': list(range(50))}
+    gets = hits = incrs = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        key = f'key-{rng.randrange(KEYS)}'
+        roll = rng.random()
+        if roll < 0.8:
+            gets += 1
+            hits += cache.get(key) is not None
+        elif roll < 0.95:
+            cache.set(key, payload, 300)
+        else:
+            incrs += 1
+            try:
+                cache.incr(COUNTER)
+            except ValueError:
+                cache.add(COUNTER, 1, 300)
+    return time.perf_counter() - started, gets, hits, incrs
+
+
+class Command(BaseCommand):
+    help = 'Compare cache backends under concurrent worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                          help='Concurrent processes, like gunicorn workers (default: 4)')
+        parser.add_argument('--operations', type=int, default=20000,
+                          help='Cache operations per worker (default: 20,000)')
+        parser.add_argument('--backends', default=','.join(BACKENDS),
+                          help=f'Comma-separated subset of {", ".join(BACKENDS)}')
+
+    def handle(self, *args, **options):
+        workers, operations = options['workers'], options['operations']
+        self.stdout.write(f'{workers} processes x {operations} operations '
+                          f'(80% get, 15% set, 5% incr of one shared counter)')
+        for name in options['backends'].split(','):
+            if name not in BACKENDS:
+                self.stdout.write(self.style.ERROR(f'Unknown backend {name}'))
+                continue
+            with tempfile.TemporaryDirectory() as directory:
+                location = os.path.join(directory, 'cache.sqlite3') if name == 'sqlite' else directory
+                cache = _backend(name, location)
+                cache.set(COUNTER, 0, 300)
+
+                started = time.perf_counter()
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(_work, [name] * workers, [location] * workers,
+                                            [operations] * workers, range(workers)))
+                wall = time.perf_counter() - started
+
+                busy, gets, hits, incrs = (sum(column) for column in zip(*results))
+                counted = cache.get(COUNTER)
+            self.stdout.write(
+                f'{name:>7}: {workers * operations / wall:9.0f} ops/s  '
+                f'{busy / (workers * operations) * 1e6:7.1f} us/op  '
+                f'hit rate {hits / gets:5.1%}  '
+                f'shared counter {counted}/{incrs}'
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,91 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.audio_probe import probe_path
+
+AUDIO_EXTENSIONS = ('.wav', '.webm', '.ogg', '.opus', '.mp3', '.m4a', '.mp4', '.flac', '.mka')
+
+
+def _mutagen_duration(path):
+    from mutagen import File as MutagenFile
+    audio_info = MutagenFile(path)
+    return audio_info.info.length if audio_info is not None else None
+
+
+def _pydub_duration(path):
+    from pydub import AudioSegment
+    return len(AudioSegment.from_file(path)) / 1000.0
+
+
+def _fast_duration(path):
+    result = probe_path(path)
+    return result['duration'] if result else None
+
+
+class Command(BaseCommand):
+    help = 'Compare the header prober with mutagen and a full pydub decode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*',
+                          help='Audio files or folders (default: MEDIA_ROOT/cough_recordings)')
+        parser.add_argument('--repeat', type=int, default=3,
+                          help='Passes over the file set per prober')
+        parser.add_argument('--decode', action='store_true',
+                          help='Include a full pydub decode (needs ffmpeg for compressed formats)')
+
+    def handle(self, *args, **options):
+        files = self.collect_files(options['paths'] or [os.path.join(settings.MEDIA_ROOT, 'cough_recordings')])
+        if not files:
+            self.stdout.write(self.style.WARNING('No audio files found'))
+            return
+        self.stdout.write(f'Probing {len(files)} files, {options["repeat"]} passes')
+
+        probers = [('header', _fast_duration), ('mutagen', _mutagen_duration)]
+        if options['decode']:
+            probers.append(('pydub', _pydub_duration))
+
+        durations = {}
+        for label, func in probers:
+            results, elapsed = self.run(func, files, options['repeat'])
+            durations[label] = results
+            per_file = elapsed / (len(files) * options['repeat'])
+            self.stdout.write(
+                f'{label:>8}: {per_file * 1000:8.3f} ms/file  '
+                f'{1 / per_file if per_file else 0:10.0f} files/s  '
+                f'{sum(d is not None for d in results)}/{len(files)} with duration'
+            )
+
+        # Agreement of the header prober with the others
+        for label, results in durations.items():
+            if label == 'header':
+                continue
+            diffs = [abs(a - b) for a, b in zip(durations['header'], results)
+                     if a is not None and b is not None]
+            if diffs:
+                self.stdout.write(f'header vs {label}: max difference {max(diffs):.3f}s over {len(diffs)} files')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def collect_files(self, paths):
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(os.path.join(root, name) for name in sorted(names)
+                                 if name.lower().endswith(AUDIO_EXTENSIONS))
+            elif os.path.isfile(path):
+                files.append(path)
+        return files
+
+    def run(self, func, files, repeat):
+        results = []
+        start = time.perf_counter()
+        for _ in range(repeat):
+            results = []
+            for path in files:
+                try:
+                    results.append(func(path))
+                except Exception:
+                    results.append(None)
+        return results, time.perf_counter() - start
@@ -0,0 +1,65 @@
+import tempfile
+import time
+import uuid
+import numpy as np
+from django.core.management.base import BaseCommand
+from core.embeddings import EMBEDDING_DIM
+from core.vector_index import DEFAULT_NPROBE, VectorIndex
+
+
+class Command(BaseCommand):
+    help = 'Time exact and IVF similarity search on a synthetic index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                          help='Vectors in the synthetic index (default: 1,000,000)')
+        parser.add_argument('--queries', type=int, default=200,
+                          help='Queries per measurement (default: 200)')
+        parser.add_argument('--k', type=int, default=20)
+        parser.add_argument('--nprobe', type=int, default=DEFAULT_NPROBE)
+        parser.add_argument('--nlist', type=int, default=None,
+                          help='IVF clusters (default: sqrt(rows))')
+
+    def handle(self, *args, **options):
+        rows, k = options['rows'], options['k']
+        rng = np.random.default_rng(0)
+
+        # Clustered data, like embeddings of recordings from similar settings
+        self.stdout.write(f'Generating {rows} x {EMBEDDING_DIM} embeddings')
+        centers = rng.normal(size=(max(1, rows // 500), EMBEDDING_DIM)).astype(np.float32)
+        raw = centers[rng.integers(0, len(centers), rows)]
+        raw += 0.5 * rng.standard_normal(raw.shape, dtype=np.float32)
+        ids = [uuid.UUID(int=i + 1) for i in range(rows)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            index = VectorIndex(directory)
+            started = time.perf_counter()
+            meta = index.build(ids, raw, nlist=options['nlist'])
+            self.stdout.write(f'Built index with {meta["nlist"]} IVF clusters in {time.perf_counter() - started:.1f}s')
+            del raw
+            index.open()
+
+            queries = np.array(index._state.vectors[rng.integers(0, rows, options['queries'])])
+            exact_rows, exact_ms = self.measure(index, queries, k, 0)
+            self.report('exact, one query at a time', exact_ms)
+            _, batch_ms = self.measure(index, queries, k, 0, batch=True)
+            self.report('exact, batched', batch_ms)
+
+            if meta['nlist']:
+                ivf_rows, ivf_ms = self.measure(index, queries, k, options['nprobe'])
+                recall = np.mean([
+                    len(set(a) & set(b)) / k for a, b in zip(ivf_rows, exact_rows)
+                ])
+                self.report(f'IVF nprobe={options["nprobe"]}', ivf_ms, f', recall@{k} {recall:.3f}')
+
+    def measure(self, index, queries, k, nprobe, batch=False):
+        """Result rows and milliseconds per query"""
+        started = time.perf_counter()
+        if batch:
+            rows, _ = index.search(queries, k, nprobe)
+        else:
+            rows = np.vstack([index.search(query[None], k, nprobe)[0] for query in queries])
+        return rows, (time.perf_counter() - started) * 1000 / len(queries)
+
+    def report(self, label, ms, extra=''):
+        self.stdout.write(self.style.SUCCESS(f'{label:32s} {ms:8.2f} ms/query{extra}'))
@@ -18,6 +18,7 @@ class Command(BaseCommand):
             self.check_cache,
             self.check_media_directory,
             self.check_logs_directory,
+            self.check_job_queue,
         ]
         
         results = []
@@ -73,10 +74,16 @@ class Command(BaseCommand):
             cache.delete(test_key)
             
             if retrieved == test_value:
+                from core.response_cache import counters
+                import recordings.views  # noqa: F401  registers the cached views
+                usage = ', '.join(
+                    f"{family} {stats['hits']}/{stats['hits'] + stats['misses']} hits"
+                    for family, stats in counters().items()
+                )
                 return {
                     'name': 'Cache',
                     'status': True,
-                    'message': 'Working correctly'
+                    'message': f'Working correctly ({usage})' if usage else 'Working correctly'
                 }
             else:
                 return {
@@ -142,3 +149,17 @@ class Command(BaseCommand):
             'status': True,
             'message': f'Accessible and writable: {logs_dir}'
         }
+
+
+    def check_job_queue(self):
+        """Check background job backlog"""
+        from core.models import Job
+        
+        pending = Job.objects.filter(status='pending').count()
+        failed = Job.objects.filter(status='failed').count()
+        
+        return {
+            'name': 'Job Queue',
+            'status': failed == 0,
+            'message': f'{pending} pending, {failed} failed (run: python manage.py run_workers)'
+        }
@@ -0,0 +1,67 @@
+"""
+Background job worker pool
+"""
+import multiprocessing
+import signal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def worker_main(poll_interval, once):
+    """Entry point of one worker process"""
+    import django
+    django.setup()
+    # Let the parent decide when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from core.jobs import autodiscover, work
+    autodiscover()
+    work(poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (duration fallback, audio analysis) in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOB_WORKERS,
+                          help=f'Number of worker processes (default: {settings.JOB_WORKERS})')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                          help='Seconds to wait when the queue is empty (default: 1.0)')
+        parser.add_argument('--once', action='store_true',
+                          help='Exit once no due jobs are left, e.g. when run from cron')
+
+    def handle(self, *args, **options):
+        from core.jobs import purge_finished_jobs, release_stale_jobs
+        
+        released = release_stale_jobs()
+        if released:
+            self.stdout.write(self.style.WARNING(f'Re-queued {released} jobs from dead workers'))
+        purge_finished_jobs()
+        
+        worker_count = max(1, options['workers'])
+        self.stdout.write(f'Starting {worker_count} worker(s)')
+        
+        # Child processes must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=worker_main,
+                args=(options['poll_interval'], options['once']),
+                name=f'worker-{i + 1}',
+            )
+            for i in range(worker_count)
+        ]
+        for process in processes:
+            process.start()
+        
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping workers...')
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+        
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
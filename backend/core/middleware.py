@@ -49,20 +49,23 @@ class RateLimitMiddleware(MiddlewareMixin):
         client_ip = self.get_client_ip(request)
         cache_key = f"rate_limit_{client_ip}"
         
-        # Get current request count
-        request_count = cache.get(cache_key, 0)
+        # Count this request; incr is atomic, so concurrent workers cannot lose counts
+        cache.add(cache_key, 0, 3600)  # 1 hour window from the first request
+        try:
+            request_count = cache.incr(cache_key)
+        except ValueError:
+            # Expired between add and incr
+            cache.set(cache_key, 1, 3600)
+            request_count = 1
         
         # Rate limit: 100 requests per hour
-        if request_count >= 100:
+        if request_count > 100:
             return JsonResponse({
                 'error': True,
                 'message': 'Rate limit exceeded. Please try again later.',
                 'code': 'RATE_LIMIT_EXCEEDED'
             }, status=429)
         
-        # Increment counter
-        cache.set(cache_key, request_count + 1, 3600)  # 1 hour
-        
         return None
     
     def get_client_ip(self, request):
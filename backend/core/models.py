@@ -0,0 +1,72 @@
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+class AudioBlobManager(models.Manager):
+    """Reference counting for content-addressed audio blobs"""
+
+    def acquire(self, sha256):
+        """Add a reference to an existing blob, returning it or None"""
+        if self.filter(sha256=sha256).update(ref_count=F('ref_count') + 1):
+            return self.get(sha256=sha256)
+        return None
+
+    def release(self, sha256):
+        """Drop a reference, returning the blob if nothing uses it any more"""
+        self.filter(sha256=sha256, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        return self.filter(sha256=sha256, ref_count__lte=0).first()
+
+
+class AudioBlob(models.Model):
+    """A stored audio file, keyed by the SHA-256 of its content"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)  # path in default storage
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AudioBlobManager()
+
+    class Meta:
+        verbose_name = 'Audio Blob'
+        verbose_name_plural = 'Audio Blobs'
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+class Job(models.Model):
+    """A unit of background work run by `manage.py run_workers`"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)  # registered task name
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='core_job_status_run_after'),
+        ]
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,45 @@
+"""
+Audio quality metrics.
+Peak level, clipping, silence and a noise-floor SNR estimate, computed over
+all samples and 25 ms frames at once so they are cheap enough to run for
+every upload. Files are measured at their own sample rate so resampling
+cannot hide or invent clipping.
+"""
+from typing import Dict
+import numpy as np
+from .audio_decode import load_pcm
+from .features import frame_signal
+from .segmentation import EPSILON, SAMPLE_RATE, FRAME_LENGTH, HOP_LENGTH, frame_energy_db
+
+CLIP_LEVEL = 0.99  # |sample| at or above this counts as clipped
+SILENCE_DBFS = -60.0  # frames quieter than this are silent
+NOISE_PERCENTILE = 10  # noise floor estimate, as in core.segmentation
+SIGNAL_PERCENTILE = 95  # signal level estimate
+
+# CoughRecording columns filled from measure_samples
+METRIC_FIELDS = ('peak_db', 'clipping_ratio', 'silence_ratio', 'snr_db')
+
+
+def measure_samples(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Dict[str, float]:
+    """Quality metrics of mono float samples in -1..1"""
+    magnitude = np.abs(samples)
+    # 25 ms frames every 10 ms at any rate
+    scale = sample_rate / SAMPLE_RATE
+    frames = frame_signal(samples, max(1, int(FRAME_LENGTH * scale)), max(1, int(HOP_LENGTH * scale)))
+    energy = frame_energy_db(frames)
+    noise, signal = np.percentile(energy, [NOISE_PERCENTILE, SIGNAL_PERCENTILE])
+    return {
+        'peak_db': round(float(20.0 * np.log10(magnitude.max(initial=0.0) + EPSILON)), 1),
+        'clipping_ratio': round(float(np.count_nonzero(magnitude >= CLIP_LEVEL) / max(samples.size, 1)), 5),
+        'silence_ratio': round(float(np.count_nonzero(energy < SILENCE_DBFS) / energy.size), 4),
+        'snr_db': round(float(signal - noise), 1),
+    }
+
+
+def measure_file(path: str) -> Dict[str, float]:
+    """
+    Decode and measure one file.
+    Needs no Django state, so it can run in a process pool.
+    """
+    samples, rate = load_pcm(path)
+    return measure_samples(samples, rate)
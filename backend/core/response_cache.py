@@ -0,0 +1,112 @@
+"""
+Response caching with namespaced, generation-versioned keys.
+Every cached response is stored under the current generations of the
+namespaces it depends on (e.g. `recordings`, `recording:<id>`,
+`user:<id>`, `stats`). A write bumps only the namespaces it touches, so
+old entries are never read again and expire on their own, while other
+entries and unrelated keys such as rate-limit counters stay cached.
+"""
+import hashlib
+import time
+from functools import wraps
+from typing import Callable, Dict, Iterable, List
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+PREFIX = 'rc'
+
+# Families of cached views, for the hit/miss report
+_families: List[str] = []
+
+
+def _generation_key(namespace: str) -> str:
+    return f'{PREFIX}:gen:{namespace}'
+
+
+def _counter_key(family: str, outcome: str) -> str:
+    return f'{PREFIX}:count:{family}:{outcome}'
+
+
+def generations(namespaces: Iterable[str]) -> List[int]:
+    """Current generation of each namespace, starting unknown ones"""
+    namespaces = list(namespaces)
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # A clock value, not 1: a generation key lost to eviction must not
+            # come back with a number older entries were stored under
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*namespaces: str) -> None:
+    """Invalidate every response cached under any of the namespaces"""
+    for namespace in dict.fromkeys(namespaces):
+        key = _generation_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def _count(family: str, outcome: str) -> None:
+    key = _counter_key(family, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def counters() -> Dict[str, Dict[str, float]]:
+    """{family: {'hits', 'misses', 'hit_rate'}} of the cached views since the counters started"""
+    keys = {family: (_counter_key(family, 'hit'), _counter_key(family, 'miss')) for family in _families}
+    values = cache.get_many([key for pair in keys.values() for key in pair])
+    report = {}
+    for family, (hit_key, miss_key) in keys.items():
+        hits, misses = values.get(hit_key, 0), values.get(miss_key, 0)
+        report[family] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        }
+    return report
+
+
+def cache_response(family: str, namespaces: Callable[..., List[str]] = None, timeout: int = None):
+    """
+    Cache successful GET responses of a DRF view, counted under `family`.
+    `namespaces(request, *args, **kwargs)` lists the namespaces the
+    response depends on (default: just `family`). Use with
+    method_decorator for class-based views.
+    """
+    if family not in _families:
+        _families.append(family)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not settings.RESPONSE_CACHE_TIMEOUT:
+                return view(request, *args, **kwargs)
+            names = namespaces(request, *args, **kwargs) if namespaces else [family]
+            digest = hashlib.blake2b(repr((
+                request.get_host(), request.get_full_path(), names, generations(names),
+            )).encode(), digest_size=16).hexdigest()
+            key = f'{PREFIX}:{family}:{digest}'
+
+            data = cache.get(key)
+            if data is not None:
+                _count(family, 'hit')
+                return Response(data)
+            _count(family, 'miss')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout or settings.RESPONSE_CACHE_TIMEOUT)
+            return response
+
+        return wrapper
+
+    return decorator
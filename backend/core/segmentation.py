@@ -0,0 +1,102 @@
+"""
+Cough event segmentation.
+Short-time energy and spectral flux are computed for all frames at once;
+events are runs of frames above an adaptive energy threshold, and each
+event's onset is the strongest spectral flux near its start.
+"""
+from typing import Dict, List
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .audio_decode import load_pcm
+from .features import frame_signal
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400  # 25 ms
+HOP_LENGTH = 160  # 10 ms
+FLOOR_PERCENTILE = 10  # noise floor estimate
+SUSTAIN_DB = 8.0  # frames this far above the floor belong to an event
+TRIGGER_DB = 15.0  # an event must reach this far above the floor somewhere
+MIN_TRIGGER_DBFS = -50.0  # and be louder than this in absolute terms
+MERGE_GAP = 0.05  # seconds; shorter pauses do not split an event
+MIN_EVENT = 0.05  # seconds
+ONSET_WINDOW = 0.1  # seconds after the start searched for the onset
+EPSILON = 1e-10
+
+
+def frame_energy_db(frames: np.ndarray) -> np.ndarray:
+    """Mean power of each frame in dBFS"""
+    return 10.0 * np.log10(np.mean(frames.astype(np.float64) ** 2, axis=1) + EPSILON)
+
+
+def spectral_flux(frames: np.ndarray) -> np.ndarray:
+    """Summed positive change of the magnitude spectrum between consecutive frames"""
+    magnitude = np.abs(np.fft.rfft(frames * np.hanning(frames.shape[1]), axis=1))
+    flux = np.maximum(np.diff(magnitude, axis=0, prepend=magnitude[:1]), 0.0).sum(axis=1)
+    return flux / (magnitude.sum(axis=1) + EPSILON)
+
+
+def segment_samples(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Dict[str, float]]:
+    """Cough events as dicts with start, end, onset (seconds) and peak_db"""
+    frames = frame_signal(samples, FRAME_LENGTH, HOP_LENGTH)
+    energy = frame_energy_db(frames)
+    flux = spectral_flux(frames)
+
+    floor = np.percentile(energy, FLOOR_PERCENTILE)
+    active = energy > floor + SUSTAIN_DB
+
+    # Runs of active frames as [start, end) frame indices
+    edges = np.diff(np.concatenate([[0], active.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if starts.size == 0:
+        return []
+
+    # Merge runs separated by short pauses
+    frames_per_second = sample_rate / HOP_LENGTH
+    keep = (starts[1:] - ends[:-1]) >= MERGE_GAP * frames_per_second
+    starts = np.concatenate([starts[:1], starts[1:][keep]])
+    ends = np.concatenate([ends[:-1][keep], ends[-1:]])
+
+    # Loudest frame of every run; energy gets one padding frame so that a
+    # run ending at the last frame still has a valid reduceat boundary
+    padded = np.append(energy, -np.inf)
+    bounds = np.empty(starts.size * 2, dtype=np.int64)
+    bounds[0::2] = starts
+    bounds[1::2] = ends
+    peaks = np.maximum.reduceat(padded, bounds)[0::2]
+
+    lengths = ends - starts
+    valid = ((peaks >= floor + TRIGGER_DB) & (peaks >= MIN_TRIGGER_DBFS)
+             & (lengths >= MIN_EVENT * frames_per_second))
+    starts, ends, peaks = starts[valid], ends[valid], peaks[valid]
+    if starts.size == 0:
+        return []
+
+    # Onset: strongest flux within ONSET_WINDOW of each start, inside the event
+    window = max(1, int(ONSET_WINDOW * frames_per_second))
+    padded_flux = np.append(flux, np.zeros(window))
+    candidates = sliding_window_view(padded_flux, window)[starts].copy()
+    candidates[np.arange(window)[None, :] >= (ends - starts)[:, None]] = -np.inf
+    onsets = starts + np.argmax(candidates, axis=1)
+
+    hop = HOP_LENGTH / sample_rate
+    frame_duration = FRAME_LENGTH / sample_rate
+    duration = samples.size / sample_rate
+    return [
+        {
+            'start': round(float(start * hop), 3),
+            'end': round(float(min((end - 1) * hop + frame_duration, duration)), 3),
+            'onset': round(float(onset * hop), 3),
+            'peak_db': round(float(peak), 1),
+        }
+        for start, end, onset, peak in zip(starts, ends, onsets, peaks)
+    ]
+
+
+def segment_file(path: str) -> List[Dict[str, float]]:
+    """
+    Decode and segment one file.
+    Needs no Django state, so it can run in a process pool.
+    """
+    samples, _ = load_pcm(path, SAMPLE_RATE)
+    return segment_samples(samples)
@@ -0,0 +1,140 @@
+"""
+KLL quantile sketch: a mergeable summary of a stream of numbers.
+Level h holds items that each stand for 2**h inputs. A full level is
+sorted and every other item is promoted to the next level, so the sketch
+keeps O(k log(n/k)) items while rank errors stay around 1.7/k of n. Two
+sketches merge by concatenating their levels and compacting again, so
+batches can be summarised apart and combined.
+"""
+import struct
+from typing import List, Optional, Sequence
+import numpy as np
+
+DEFAULT_K = 400  # about 0.3% worst rank error in a few KB
+DECAY = 2 / 3  # capacity ratio between a level and the one above it
+MIN_CAPACITY = 8
+
+_HEADER = struct.Struct('<HHQdd')  # k, levels, count, min, max
+_rng = np.random.default_rng()
+
+
+class KLLSketch:
+    """Quantiles and histograms of a stream of floats in bounded memory"""
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels: List[np.ndarray] = [np.empty(0, dtype=np.float32)]
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(MIN_CAPACITY, int(np.ceil(self.k * DECAY ** depth)))
+
+    def _compact(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float32))
+                items = np.sort(items)
+                # An odd item out stays on this level
+                kept, items = items[:len(items) % 2], items[len(items) % 2:]
+                # A random half keeps the estimates unbiased; a fixed or
+                # alternating choice skews the tails
+                promoted = items[_rng.integers(2)::2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values: Sequence[float]) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        # Large batches are fed in capacity-sized steps so every level stays bounded
+        step = max(self.k, 1)
+        for start in range(0, values.size, step):
+            self.levels[0] = np.concatenate([self.levels[0], values[start:start + step].astype(np.float32)])
+            self._compact()
+
+    def merge(self, other: 'KLLSketch') -> None:
+        """Add everything summarised by `other` to this sketch"""
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float32))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compact()
+
+    def _weighted(self):
+        """Sorted items, each one's estimated rank (the middle of the inputs it stands for) and the total"""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_), 2 ** level, dtype=np.int64)
+                                  for level, items_ in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        weights = weights[order]
+        cumulative = np.cumsum(weights)
+        return items[order].astype(np.float64), cumulative - weights / 2, cumulative[-1]
+
+    def rank(self, values: Sequence[float]) -> np.ndarray:
+        """Estimated number of inputs below each value"""
+        if self.count == 0:
+            return np.zeros(len(values))
+        items, ranks, total = self._weighted()
+        ranks = np.concatenate([[0.0], ranks, [float(total)]])
+        points = np.concatenate([[self.min], items, [self.max]])
+        # Scaled to the exact count, which compaction rounds
+        return np.interp(np.asarray(values, dtype=np.float64), points, ranks) * (self.count / total)
+
+    def quantiles(self, qs: Sequence[float]) -> Optional[List[float]]:
+        """Estimated values at the given ranks in [0, 1]; None for an empty sketch"""
+        if self.count == 0:
+            return None
+        items, ranks, total = self._weighted()
+        ranks = np.concatenate([[0.0], ranks, [float(total)]])
+        points = np.concatenate([[self.min], items, [self.max]])
+        values = np.interp(np.clip(np.asarray(qs, dtype=np.float64), 0, 1) * total, ranks, points)
+        return [float(value) for value in values]
+
+    def histogram(self, bins: int = 20):
+        """(edges, counts) of `bins` equal-width buckets from min to max, counts estimated"""
+        if self.count == 0:
+            return [], []
+        edges = np.linspace(self.min, self.max, bins + 1)
+        ranks = self.rank(edges)
+        ranks[0], ranks[-1] = 0, self.count
+        counts = np.diff(np.round(ranks)).astype(np.int64)
+        return [float(edge) for edge in edges], [int(count) for count in counts]
+
+    def to_bytes(self) -> bytes:
+        lengths = [len(items) for items in self.levels]
+        return b''.join([
+            _HEADER.pack(self.k, len(self.levels), self.count, self.min, self.max),
+            np.asarray(lengths, dtype='<u4').tobytes(),
+            np.concatenate(self.levels).astype('<f4').tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data) -> 'KLLSketch':
+        data = bytes(data)
+        k, levels, count, minimum, maximum = _HEADER.unpack_from(data)
+        offset = _HEADER.size
+        lengths = np.frombuffer(data, dtype='<u4', count=levels, offset=offset)
+        offset += 4 * levels
+        items = np.frombuffer(data, dtype='<f4', offset=offset).astype(np.float32)
+
+        sketch = cls(k)
+        sketch.count, sketch.min, sketch.max = count, minimum, maximum
+        bounds = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        sketch.levels = [items[bounds[level]:bounds[level + 1]].copy() for level in range(levels)]
+        return sketch
@@ -0,0 +1,216 @@
+"""
+Cache backend shared by all processes on one host, stored in a SQLite
+file in WAL mode: readers never block and writers only briefly block each
+other, so gunicorn workers see one cache without a separate server.
+
+Integers are stored as SQLite integers so `incr` is one atomic UPDATE on
+SQLite 3.35+ (a locked SELECT and UPDATE before that); other values are
+pickled. Expired rows are ignored when read and purged with the least
+recently used rows whenever the table grows past MAX_ENTRIES (checked
+every CULL_EVERY writes per process).
+
+    CACHES = {'default': {
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': '/path/to/cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }}
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+"""
+ACCESS_RESOLUTION = 1.0  # seconds; reads refresh the LRU time at most this often
+CULL_EVERY = 100
+# UPDATE ... RETURNING needs SQLite 3.35; Django supports 3.31 and up
+RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+
+def _dump(value):
+    # bool is an int subclass but must come back as a bool
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _load(value):
+    return value if isinstance(value, int) else pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = str(location)
+        self._local = threading.local()
+        self._writes = 0
+
+    # Connections
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection; a forked child opens its own"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _written(self, connection, count=1):
+        """Cull after every CULL_EVERY writes of this process"""
+        self._writes += count
+        if self._writes >= CULL_EVERY:
+            self._writes = 0
+            self._cull(connection)
+
+    def _cull(self, connection):
+        now = time.time()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+            (count,) = connection.execute('SELECT COUNT(*) FROM cache').fetchone()
+            if count > self._max_entries:
+                # Down to MAX_ENTRIES minus the CULL_FREQUENCY share, oldest access first
+                excess = count - self._max_entries + self._max_entries // max(self._cull_frequency, 1)
+                connection.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                    (excess,)
+                )
+
+    # Reading
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        names = {self._key(key, version): key for key in keys}
+        connection = self._connection()
+        now = time.time()
+        found, stale = {}, []
+        placeholders = ','.join('?' * len(names))
+        for name, value, accessed in connection.execute(
+            f'SELECT key, value, accessed FROM cache WHERE key IN ({placeholders}) '
+            f'AND (expires IS NULL OR expires > ?)', [*names, now]
+        ):
+            found[names[name]] = _load(value)
+            if now - accessed > ACCESS_RESOLUTION:
+                stale.append(name)
+        if stale:
+            connection.execute(f'UPDATE cache SET accessed = ? WHERE key IN ({",".join("?" * len(stale))})',
+                               [now, *stale])
+        return found
+
+    def has_key(self, key, version=None):
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time())
+        ).fetchone()
+        return row is not None
+
+    # Writing
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        expires, now = self.get_backend_timeout(timeout), time.time()
+        rows = [(self._key(key, version), _dump(value), expires, now) for key, value in data.items()]
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(
+                'INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+                'accessed = excluded.accessed', rows
+            )
+        self._written(connection, len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        expires, now = self.get_backend_timeout(timeout), time.time()
+        connection = self._connection()
+        # An expired row counts as absent
+        cursor = connection.execute(
+            'INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed WHERE cache.expires <= ?',
+            (self._key(key, version), _dump(value), expires, now, now)
+        )
+        self._written(connection)
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, self._key(key, version), now)
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        """Atomic: a single UPDATE for integer values, otherwise a locked read-modify-write"""
+        name, now = self._key(key, version), time.time()
+        connection = self._connection()
+        if RETURNING:
+            # fetchall() runs the statement to completion, which releases the write lock
+            rows = connection.execute(
+                "UPDATE cache SET value = value + ?, accessed = ? WHERE key = ? "
+                "AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?) RETURNING value",
+                (delta, now, name, now)
+            ).fetchall()
+            if rows:
+                return rows[0][0]
+        # Missing, expired or not an integer, or no RETURNING: SELECT and UPDATE under one write lock
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            found = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (name, now)
+            ).fetchone()
+            if found is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = _load(found[0]) + delta
+            connection.execute('UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                               (_dump(value), now, name))
+        return value
+
+    def delete(self, key, version=None):
+        cursor = self._connection().execute('DELETE FROM cache WHERE key = ?', (self._key(key, version),))
+        return cursor.rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        names = [self._key(key, version) for key in keys]
+        if names:
+            self._connection().execute(f'DELETE FROM cache WHERE key IN ({",".join("?" * len(names))})', names)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are reused across requests, like the database's persistent ones
+        pass
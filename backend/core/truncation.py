@@ -0,0 +1,192 @@
+"""
+Server-side enforcement of the maximum recording duration.
+Only the first MAX_RECORDING_DURATION seconds of an upload are stored.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from typing import Optional
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 64 * 1024
+SEEKABLE_INPUT_FORMATS = ('m4a', 'mp4')
+
+
+class TruncatedUpload(UploadedFile):
+    """
+    The cut audio in a temporary file. Storage moves it into place like a
+    temporary upload; closing it removes the file if it is still there.
+    """
+
+    def __init__(self, path, name, content_type, sha256):
+        super().__init__(open(path, 'rb'), name, content_type, os.path.getsize(path))
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        try:
+            self.file.close()
+        finally:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class _HashingWriter:
+    """Write to a file while computing the SHA-256 of everything written"""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.f.write(data)
+
+
+def truncate_upload(upload, duration: Optional[float],
+                    max_duration: Optional[float] = None) -> Optional[TruncatedUpload]:
+    """
+    Cut an upload whose probed `duration` exceeds the limit.
+    PCM WAV is cut at a byte offset; other formats are stream-copied by
+    ffmpeg, which stops reading at the limit and is killed after
+    TRUNCATION_TIMEOUT seconds. Returns a TruncatedUpload, or None when the
+    upload is short enough or cannot be cut here.
+    """
+    max_duration = max_duration or settings.MAX_RECORDING_DURATION
+    if not duration or duration <= max_duration:
+        return None
+
+    ext = os.path.basename(upload.name).split('.')[-1].lower()
+    source = upload.file if hasattr(upload, 'file') else upload
+    fd, path = tempfile.mkstemp(suffix=f'.{ext}', dir=settings.FILE_UPLOAD_TEMP_DIR)
+    os.close(fd)
+    try:
+        sha256 = _cut_wav(source, path, max_duration)
+        if sha256 is None:
+            sha256 = _cut_with_ffmpeg(upload, source, path, max_duration)
+    except Exception as e:
+        logger.warning(f"Truncating {upload.name} failed, storing it whole: {e}")
+        sha256 = None
+    finally:
+        source.seek(0)
+
+    if sha256 is None:
+        os.remove(path)
+        return None
+    logger.info(f"Truncated {upload.name} from {duration:.2f}s to {max_duration}s")
+    return TruncatedUpload(path, upload.name, getattr(upload, 'content_type', None), sha256)
+
+
+def _cut_wav(source, path, max_duration) -> Optional[str]:
+    """Copy the header and the first max_duration seconds of PCM data"""
+    source.seek(0)
+    riff = source.read(12)
+    if riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        return None
+
+    chunks = []  # (header, body) of every chunk before the data chunk
+    block_align = byte_rate = None
+    while True:
+        header = source.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+        if chunk_id == b'data':
+            break
+        body = source.read(chunk_size + (chunk_size & 1))
+        if chunk_id == b'fmt ':
+            audio_format, _, _, byte_rate, block_align = struct.unpack('<HHIIH', body[:14])
+            # Compressed WAV codecs cannot be cut at an arbitrary byte
+            if audio_format not in (1, 3, 0xFFFE):
+                return None
+        chunks.append((header, body))
+    if not byte_rate or not block_align:
+        return None
+
+    data_size = int(max_duration * byte_rate) // block_align * block_align
+    if chunk_size not in (0, 0xFFFFFFFF):
+        data_size = min(data_size, chunk_size // block_align * block_align)
+    header_size = sum(len(header) + len(body) for header, body in chunks)
+
+    with open(path, 'wb') as f:
+        out = _HashingWriter(f)
+        out.write(b'RIFF' + struct.pack('<I', 4 + header_size + 8 + data_size) + b'WAVE')
+        for header, body in chunks:
+            out.write(header + body)
+        out.write(b'data' + struct.pack('<I', data_size))
+        remaining = data_size
+        while remaining:
+            data = source.read(min(COPY_CHUNK_SIZE, remaining))
+            if not data:
+                raise ValueError('WAV data ends before the cut point')
+            out.write(data)
+            remaining -= len(data)
+    return out.sha256.hexdigest()
+
+
+def _cut_with_ffmpeg(upload, source, path, max_duration) -> Optional[str]:
+    """Stream-copy the first max_duration seconds into `path` with ffmpeg"""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        logger.warning(f"ffmpeg not found, {upload.name} is stored untruncated")
+        return None
+
+    ext = os.path.splitext(path)[1].lstrip('.')
+    input_path = upload.temporary_file_path() if hasattr(upload, 'temporary_file_path') else None
+    spooled_input = None
+    if input_path is None and ext in SEEKABLE_INPUT_FORMATS:
+        # MP4 may keep its index at the end, so ffmpeg needs a seekable file
+        spooled_input = tempfile.NamedTemporaryFile(suffix=f'.{ext}', dir=settings.FILE_UPLOAD_TEMP_DIR)
+        source.seek(0)
+        shutil.copyfileobj(source, spooled_input, COPY_CHUNK_SIZE)
+        spooled_input.flush()
+        input_path = spooled_input.name
+
+    command = [ffmpeg, '-v', 'error', '-nostdin', '-y', '-i', input_path or 'pipe:0',
+               '-t', str(max_duration), '-map', '0:a:0', '-c', 'copy', path]
+    try:
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdin=None if input_path else subprocess.PIPE, stderr=stderr)
+            # A malformed file must not hold the request, also not while it is fed to ffmpeg
+            timed_out = threading.Event()
+            deadline = threading.Timer(settings.TRUNCATION_TIMEOUT, lambda: (timed_out.set(), process.kill()))
+            deadline.start()
+            try:
+                if not input_path:
+                    # ffmpeg reads the upload as a stream and quits at the cut point
+                    source.seek(0)
+                    try:
+                        for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b''):
+                            process.stdin.write(chunk)
+                        process.stdin.close()
+                    except BrokenPipeError:
+                        pass  # ffmpeg already has everything up to the cut
+                process.wait()
+            finally:
+                deadline.cancel()
+
+            if timed_out.is_set():
+                raise subprocess.TimeoutExpired(command, settings.TRUNCATION_TIMEOUT)
+            if process.returncode != 0:
+                stderr.seek(0)
+                raise RuntimeError(stderr.read().decode(errors='replace').strip())
+    finally:
+        if spooled_input is not None:
+            spooled_input.close()
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
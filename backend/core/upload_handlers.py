@@ -0,0 +1,38 @@
+"""
+Upload handlers that hash request bodies while Django receives them
+"""
+import hashlib
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+
+class DigestMixin:
+    """Compute the SHA-256 of each uploaded file as its chunks arrive"""
+
+    def new_file(self, *args, **kwargs):
+        # Set up before super(), which may raise StopFutureHandlers
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remainder = super().receive_data_chunk(raw_data, start)
+        # A handler returns None once it has taken ownership of the chunk
+        if remainder is None:
+            self.sha256.update(raw_data)
+        return remainder
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+class DigestMemoryFileUploadHandler(DigestMixin, MemoryFileUploadHandler):
+    """In-memory upload handler that records a SHA-256 digest"""
+
+
+class DigestTemporaryFileUploadHandler(DigestMixin, TemporaryFileUploadHandler):
+    """Temporary-file upload handler that records a SHA-256 digest"""
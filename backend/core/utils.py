@@ -106,12 +106,22 @@ class AudioMetadataExtractor:
             'format': None
         }
         
+        from .audio_probe import probe_path
         try:
-            # Try with mutagen first
+            fast = probe_path(file_path)
+        except OSError as e:
+            logger.warning(f"Header probe failed: {e}")
+            fast = None
+        if fast is not None and fast['duration']:
+            metadata.update(fast)
+            return metadata
+
+        try:
+            # Try with mutagen next
             from mutagen import File as MutagenFile
             audio_file = MutagenFile(file_path)
             
-            if audio_file and hasattr(audio_file, 'info'):
+            if audio_file is not None and hasattr(audio_file, 'info'):
                 info = audio_file.info
                 metadata.update({
                     'duration': getattr(info, 'length', None),
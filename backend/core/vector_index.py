@@ -0,0 +1,372 @@
+"""
+In-process vector index for similarity search over recording embeddings.
+Embeddings are standardised with corpus statistics and L2-normalised, so a
+dot product is cosine similarity. They are kept in one contiguous float32
+matrix that every process memory-maps; a search is a few batched matrix
+products over it.
+
+Large indexes get an IVF coarse quantizer: at build time the vectors are
+clustered with spherical k-means and stored grouped by cluster, so a query
+only scans the `nprobe` clusters closest to it. Vectors added after the
+build go to an unclustered tail that is always scanned in full; deletions
+are tombstones. `manage.py build_vector_index` folds both back in.
+
+Files in VECTOR_INDEX_DIR; the numbered files of one build form a
+generation that is never rewritten, only appended to:
+    meta.json            generation, row counts, normalisation, tombstones
+    vectors-<gen>.f32    (count, dim) float32, rows [0, built) grouped by cluster
+    ids-<gen>.bin        16-byte recording UUID per row
+    ivf-<gen>.npz        centroids and per-cluster row offsets
+"""
+import json
+import os
+import uuid
+from types import SimpleNamespace
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from django.conf import settings
+from .filelock import FileLock
+
+META_NAME = 'meta.json'
+INDEX_VERSION = 1
+IVF_MIN_ROWS = 50000  # below this a full scan takes a few milliseconds anyway
+STATS_MIN_ROWS = 8  # fewer rows are only length-normalised
+DEFAULT_NPROBE = 16
+KMEANS_ITERATIONS = 10
+TRAIN_PER_LIST = 64  # k-means sample size per cluster
+CHUNK_ROWS = 262144  # rows scored per matrix product
+
+
+def _id_array(recording_ids) -> np.ndarray:
+    """Recording UUIDs as rows of two uint64, the on-disk id format"""
+    packed = b''.join(uuid.UUID(str(rid)).bytes for rid in recording_ids)
+    return np.frombuffer(packed, dtype=np.uint64).reshape(-1, 2)
+
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best k (scores, rows) per query row, unordered"""
+    if scores.shape[1] <= k:
+        return scores, rows
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, best, axis=1), np.take_along_axis(rows, best, axis=1)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for every vector"""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        chunk = vectors[start:start + CHUNK_ROWS]
+        assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Unit-length centroids of `nlist` clusters, trained on a sample"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * TRAIN_PER_LIST)
+    sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        # Empty clusters restart from random sample points
+        empty = np.bincount(assignment, minlength=nlist) == 0
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class VectorIndex:
+    """Embedding index in `directory` (default VECTOR_INDEX_DIR)"""
+
+    def __init__(self, directory=None):
+        self.directory = str(directory or settings.VECTOR_INDEX_DIR)
+        self.meta_path = os.path.join(self.directory, META_NAME)
+        self.lock_path = os.path.join(self.directory, '.lock')
+        self._state = None
+
+    def _path(self, kind: str, generation: int) -> str:
+        extension = {'vectors': 'f32', 'ids': 'bin', 'ivf': 'npz'}[kind]
+        return os.path.join(self.directory, f'{kind}-{generation}.{extension}')
+
+    def load_meta(self) -> Optional[dict]:
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path)
+
+    # Reading
+
+    def open(self) -> bool:
+        """
+        Memory-map the current state; cheap when nothing changed since the
+        last call. Returns False if no index has been built.
+        """
+        try:
+            stat = os.stat(self.meta_path)
+        except FileNotFoundError:
+            self._state = None
+            return False
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if self._state is not None and self._state.key == key:
+            return True
+
+        meta = self.load_meta()
+        if meta is None:
+            self._state = None
+            return False
+        count, dim, generation = meta['count'], meta['dim'], meta['generation']
+        if count:
+            vectors = np.memmap(self._path('vectors', generation), dtype=np.float32, mode='r',
+                                shape=(count, dim))
+            ids = np.memmap(self._path('ids', generation), dtype=np.uint64, mode='r', shape=(count, 2))
+        else:
+            vectors = np.empty((0, dim), dtype=np.float32)
+            ids = np.empty((0, 2), dtype=np.uint64)
+        centroids = offsets = None
+        if meta['nlist']:
+            with np.load(self._path('ivf', generation)) as ivf:
+                centroids, offsets = ivf['centroids'], ivf['offsets']
+        deleted = np.zeros(count, dtype=bool)
+        deleted[meta['deleted']] = True
+
+        # Readers take one consistent snapshot, so swapping it is thread safe
+        self._state = SimpleNamespace(
+            key=key, meta=meta, vectors=vectors, ids=ids, centroids=centroids, offsets=offsets,
+            deleted=deleted, center=np.asarray(meta['center'], dtype=np.float32),
+            scale=np.asarray(meta['scale'], dtype=np.float32),
+        )
+        return True
+
+    @property
+    def count(self) -> int:
+        """Live vectors"""
+        state = self._state
+        return int(len(state.deleted) - state.deleted.sum()) if state else 0
+
+    def normalize(self, raw: np.ndarray, center=None, scale=None) -> np.ndarray:
+        """Standardised, unit-length copies of raw embeddings"""
+        if center is None:
+            center, scale = self._state.center, self._state.scale
+        vectors = (np.asarray(raw, dtype=np.float32) - center) / scale
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    def _rows_of(self, state, recording_ids) -> np.ndarray:
+        """Live rows holding any of the given recordings"""
+        keys = _id_array(recording_ids)
+        if not len(keys) or not len(state.ids):
+            return np.empty(0, dtype=np.int64)
+        # One pass over the first id half, then exact checks on the few hits
+        first = state.ids[:, 0]
+        if len(keys) == 1:
+            candidates = np.flatnonzero(first == keys[0, 0])
+        else:
+            candidates = np.flatnonzero(np.isin(first, keys[:, 0]))
+        wanted = {tuple(key) for key in keys.tolist()}
+        return np.array([
+            row for row in candidates
+            if not state.deleted[row] and tuple(state.ids[row].tolist()) in wanted
+        ], dtype=np.int64)
+
+    def vector(self, recording_id) -> Optional[np.ndarray]:
+        """The indexed vector of a recording, or None"""
+        state = self._state
+        if state is None:
+            return None
+        rows = self._rows_of(state, [recording_id])
+        return np.array(state.vectors[rows[-1]]) if len(rows) else None
+
+    def recording_ids(self, rows: Iterable[int]) -> List[uuid.UUID]:
+        ids = self._state.ids
+        return [uuid.UUID(bytes=ids[row].tobytes()) for row in rows]
+
+    def search(self, queries: np.ndarray, k: int, nprobe: int = DEFAULT_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k most similar rows for each normalised query.
+        Returns (rows, scores) of shape (queries, k), best first; rows are
+        -1 where the index holds fewer than k vectors. nprobe=0 scans
+        everything.
+        """
+        state = self._state
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n = len(queries)
+        candidates = [[] for _ in range(n)]
+        # Bound the score matrix of one product to CHUNK_ROWS values per query
+        chunk_rows = max(4096, CHUNK_ROWS // max(1, n // 16))
+
+        def scan(query_index, start, stop):
+            for chunk_start in range(start, stop, chunk_rows):
+                chunk_stop = min(stop, chunk_start + chunk_rows)
+                scores = queries[query_index] @ state.vectors[chunk_start:chunk_stop].T
+                scores[:, state.deleted[chunk_start:chunk_stop]] = -np.inf
+                rows = np.broadcast_to(np.arange(chunk_start, chunk_stop), scores.shape)
+                scores, rows = _top_k(scores, rows, k)
+                for position, query in enumerate(query_index):
+                    candidates[query].append((scores[position], rows[position]))
+
+        everyone = np.arange(n)
+        built, count = state.meta['built'], state.meta['count']
+        if state.centroids is not None and 0 < nprobe < len(state.centroids):
+            # Queries probing the same cluster are scored in one product
+            probes = np.argpartition(-(queries @ state.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+            for cluster in np.unique(probes):
+                start, stop = int(state.offsets[cluster]), int(state.offsets[cluster + 1])
+                if stop > start:
+                    scan(np.flatnonzero((probes == cluster).any(axis=1)), start, stop)
+            scan(everyone, built, count)
+        else:
+            scan(everyone, 0, count)
+
+        best_rows = np.full((n, k), -1, dtype=np.int64)
+        best_scores = np.full((n, k), -np.inf, dtype=np.float32)
+        for query, parts in enumerate(candidates):
+            if not parts:
+                continue
+            scores, rows = _top_k(np.concatenate([p[0] for p in parts])[None],
+                                  np.concatenate([p[1] for p in parts])[None], k)
+            order = np.argsort(-scores[0], kind='stable')
+            best_scores[query, :len(order)] = scores[0][order]
+            best_rows[query, :len(order)] = rows[0][order]
+        best_rows[~np.isfinite(best_scores)] = -1
+        return best_rows, best_scores
+
+    # Writing
+
+    def build(self, recording_ids, raw: np.ndarray, nlist: Optional[int] = None) -> dict:
+        """
+        Replace the index with the given raw embeddings. nlist defaults to
+        sqrt(rows) clusters from IVF_MIN_ROWS rows on, else no IVF.
+        Returns the new meta.
+        """
+        raw = np.asarray(raw, dtype=np.float32).reshape(len(recording_ids), -1)
+        dim = raw.shape[1]
+        if len(raw) >= STATS_MIN_ROWS:
+            center, scale = raw.mean(axis=0), np.maximum(raw.std(axis=0), 1e-3)
+        else:
+            center, scale = np.zeros(dim, dtype=np.float32), np.ones(dim, dtype=np.float32)
+        vectors = self.normalize(raw, center, scale)
+        ids = _id_array(recording_ids)
+
+        if nlist is None:
+            nlist = int(np.sqrt(len(vectors))) if len(vectors) >= IVF_MIN_ROWS else 0
+        nlist = min(nlist, len(vectors))
+        if nlist:
+            centroids = spherical_kmeans(vectors, nlist)
+            assignment = _assign(vectors, centroids)
+            order = np.argsort(assignment, kind='stable')
+            vectors, ids = vectors[order], ids[order]
+            offsets = np.searchsorted(assignment[order], np.arange(nlist + 1)).astype(np.int64)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with FileLock(self.lock_path):
+            previous = self.load_meta()
+            generation = previous['generation'] + 1 if previous else 1
+            vectors.tofile(self._path('vectors', generation))
+            ids.tofile(self._path('ids', generation))
+            if nlist:
+                np.savez(self._path('ivf', generation), centroids=centroids, offsets=offsets)
+            meta = {
+                'version': INDEX_VERSION,
+                'generation': generation,
+                'dim': dim,
+                'count': len(vectors),
+                'built': len(vectors),
+                'nlist': nlist,
+                'center': center.tolist(),
+                'scale': scale.tolist(),
+                'deleted': [],
+            }
+            self._write_meta(meta)
+            # Processes still mapping the old files keep them until they reopen
+            if previous:
+                for kind in ('vectors', 'ids', 'ivf'):
+                    path = self._path(kind, previous['generation'])
+                    if os.path.exists(path):
+                        os.remove(path)
+        return meta
+
+    def add(self, recording_ids, raw: np.ndarray) -> int:
+        """
+        Append raw embeddings to the unclustered tail, replacing earlier
+        vectors of the same recordings. Returns the number added, or -1 if
+        there is no index to add to.
+        """
+        recording_ids = list(recording_ids)
+        if not recording_ids:
+            return 0
+        with FileLock(self.lock_path):
+            if not self.open():
+                return -1
+            state = self._state
+            meta = dict(state.meta)
+            vectors = self.normalize(np.asarray(raw, dtype=np.float32).reshape(len(recording_ids), -1))
+            ids = _id_array(recording_ids)
+            replaced = self._rows_of(state, recording_ids)
+
+            for kind, data, row_size in (('vectors', vectors, meta['dim'] * 4), ('ids', ids, 16)):
+                path = self._path(kind, meta['generation'])
+                with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+                    # Drop rows a crashed writer left past the indexed end
+                    f.truncate(meta['count'] * row_size)
+                    f.seek(0, os.SEEK_END)
+                    f.write(data.tobytes())
+
+            meta['count'] += len(vectors)
+            meta['deleted'] = sorted(set(meta['deleted']) | {int(row) for row in replaced})
+            self._write_meta(meta)
+        return len(vectors)
+
+    def remove(self, recording_ids) -> int:
+        """Tombstone the vectors of deleted recordings; returns how many were removed"""
+        with FileLock(self.lock_path):
+            if not self.open():
+                return 0
+            rows = self._rows_of(self._state, recording_ids)
+            if len(rows):
+                meta = dict(self._state.meta)
+                meta['deleted'] = sorted(set(meta['deleted']) | {int(row) for row in rows})
+                self._write_meta(meta)
+        return len(rows)
+
+    def _write_meta(self, meta: dict) -> None:
+        partial_path = f"{self.meta_path}.{os.getpid()}.part"
+        with open(partial_path, 'w') as f:
+            json.dump(meta, f, separators=(',', ':'))
+        os.replace(partial_path, self.meta_path)
+
+
+_index = None
+
+
+def get_index() -> VectorIndex:
+    """This process's index, memory-mapped once and reopened after updates"""
+    global _index
+    if _index is None:
+        _index = VectorIndex()
+    _index.open()
+    return _index
+
+
+def index_recordings(recording_ids=None) -> int:
+    """
+    Add recordings (default: all) from the feature store to the index.
+    The whole index is rebuilt on first use and whenever the unclustered
+    tail has grown past the clustered part, so statistics and clusters keep
+    up with the data at amortised constant cost per recording. Returns the
+    number of vectors written.
+    """
+    from .embeddings import embed_store
+    from .feature_store import FeatureStore
+    index = VectorIndex()
+    meta = index.load_meta()
+    if meta is not None and meta['count'] < 2 * meta['built']:
+        ids, raw = embed_store(FeatureStore(), recording_ids)
+        return max(index.add(ids, raw), 0)
+    ids, raw = embed_store(FeatureStore())
+    return index.build(ids, raw)['count'] if ids else 0
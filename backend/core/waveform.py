@@ -0,0 +1,67 @@
+"""
+Waveform peak envelopes for playback previews.
+Peaks are keyed by the SHA-256 of the source audio like the canonical
+derivatives, and stored as int8 min/max pairs at a few resolutions.
+"""
+import os
+from typing import Dict
+import numpy as np
+from django.core.files.storage import default_storage
+from .audio_decode import load_pcm
+
+PEAK_RESOLUTIONS = (100, 400, 1600)  # buckets per recording
+DEFAULT_PEAK_RESOLUTION = 400
+
+
+def peaks_path(sha256: str) -> str:
+    """Storage path of the peak envelopes of the given content"""
+    return os.path.join('peaks', sha256[:2], f"{sha256}.npz")
+
+
+def compute_peaks(samples: np.ndarray) -> Dict[int, np.ndarray]:
+    """
+    Min/max envelope of `samples` for every resolution in PEAK_RESOLUTIONS,
+    as (buckets, 2) int8 arrays scaled to [-127, 127].
+    """
+    if samples.size == 0:
+        samples = np.zeros(1, dtype=np.float32)
+    peaks = {}
+    for buckets in PEAK_RESOLUTIONS:
+        # Bucket edges; short recordings repeat samples instead of leaving gaps
+        edges = np.linspace(0, samples.size, buckets + 1).astype(np.int64)[:-1]
+        edges = np.minimum(edges, samples.size - 1)
+        envelope = np.stack([
+            np.minimum.reduceat(samples, edges),
+            np.maximum.reduceat(samples, edges),
+        ], axis=1)
+        peaks[buckets] = np.clip(np.round(envelope * 127), -127, 127).astype(np.int8)
+    return peaks
+
+
+def ensure_peaks(sha256: str, source_name: str) -> str:
+    """Compute and store the peaks of stored audio unless they exist; returns their storage name"""
+    name = peaks_path(sha256)
+    if default_storage.exists(name):
+        return name
+
+    samples, _ = load_pcm(default_storage.path(source_name))
+    peaks = compute_peaks(samples)
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f"{path}.{os.getpid()}.part"
+    with open(partial_path, 'wb') as f:
+        np.savez(f, **{f"p{buckets}": envelope for buckets, envelope in peaks.items()})
+    os.replace(partial_path, path)
+    return name
+
+
+def load_peaks(sha256: str, resolution: int) -> np.ndarray:
+    """The stored (buckets, 2) envelope at one resolution"""
+    with np.load(default_storage.path(peaks_path(sha256))) as data:
+        return data[f"p{resolution}"]
+
+
+def delete_peaks(sha256: str) -> None:
+    """Remove the peaks of content that is no longer stored"""
+    if sha256:
+        default_storage.delete(peaks_path(sha256))
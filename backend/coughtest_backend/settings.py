@@ -87,6 +87,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Web and job worker processes write concurrently; wait for locks
+            'timeout': 20,
+        },
     }
 }
 
@@ -181,23 +185,71 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'content-range',
 ]
+CORS_EXPOSE_HEADERS = ['upload-offset']
 CSRF_TRUSTED_ORIGINS = config.CORS_ORIGINS
 
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = config.MAX_FILE_SIZE
 DATA_UPLOAD_MAX_MEMORY_SIZE = config.MAX_FILE_SIZE
+# Hash uploads while the request body is read so ingest never re-reads them
+FILE_UPLOAD_HANDLERS = [
+    'core.upload_handlers.DigestMemoryFileUploadHandler',
+    'core.upload_handlers.DigestTemporaryFileUploadHandler',
+]
+# Threads used to validate, probe and store files of one bulk upload
+BULK_UPLOAD_WORKERS = 8
+# Partial files of resumable uploads; keep on the same disk as MEDIA_ROOT
+UPLOAD_SPOOL_DIR = BASE_DIR / 'spool'
+# Longer uploads are cut to this many seconds before they are stored
+MAX_RECORDING_DURATION = config.MAX_RECORDING_DURATION
+# Seconds ffmpeg may take to cut one upload; after that it is stored whole
+TRUNCATION_TIMEOUT = 30
+# Memory-mapped log-mel/MFCC matrix and its index (manage.py extract_features)
+FEATURE_STORE_DIR = BASE_DIR / 'feature_store'
+# Memory-mapped embedding index for /api/recordings/similar/ (manage.py build_vector_index)
+VECTOR_INDEX_DIR = BASE_DIR / 'vector_index'
+# Queue a canonical 16 kHz mono FLAC derivative for new uploads (needs ffmpeg)
+CANONICAL_AUDIO_ENABLED = config.CANONICAL_AUDIO_ENABLED
+
+# Background jobs (python manage.py run_workers)
+JOB_WORKERS = config.JOB_WORKERS
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_DELAY = 10  # seconds, doubled after every failed attempt
+JOB_LOCK_TIMEOUT = 600  # seconds before a running job is considered abandoned
+JOB_RETENTION_DAYS = 7
 
 # Custom Exception Handler
 REST_FRAMEWORK['DEFAULT_EXCEPTION_HANDLER'] = 'core.exceptions.custom_exception_handler'
 
-# Caching
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Caching: by default one SQLite file (WAL mode) shared by every worker
+# process on the host, so rate limits and cached responses are global.
+# CACHE_BACKEND=locmem gives each process a private in-memory cache instead.
+if config.CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.sqlite_cache.SQLiteCache',
+            'LOCATION': BASE_DIR / 'cache' / 'cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Seconds list, detail and stats responses stay cached (core.response_cache);
+# writes invalidate them earlier by bumping their namespaces. 0 disables.
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Seconds the recordings change sequence behind list, detail and stats ETags
+# stays cached (recordings.changes); writes through the app refresh it on
+# commit, so this only bounds how long other writers go unnoticed.
+CHANGE_SEQUENCE_CACHE_TIMEOUT = 60
 
 # Logging Configuration
 LOGGING = {
@@ -22,6 +22,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.views.decorators.csrf import csrf_exempt
+from core.response_cache import counters
 
 
 @api_view(['GET'])
@@ -53,10 +54,18 @@ def api_root(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def cache_stats(request):
+    """Response cache hits and misses per namespace family"""
+    return Response({'success': True, 'namespaces': counters()})
+
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', api_root, name='api-root'),
     path('api/health/', lambda request: Response({'status': 'ok'}), name='health-check'),
+    path('api/health/cache/', cache_stats, name='cache-stats'),
     path('api/auth/', include('accounts.urls')),
     path('api/recordings/', include('recordings.urls')),
 ]
@@ -1,10 +1,19 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import CoughRecording
+from .models import CoughRecording, CoughSegment
+
+
+class CoughSegmentInline(admin.TabularInline):
+    model = CoughSegment
+    fields = ['start', 'end', 'onset', 'peak_db']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
 
 
 @admin.register(CoughRecording)
 class CoughRecordingAdmin(admin.ModelAdmin):
+    inlines = [CoughSegmentInline]
     list_display = [
         'recording_id_short', 'user_display_name', 'file_name', 
         'file_size_mb', 'duration', 'recording_method', 'created_at'
@@ -12,8 +21,9 @@ class CoughRecordingAdmin(admin.ModelAdmin):
     list_filter = ['recording_method', 'file_format', 'created_at']
     search_fields = ['user__username', 'anonymous_name', 'file_name', 'recording_id']
     readonly_fields = [
-        'recording_id', 'file_size', 'file_format', 'duration',
-        'sample_rate', 'bit_rate', 'channels', 'created_at', 'uploaded_at'
+        'recording_id', 'file_size', 'file_format', 'duration', 'original_duration',
+        'sample_rate', 'bit_rate', 'channels', 'peak_db', 'clipping_ratio',
+        'silence_ratio', 'snr_db', 'near_duplicate_of', 'created_at', 'uploaded_at'
     ]
     
     fieldsets = (
@@ -21,12 +31,16 @@ class CoughRecordingAdmin(admin.ModelAdmin):
             'fields': ('recording_id', 'user', 'anonymous_name', 'audio_file')
         }),
         ('File Metadata', {
-            'fields': ('file_name', 'file_size', 'file_format', 'duration')
+            'fields': ('file_name', 'file_size', 'file_format', 'duration', 'original_duration',
+                       'near_duplicate_of')
         }),
         ('Audio Technical Details', {
             'fields': ('sample_rate', 'bit_rate', 'channels'),
             'classes': ('collapse',)
         }),
+        ('Audio Quality', {
+            'fields': ('peak_db', 'clipping_ratio', 'silence_ratio', 'snr_db'),
+        }),
         ('Recording Details', {
             'fields': ('recording_method', 'created_at', 'uploaded_at')
         }),
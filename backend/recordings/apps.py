@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    """Restore search triggers dropped by migrations that rebuild the recordings table"""
+    from django.db import connections
+    from . import search
+    search.ensure(connections[using])
 
 
 class RecordingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recordings'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(ensure_search_index, sender=self)
@@ -0,0 +1,123 @@
+"""
+Bulk upload engine: probe files in parallel, insert all rows in one transaction
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import transaction
+from core.ingest import prepare_upload, register_blob, write_blob_file
+from core.models import AudioBlob
+from core.validators import validate_audio_file
+from .models import CoughRecording
+from .signals import recordings_created
+
+logger = logging.getLogger(__name__)
+
+
+def _prepare(audio_file):
+    """Validate, probe, truncate and hash one file; runs in a worker thread"""
+    try:
+        validate_audio_file(audio_file)
+        upload, metadata = prepare_upload(audio_file)
+        return {'file': upload, 'metadata': metadata}
+    except Exception as e:
+        return {'file': audio_file, 'error': e}
+
+
+def _write(item):
+    """Write one new blob file to storage; runs in a worker thread"""
+    try:
+        item['blob_name'] = write_blob_file(item['file'], item['metadata']['file_hash'])
+    except Exception as e:
+        item['error'] = e
+    return item
+
+
+def ingest_files(files, anonymous_name, recording_method, user, client_info):
+    """
+    Ingest uploaded files as CoughRecording rows.
+    Validation, header probes and storage writes run in a bounded thread
+    pool; the rows are inserted with one bulk_create inside a single
+    transaction. Fingerprints and near-duplicate flags come from the
+    background job queued for the new rows. Returns one dict per input
+    file, in input order, holding either 'recording' or 'error'.
+    """
+    max_workers = max(1, min(settings.BULK_UPLOAD_WORKERS, len(files)))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        items = list(pool.map(_prepare, files))
+
+        # Only content the database does not know yet is written
+        ready = [item for item in items if 'error' not in item]
+        known = set(AudioBlob.objects.filter(
+            sha256__in={item['metadata']['file_hash'] for item in ready}
+        ).values_list('sha256', flat=True))
+        new_items = list({
+            item['metadata']['file_hash']: item for item in ready
+            if item['metadata']['file_hash'] not in known
+        }.values())
+        list(pool.map(_write, new_items))
+
+    try:
+        _insert(items, files, anonymous_name, recording_method, user, client_info)
+    finally:
+        # Truncated copies live in temporary files until they are stored
+        for item, audio_file in zip(items, files):
+            if item['file'] is not audio_file:
+                item['file'].close()
+    return items
+
+
+def _insert(items, files, anonymous_name, recording_method, user, client_info):
+    """Register blobs and bulk_create the rows for every prepared item"""
+    ready = [item for item in items if 'error' not in item]
+    if not ready:
+        return
+
+    try:
+        with transaction.atomic():
+            recordings = []
+            for index, item in enumerate(items):
+                if 'error' in item:
+                    continue
+                metadata = item['metadata']
+                if 'blob_name' in item:
+                    blob, was_duplicate = register_blob(
+                        metadata['file_hash'], item['blob_name'], metadata['file_size']
+                    )
+                else:
+                    blob = AudioBlob.objects.acquire(metadata['file_hash'])
+                    was_duplicate = True
+                    if blob is None:
+                        # Written by a duplicate earlier in this batch
+                        blob, was_duplicate = register_blob(
+                            metadata['file_hash'],
+                            write_blob_file(item['file'], metadata['file_hash']),
+                            metadata['file_size']
+                        )
+                metadata['was_duplicate'] = was_duplicate
+
+                # Create numbered anonymous name for bulk uploads
+                file_anonymous_name = anonymous_name
+                if len(files) > 1:
+                    file_anonymous_name = f"{anonymous_name}_{index + 1}"
+
+                recording = CoughRecording(
+                    audio_file=blob.name,
+                    anonymous_name=file_anonymous_name,
+                    recording_method=recording_method,
+                    ip_address=client_info['ip_address'],
+                    user_agent=client_info['user_agent'],
+                    user=user
+                )
+                recording.apply_ingest_metadata(metadata)
+                recordings.append(recording)
+                item['recording'] = recording
+
+            CoughRecording.objects.bulk_create(recordings)
+            recordings_created.send(sender=CoughRecording, recordings=recordings)
+    except Exception as e:
+        logger.error(f"Bulk insert failed: {e}")
+        for item in ready:
+            item.pop('recording', None)
+            item['error'] = e
+
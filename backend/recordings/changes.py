@@ -0,0 +1,73 @@
+"""
+Conditional GETs for the recordings list, detail and statistics.
+Every CoughRecording write advances ChangeSequence in its transaction and
+copies the new value to the cache once it commits. Responses carry an
+ETag and Last-Modified derived from it, and a request whose
+If-None-Match still matches is answered 304 from that single cache read,
+before any queryset is built or response cached.
+"""
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+
+CACHE_KEY = 'changes:recordings'
+
+
+def current():
+    """(value, changed_at) of the change sequence, from the cache when it is there"""
+    from .models import ChangeSequence
+    sequence = cache.get(CACHE_KEY)
+    if sequence is None:
+        sequence = ChangeSequence.objects.current()
+        cache.set(CACHE_KEY, sequence, settings.CHANGE_SEQUENCE_CACHE_TIMEOUT)
+    return sequence
+
+
+def publish():
+    """Copy the committed sequence to the cache; an older value never replaces a newer one"""
+    from .models import ChangeSequence
+    sequence = ChangeSequence.objects.current()
+    cached = cache.get(CACHE_KEY)
+    if cached is None or cached[0] < sequence[0]:
+        cache.set(CACHE_KEY, sequence, settings.CHANGE_SEQUENCE_CACHE_TIMEOUT)
+
+
+def etag(request, sequence) -> str:
+    """Strong ETag of the response to `request` at `sequence`, one per rendered format"""
+    value, changed_at = sequence
+    stamp = f'-{int(changed_at.timestamp() * 1000000):x}' if changed_at else ''
+    return f'"{value}{stamp}-{request.accepted_renderer.format}"'
+
+
+def conditional_response(view):
+    """
+    ETag / Last-Modified for a recordings GET view and 304 for a matching
+    If-None-Match. Clients are told to revalidate every time, so a poll
+    is a 304 until something changes. Use with method_decorator for
+    class-based views, outside cache_response.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view(request, *args, **kwargs)
+        sequence = current()
+        tag = etag(request, sequence)
+        # If-None-Match compares weakly: W/"x" matches "x"
+        matches = [value.removeprefix('W/') for value in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))]
+        if tag in matches:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = tag
+        if sequence[1]:
+            response['Last-Modified'] = http_date(sequence[1].timestamp())
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    return wrapper
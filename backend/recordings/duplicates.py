@@ -0,0 +1,97 @@
+"""
+Near-duplicate detection on top of the fingerprint LSH index.
+Exact copies already share a file_hash; these helpers find the same sound
+stored as different bytes.
+"""
+import logging
+from collections import defaultdict
+import numpy as np
+from core import fingerprint
+from .models import AudioFingerprint, CoughRecording
+from .signals import invalidate_recordings
+
+logger = logging.getLogger(__name__)
+
+
+def flag_near_duplicates(recordings, signatures):
+    """
+    Store the fingerprints in `signatures` ({file_hash: signature or None})
+    and point every recording whose content near-duplicates older content
+    at the earliest recording of that sound. Returns the flagged recordings.
+    """
+    for file_hash, signature in signatures.items():
+        if signature is not None:
+            AudioFingerprint.objects.store(file_hash, signature)
+
+    flagged = []
+    for recording in recordings:
+        signature = signatures.get(recording.file_hash)
+        if signature is None or recording.near_duplicate_of_id:
+            continue
+        for file_hash, _ in AudioFingerprint.objects.similar(signature, exclude_hash=recording.file_hash):
+            # Later rows point at earlier ones, also within one batch
+            original = CoughRecording.objects.filter(
+                file_hash=file_hash, pk__lt=recording.pk
+            ).order_by('pk').first()
+            if original is None:
+                continue
+            original = original.near_duplicate_of or original
+            CoughRecording.objects.filter(pk=recording.pk).update(near_duplicate_of=original)
+            recording.near_duplicate_of = original
+            flagged.append(recording)
+            logger.info(f"Recording {recording.recording_id} near-duplicates {original.recording_id}")
+            break
+    if flagged:
+        invalidate_recordings(flagged, stats=False)
+    return flagged
+
+
+def duplicate_clusters(threshold=fingerprint.SIMILARITY_THRESHOLD):
+    """
+    Groups of file hashes whose content near-duplicates each other, over
+    all stored fingerprints. Candidate pairs come from shared LSH buckets,
+    so the work grows with the number of duplicates, not with n².
+    """
+    hashes, signatures = [], []
+    for file_hash, stored in AudioFingerprint.objects.values_list('file_hash', 'signature').iterator():
+        hashes.append(file_hash)
+        signatures.append(fingerprint.from_bytes(stored))
+    if not hashes:
+        return []
+    signatures = np.stack(signatures)
+    keys = fingerprint.band_key_matrix(signatures)
+
+    parent = list(range(len(hashes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for members in _shared_buckets(keys):
+        # Verify the whole bucket against its first member at once
+        agreement = (signatures[members[1:]] == signatures[members[0]]).mean(axis=1)
+        for other in members[1:][agreement >= threshold]:
+            parent[find(other)] = find(members[0])
+        # Members that did not match the first one are compared pairwise
+        rest = members[1:][agreement < threshold]
+        for i, a in enumerate(rest):
+            for b in rest[i + 1:]:
+                if fingerprint.similarity(signatures[a], signatures[b]) >= threshold:
+                    parent[find(b)] = find(a)
+
+    clusters = defaultdict(list)
+    for index, file_hash in enumerate(hashes):
+        clusters[find(index)].append(file_hash)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def _shared_buckets(keys):
+    """Row indices of every LSH bucket holding more than one row, band by band"""
+    for column in keys.T:
+        order = np.argsort(column, kind='stable')
+        ordered = column[order]
+        shared = ordered[1:][ordered[1:] == ordered[:-1]]
+        for key in np.unique(shared):
+            yield order[np.searchsorted(ordered, key, 'left'):np.searchsorted(ordered, key, 'right')]
@@ -0,0 +1,24 @@
+import django_filters
+from .models import CoughRecording
+
+
+class CoughRecordingFilter(django_filters.FilterSet):
+    """
+    Recording filters shared by the list and export endpoints.
+    Quality metrics take `<metric>_min` / `<metric>_max` bounds, e.g.
+    `?snr_db_min=10&clipping_ratio_max=0.001`; recordings that have not been
+    measured yet never match a bound.
+    """
+    peak_db = django_filters.RangeFilter()
+    clipping_ratio = django_filters.RangeFilter()
+    silence_ratio = django_filters.RangeFilter()
+    snr_db = django_filters.RangeFilter()
+    # ?near_duplicate=false keeps only the first copy of every sound
+    near_duplicate = django_filters.BooleanFilter(
+        field_name='near_duplicate_of', lookup_expr='isnull', exclude=True
+    )
+
+    class Meta:
+        model = CoughRecording
+        fields = ['recording_method', 'file_format', 'user',
+                  'peak_db', 'clipping_ratio', 'silence_ratio', 'snr_db']
@@ -0,0 +1,84 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework import generics
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from recordings.models import CoughRecording
+from recordings.serializers import CoughRecordingListSerializer, RecordingListRows
+from recordings.synthetic import create_recordings
+from recordings.views import CoughRecordingListView
+
+# A private cache: no cached responses, and throttle counters stay out of the shared cache
+PRIVATE_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class SerializerListView(CoughRecordingListView):
+    """The list view as it was: model instances through CoughRecordingListSerializer"""
+    list = generics.ListAPIView.list
+
+
+class Command(BaseCommand):
+    help = 'Compare recordings list pages rendered by the ModelSerializer and from values_list rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000,
+                          help='Recordings in the throwaway database (default: 100,000)')
+        parser.add_argument('--page-sizes', default='100,500,1000',
+                          help='Comma-separated page sizes (default: 100,500,1000)')
+        parser.add_argument('--repeat', type=int, default=20,
+                          help='Pages per measurement (default: 20)')
+
+    def handle(self, *args, **options):
+        page_sizes = [int(size) for size in options['page_sizes'].split(',')]
+        # A fresh test database, so the real recordings are never touched
+        name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            self.stdout.write(f'Inserting {options["rows"]} recordings into {name}')
+            create_recordings(options['rows'])
+            factory = APIRequestFactory()
+            views = {
+                'serializer': SerializerListView.as_view(throttle_classes=[]),
+                'rows': CoughRecordingListView.as_view(throttle_classes=[]),
+            }
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0, CACHES=PRIVATE_CACHE):
+                for page_size in page_sizes:
+                    params = {'page_size': page_size}
+                    request = Request(factory.get('/api/recordings/list/', params))
+                    serializing = {
+                        'serializer': lambda: self.serialize(request, page_size),
+                        'rows': lambda: self.render_rows(request, page_size),
+                    }
+                    for stage, runs in (('serialization', serializing), ('request', {
+                        kind: (lambda view=view: view(factory.get('/api/recordings/list/', params)).render())
+                        for kind, view in views.items()
+                    })):
+                        timings = {kind: self.measure(run, options['repeat']) for kind, run in runs.items()}
+                        self.stdout.write(self.style.SUCCESS(
+                            f'{page_size:>5} rows, {stage:13s} serializer {timings["serializer"]:8.2f} ms   '
+                            f'rows {timings["rows"]:7.2f} ms   '
+                            f'{timings["serializer"] / timings["rows"]:4.1f}x'
+                        ))
+        finally:
+            connection.creation.destroy_test_db(name, verbosity=0)
+
+    def page(self, serializer, page_size):
+        return serializer.load_only(CoughRecording.objects.all(), 'created_at').order_by('-created_at', '-id')[:page_size]
+
+    def serialize(self, request, page_size):
+        serializer = CoughRecordingListSerializer(context={'request': request})
+        return CoughRecordingListSerializer(
+            self.page(serializer, page_size), many=True, context={'request': request}
+        ).data
+
+    def render_rows(self, request, page_size):
+        rows = RecordingListRows(CoughRecordingListSerializer(context={'request': request}))
+        return rows.render(rows.queryset(self.page(rows.serializer, page_size)))
+
+    def measure(self, run, repeat):
+        """Milliseconds per call"""
+        started = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        return (time.perf_counter() - started) * 1000 / repeat
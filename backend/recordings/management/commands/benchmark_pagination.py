@@ -0,0 +1,67 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+from recordings.models import CoughRecording
+from recordings.pagination import encode_cursor
+from recordings.synthetic import create_recordings
+from recordings.views import CoughRecordingListView
+
+PAGE_SIZE = 20
+# A private cache: no cached responses, and throttle counters stay out of the shared cache
+PRIVATE_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class Command(BaseCommand):
+    help = 'Time deep pages of the recordings list with page numbers and with cursors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                          help='Recordings in the throwaway database (default: 1,000,000)')
+        parser.add_argument('--repeat', type=int, default=5,
+                          help='Requests per measurement (default: 5)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        # A fresh test database, so the real recordings are never touched
+        name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            self.stdout.write(f'Inserting {rows} recordings into {name}')
+            started = time.perf_counter()
+            create_recordings(rows)
+            self.stdout.write(f'Inserted in {time.perf_counter() - started:.1f}s')
+
+            view = CoughRecordingListView.as_view()
+            factory = APIRequestFactory()
+            last_page = max(1, rows // PAGE_SIZE)
+            pages = sorted({1, 10, 100, 1000, 10000, last_page // 2, last_page} - {0})
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0, CACHES=PRIVATE_CACHE):
+                for page in [page for page in pages if page <= last_page]:
+                    offset_ms = self.measure(view, factory, {'page': page}, options['repeat'])
+                    cursor_ms = self.measure(view, factory, self.cursor_params(page), options['repeat'])
+                    self.stdout.write(self.style.SUCCESS(
+                        f'page {page:>7}: offset {offset_ms:8.2f} ms   cursor {cursor_ms:6.2f} ms'
+                    ))
+                for count in ('exact', 'approximate'):
+                    ms = self.measure(view, factory, {'count': count}, options['repeat'])
+                    self.stdout.write(f'first page with count={count}: {ms:.2f} ms')
+        finally:
+            connection.creation.destroy_test_db(name, verbosity=0)
+
+    def cursor_params(self, page):
+        """The cursor a client following `next` links holds for `page`"""
+        if page == 1:
+            return {}
+        created_at, pk = (CoughRecording.objects.order_by('-created_at', '-id')
+                          .values_list('created_at', 'id')[(page - 1) * PAGE_SIZE - 1])
+        return {'cursor': encode_cursor(created_at, pk)}
+
+    def measure(self, view, factory, params, repeat):
+        """Milliseconds per request"""
+        started = time.perf_counter()
+        for _ in range(repeat):
+            response = view(factory.get('/api/recordings/list/', params))
+            assert response.status_code == 200, response.data
+            response.render()
+        return (time.perf_counter() - started) * 1000 / repeat
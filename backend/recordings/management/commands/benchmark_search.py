@@ -0,0 +1,71 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.test import APIRequestFactory
+from recordings.synthetic import create_recordings
+from recordings.views import CoughRecordingListView
+
+# A private cache: no cached responses, and throttle counters stay out of the shared cache
+PRIVATE_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class Command(BaseCommand):
+    help = "Time ?search= on the recordings list with FTS5 and with DRF's LIKE search"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                          help='Recordings in the throwaway database (default: 1,000,000)')
+        parser.add_argument('--repeat', type=int, default=5,
+                          help='Requests per measurement (default: 5)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        # A fresh test database, so the real recordings are never touched
+        name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            self.stdout.write(f'Inserting {rows} recordings into {name}')
+            started = time.perf_counter()
+            create_recordings(rows)
+            self.stdout.write(f'Inserted in {time.perf_counter() - started:.1f}s (search table filled by triggers)')
+
+            views = {
+                'fts5': CoughRecordingListView.as_view(),
+                'like': CoughRecordingListView.as_view(
+                    filter_backends=[DjangoFilterBackend, SearchFilter, OrderingFilter]
+                ),
+            }
+            factory = APIRequestFactory()
+            searches = [
+                ('one contributor', {'search': f'participant{rows // 20}'}),
+                ('one contributor, newest first', {'search': f'participant{rows // 20}', 'ordering': '-created_at'}),
+                ('contributor prefix', {'search': f'participant{rows // 200}'}),
+                ('file number', {'search': str(rows // 3)}),
+                ('common word', {'search': 'mp3'}),
+                ('common word, newest first', {'search': 'mp3', 'ordering': '-created_at'}),
+                ('no match', {'search': 'zzzz'}),
+            ]
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0, CACHES=PRIVATE_CACHE):
+                for label, params in searches:
+                    timings, matches = {}, {}
+                    for backend, view in views.items():
+                        timings[backend], matches[backend] = self.measure(view, factory, params, options['repeat'])
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{label:32s} fts5 {timings["fts5"]:8.2f} ms   like {timings["like"]:8.2f} ms'
+                        f'   ({matches["fts5"]})'
+                    ))
+        finally:
+            connection.creation.destroy_test_db(name, verbosity=0)
+
+    def measure(self, view, factory, params, repeat):
+        """Milliseconds per request and the size of the first page"""
+        started = time.perf_counter()
+        for _ in range(repeat):
+            response = view(factory.get('/api/recordings/list/', params))
+            assert response.status_code == 200, response.data
+            response.render()
+        data = response.data
+        matches = f'count {data["count"]}' if 'count' in data else f'first page {len(data["results"])}'
+        return (time.perf_counter() - started) * 1000 / repeat, matches
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from core.embeddings import embed_store
+from core.feature_store import FeatureStore
+from core.vector_index import VectorIndex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the similarity search index from the feature store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nlist', type=int, default=None,
+                          help='IVF clusters (default: sqrt(rows); small indexes are scanned exactly)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        ids, raw = embed_store(FeatureStore())
+        if not ids:
+            self.stdout.write(self.style.ERROR('Feature store is empty; run extract_features first'))
+            return
+        pooled = time.perf_counter() - started
+        meta = VectorIndex().build(ids, raw, nlist=options['nlist'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {meta["count"]} recordings ({meta["nlist"]} IVF clusters) in '
+            f'{time.perf_counter() - started:.1f}s, {pooled:.1f}s of it pooling embeddings'
+        ))
@@ -0,0 +1,86 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core.canonical import canonical_path, transcode
+from recordings.models import CoughRecording
+from recordings.signals import invalidate_recordings
+
+
+class Command(BaseCommand):
+    help = 'Write 16 kHz mono FLAC derivatives of stored recordings using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                          help='Number of encoder processes (default: CPU count)')
+        parser.add_argument('--force', action='store_true',
+                          help='Re-encode derivatives that already exist')
+        parser.add_argument('--limit', type=int, default=None,
+                          help='Convert at most this many files')
+
+    def link(self, file_hash):
+        """Point every recording of the content at its derivative"""
+        updated = CoughRecording.objects.filter(file_hash=file_hash)
+        updated.update(canonical_file=canonical_path(file_hash))
+        invalidate_recordings(updated.only('recording_id', 'user_id'), stats=False)
+
+    def handle(self, *args, **options):
+        records = CoughRecording.objects.exclude(file_hash='').exclude(audio_file='')
+        if not options['force']:
+            records = records.filter(canonical_file='')
+
+        # One conversion per stored file, however many rows share it
+        sources = {}
+        for file_hash, name in records.values_list('file_hash', 'audio_file').iterator():
+            sources.setdefault(file_hash, name)
+        
+        # Derivatives written by background jobs only need linking
+        if not options['force']:
+            for file_hash in [h for h in sources if default_storage.exists(canonical_path(h))]:
+                self.link(file_hash)
+                del sources[file_hash]
+        if options['limit'] is not None:
+            sources = dict(list(sources.items())[:options['limit']])
+
+        if not sources:
+            self.stdout.write(self.style.SUCCESS('All recordings already have a canonical derivative'))
+            return
+
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Converting {len(sources)} files with {workers} process(es)')
+
+        # Children only run ffmpeg, but must not inherit open connections
+        connections.close_all()
+        converted = failed = 0
+        bytes_in = bytes_out = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(transcode, default_storage.path(name),
+                            default_storage.path(canonical_path(file_hash))): (file_hash, name)
+                for file_hash, name in sources.items()
+            }
+
+            for future in as_completed(futures):
+                file_hash, name = futures[future]
+                try:
+                    bytes_out += future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Error converting {name}: {e}'))
+                    continue
+
+                bytes_in += default_storage.size(name)
+                self.link(file_hash)
+                converted += 1
+
+        elapsed = time.perf_counter() - started
+        rate = converted / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{bytes_in / (1024 * 1024):.1f} MB in, {bytes_out / (1024 * 1024):.1f} MB of FLAC out'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Converted {converted} files ({failed} failed) in {elapsed:.1f}s, {rate:.1f} files/s'
+        ))
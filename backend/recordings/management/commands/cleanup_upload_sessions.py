@@ -0,0 +1,31 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from recordings.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable upload sessions that have not received data for a while'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                          help='Age in hours after which idle sessions are removed (default: 24)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        sessions = UploadSession.objects.filter(status__in=['open', 'finalizing'], updated_at__lt=cutoff)
+        
+        removed_count = 0
+        for session in sessions:
+            session.discard_spool()
+            session.delete()
+            removed_count += 1
+        
+        # Finished sessions only matter for idempotent finalize retries
+        finished_count, _ = UploadSession.objects.filter(
+            status__in=['complete', 'failed'], updated_at__lt=cutoff
+        ).delete()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {removed_count} idle and {finished_count} finished upload sessions'
+        ))
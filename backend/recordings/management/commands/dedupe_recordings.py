@@ -0,0 +1,51 @@
+import os
+from django.core.management.base import BaseCommand
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from recordings.models import CoughRecording
+from recordings.signals import invalidate_recordings
+from core.ingest import store_blob
+from core.utils import generate_file_hash
+
+
+class Command(BaseCommand):
+    help = 'Move recordings stored before content addressing into the deduplicated blob store'
+
+    def handle(self, *args, **options):
+        records = CoughRecording.objects.filter(file_hash='')
+        moved_count = 0
+        duplicate_count = 0
+        
+        for record in records.iterator():
+            if not record.audio_file or not os.path.exists(record.audio_file.path):
+                self.stdout.write(self.style.WARNING(f'File not found for {record.file_name}'))
+                continue
+            
+            old_name = record.audio_file.name
+            try:
+                with open(record.audio_file.path, 'rb') as f:
+                    django_file = File(f, name=os.path.basename(old_name))
+                    digest = generate_file_hash(django_file)
+                    with transaction.atomic():
+                        blob, was_duplicate = store_blob(django_file, digest)
+                        CoughRecording.objects.filter(pk=record.pk).update(
+                            audio_file=blob.name, file_hash=digest
+                        )
+                        invalidate_recordings([record], stats=False)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Error processing {record.file_name}: {e}'))
+                continue
+            
+            if old_name != blob.name:
+                default_storage.delete(old_name)
+            moved_count += 1
+            if was_duplicate:
+                duplicate_count += 1
+                self.stdout.write(f'Deduplicated {record.file_name} -> {blob.sha256[:12]}')
+            else:
+                self.stdout.write(f'Stored {record.file_name} -> {blob.sha256[:12]}')
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved_count} recordings ({duplicate_count} duplicates removed)'
+        ))
@@ -0,0 +1,86 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core import fingerprint
+from recordings.duplicates import duplicate_clusters
+from recordings.models import AudioFingerprint, CoughRecording
+from recordings.signals import invalidate_recordings
+
+
+def _fingerprint(path):
+    """Fingerprint one file in a worker process; errors are returned, not raised"""
+    try:
+        return fingerprint.signature_file(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Report groups of recordings that contain the same sound stored as different files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                          help='Processes for fingerprinting content without one (default: CPU count)')
+        parser.add_argument('--threshold', type=float, default=fingerprint.SIMILARITY_THRESHOLD,
+                          help=f'Minimum estimated similarity (default: {fingerprint.SIMILARITY_THRESHOLD})')
+        parser.add_argument('--flag', action='store_true',
+                          help='Point every later recording of a cluster at its earliest one')
+
+    def handle(self, *args, **options):
+        self.fingerprint_missing(max(1, options['workers']))
+
+        started = time.perf_counter()
+        clusters = duplicate_clusters(options['threshold'])
+        elapsed = time.perf_counter() - started
+
+        flagged = 0
+        for number, hashes in enumerate(clusters, 1):
+            recordings = list(CoughRecording.objects.filter(file_hash__in=hashes).order_by('pk'))
+            if len(recordings) < 2:
+                continue
+            original = recordings[0]
+            self.stdout.write(f'Cluster {number}: {len(recordings)} recordings, {len(hashes)} files')
+            for recording in recordings:
+                marker = '*' if recording is original else ' '
+                self.stdout.write(f'  {marker} {recording.recording_id}  {recording.file_name}')
+            if options['flag']:
+                later = [r.pk for r in recordings[1:] if r.file_hash != original.file_hash]
+                changed = list(CoughRecording.objects.filter(pk__in=later).exclude(
+                    near_duplicate_of=original
+                ).only('recording_id', 'user_id'))
+                flagged += CoughRecording.objects.filter(pk__in=[r.pk for r in changed]).update(
+                    near_duplicate_of=original
+                )
+                invalidate_recordings(changed, stats=False)
+
+        summary = f'{len(clusters)} duplicate clusters found in {elapsed:.2f}s'
+        if options['flag']:
+            summary += f', {flagged} recordings flagged'
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def fingerprint_missing(self, workers):
+        """Fingerprint stored content that has no fingerprint yet"""
+        known = set(AudioFingerprint.objects.values_list('file_hash', flat=True))
+        sources = {}
+        records = CoughRecording.objects.exclude(file_hash='').exclude(audio_file='')
+        for file_hash, audio_name, canonical_name in records.values_list(
+                'file_hash', 'audio_file', 'canonical_file').iterator():
+            if file_hash not in known and file_hash not in sources:
+                sources[file_hash] = canonical_name or audio_name
+        if not sources:
+            return
+
+        self.stdout.write(f'Fingerprinting {len(sources)} files with {workers} process(es)')
+        # Children only decode files, but must not inherit open connections
+        connections.close_all()
+        storage = CoughRecording._meta.get_field('audio_file').storage
+        paths = [storage.path(name) for name in sources.values()]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_fingerprint, paths, chunksize=max(1, min(32, len(paths) // (workers * 4))))
+            for (file_hash, name), (signature, error) in zip(sources.items(), results):
+                if error:
+                    self.stdout.write(self.style.ERROR(f'Error processing {name}: {error}'))
+                elif signature is not None:
+                    AudioFingerprint.objects.store(file_hash, signature)
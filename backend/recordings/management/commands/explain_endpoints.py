@@ -0,0 +1,166 @@
+import time
+import uuid
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+from recordings.models import CoughRecording
+from recordings.pagination import encode_cursor
+from recordings.synthetic import create_recordings
+
+# (path, query parameters, why a scan is acceptable or None) of the read
+# endpoints as the frontend and research scripts call them; {id}, {user}
+# and {cursor} are filled in. An index walked in page order stops once
+# the page is full, so it is only acceptable when most rows match
+ENDPOINTS = [
+    ('/api/recordings/list/', {}, None),
+    ('/api/recordings/list/', {'cursor': '{cursor}'}, None),
+    ('/api/recordings/list/', {'count': 'exact'}, 'opt-in COUNT(*)'),
+    ('/api/recordings/list/', {'count': 'approximate', 'recording_method': 'upload'}, None),
+    ('/api/recordings/list/', {'recording_method': 'browser'}, None),
+    ('/api/recordings/list/', {'file_format': 'wav'}, None),
+    ('/api/recordings/list/', {'recording_method': 'upload', 'file_format': 'wav'}, None),
+    ('/api/recordings/list/', {'user': '{user}'}, None),
+    ('/api/recordings/list/', {'near_duplicate': 'false'}, 'nearly every recording matches'),
+    ('/api/recordings/list/', {'snr_db_min': '10', 'clipping_ratio_max': '0.001'},
+     'range filters checked along the date index'),
+    ('/api/recordings/list/', {'ordering': '-duration'}, None),
+    ('/api/recordings/list/', {'ordering': 'file_size'}, None),
+    ('/api/recordings/list/', {'recording_method': 'browser', 'ordering': '-duration'},
+     'a common value filtered along the ordering index'),
+    ('/api/recordings/list/', {'ordering': '-snr_db'}, None),
+    ('/api/recordings/list/', {'page': '50'}, None),
+    ('/api/recordings/list/', {'search': 'participant1'}, 'relevance order sorts only the matches'),
+    ('/api/recordings/list/', {'search': 'participant1', 'ordering': '-created_at'}, 'date order sorts only the matches'),
+    ('/api/recordings/my-recordings/', {}, None),
+    ('/api/recordings/detail/{id}/', {}, None),
+    ('/api/recordings/segments/{id}/', {}, None),
+    ('/api/recordings/similar/{id}/', {}, None),
+    ('/api/recordings/stats/', {}, None),
+    ('/api/recordings/stats/timeseries/', {'bucket': 'hour'}, None),
+    ('/api/recordings/stats/timeseries/', {'bucket': 'month'}, None),
+    ('/api/recordings/stats/distribution/', {'field': 'duration'}, None),
+    ('/api/recordings/export-csv/', {'recording_method': 'browser'}, 'exports every match'),
+]
+# Tables of a few rows per field, method, format or contributor, which
+# the planner reads whole while they are small
+SMALL_TABLES = {'recordings_distributionsketch', 'recordings_statscounter'}
+# A private cache, so throttle counters stay out of the shared cache
+PRIVATE_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class Command(BaseCommand):
+    help = 'Print the query plan of every query behind the read endpoints and flag full scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=0,
+                          help='Explain on a throwaway database of this many synthetic recordings '
+                               'instead of the configured one')
+        parser.add_argument('--strict', action='store_true',
+                          help='Exit with an error if any query scans a table or sorts without an index')
+        parser.add_argument('--sql', action='store_true', help='Print the SQL of each query too')
+
+    def handle(self, *args, **options):
+        if not options['rows']:
+            return self.explain(options)
+        # A fresh test database, so the real recordings are never touched
+        name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            self.stdout.write(f'Inserting {options["rows"]} synthetic recordings into {name}')
+            create_recordings(options['rows'])
+            with connection.cursor() as cursor:
+                # Table statistics, so the planner sees the real selectivity
+                cursor.execute('ANALYZE')
+            return self.explain(options)
+        finally:
+            connection.creation.destroy_test_db(name, verbosity=0)
+
+    def explain(self, options):
+        recording = CoughRecording.objects.order_by('-created_at', '-id').first()
+        recording_id = recording.recording_id if recording else uuid.uuid4()
+        cursor = encode_cursor(recording.created_at, recording.pk) if recording else ''
+        # An unsaved user when there are none: my-recordings still runs its real query
+        user = User.objects.filter(coughrecording__isnull=False).first() or User(pk=0, username='explain')
+        factory = APIRequestFactory()
+
+        queries = flagged = 0
+        # No response cache, so every view reaches the database
+        with override_settings(RESPONSE_CACHE_TIMEOUT=0, CACHES=PRIVATE_CACHE):
+            for path, params, expected in ENDPOINTS:
+                path = path.format(id=recording_id)
+                params = {key: value.format(user=user.pk, cursor=cursor) for key, value in params.items()}
+                match = resolve(path)
+                request = factory.get(path, params)
+                force_authenticate(request, user=user)
+                # A full query log (DEBUG) would leave nothing to capture
+                reset_queries()
+                started = time.perf_counter()
+                with CaptureQueriesContext(connection) as captured:
+                    response = match.func(request, *match.args, **match.kwargs)
+                    if hasattr(response, 'render'):
+                        response.render()
+                    elif getattr(response, 'streaming', False):
+                        b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - started) * 1000
+
+                query_string = '&'.join(f'{key}={value}' for key, value in params.items())
+                self.stdout.write(f'\nGET {path}{"?" + query_string if query_string else ""} '
+                                  f'({response.status_code}, {elapsed:.1f} ms)')
+                for query in captured.captured_queries:
+                    sql = query['sql']
+                    if not sql.lstrip().upper().startswith('SELECT'):
+                        continue
+                    queries += 1
+                    if options['sql']:
+                        self.stdout.write(f'  {sql}')
+                    problems = []
+                    # Counting reads every match; page numbers and count=exact ask for it
+                    counting = sql.lstrip().upper().startswith('SELECT COUNT(')
+                    for line in self.plan(sql):
+                        problem = self.problem(line, sql)
+                        if problem and counting:
+                            self.stdout.write(self.style.WARNING(f'    {line}  <- {problem}, expected: COUNT(*)'))
+                            continue
+                        if problem and expected:
+                            self.stdout.write(self.style.WARNING(f'    {line}  <- {problem}, expected: {expected}'))
+                        elif problem:
+                            problems.append(problem)
+                            self.stdout.write(self.style.ERROR(f'    {line}  <- {problem}'))
+                        else:
+                            self.stdout.write(f'    {line}')
+                    flagged += bool(problems)
+
+        summary = f'\n{queries} queries over {len(ENDPOINTS)} endpoints, {flagged} with a full scan or sort'
+        if flagged and options['strict']:
+            raise CommandError(summary.strip())
+        self.stdout.write(self.style.ERROR(summary) if flagged else self.style.SUCCESS(summary))
+
+    def plan(self, sql):
+        """Plan lines of one query"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+
+    def problem(self, line, sql):
+        """Why a plan line is slow at scale, or None"""
+        words = line.split()
+        if line.startswith('SCAN ') and words[1] not in SMALL_TABLES:
+            if 'VIRTUAL TABLE INDEX' in line:
+                # An FTS5 MATCH reads only the matching terms' doclists
+                return None
+            if 'USING' not in words:
+                return 'full scan'
+            # Walking an index in ORDER BY order is only cheap when the LIMIT
+            # stops it early; a WHERE applied on the way may read every entry
+            if ' WHERE ' in sql or ' LIMIT ' not in sql:
+                return 'full index scan'
+        if 'Seq Scan on' in line and not any(table in line for table in SMALL_TABLES):
+            return 'full scan'
+        if line.startswith('USE TEMP B-TREE FOR ORDER BY') or line.lstrip().startswith('Sort '):
+            return 'sort'
+        return None
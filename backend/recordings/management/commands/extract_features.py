@@ -0,0 +1,93 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core.feature_store import FeatureStore
+from core.features import extract_file
+from core.vector_index import index_recordings
+from recordings.models import CoughRecording
+
+
+def _extract(path):
+    """Featurize one file in a worker process; errors are returned, not raised"""
+    try:
+        return extract_file(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Extract log-mel/MFCC features of all recordings into the memory-mapped feature store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                          help='Number of extractor processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=200,
+                          help='Files appended to the store per write (default: 200)')
+        parser.add_argument('--rebuild', action='store_true',
+                          help='Discard the store and extract everything again')
+
+    def handle(self, *args, **options):
+        store = FeatureStore()
+        if options['rebuild']:
+            store.clear()
+
+        records = CoughRecording.objects.exclude(file_hash='').exclude(audio_file='')
+        pruned = store.prune(records.values_list('recording_id', flat=True))
+        if pruned:
+            self.stdout.write(f'Removed {pruned} deleted recordings from the index')
+
+        # Group rows without features by content; shared content is extracted once
+        index = store.load_index()
+        groups = {}
+        for recording_id, file_hash, audio_name, canonical_name in records.values_list(
+                'recording_id', 'file_hash', 'audio_file', 'canonical_file').iterator():
+            if str(recording_id) in index['recordings']:
+                continue
+            group = groups.setdefault(file_hash, {'name': canonical_name or audio_name, 'ids': []})
+            group['ids'].append(recording_id)
+
+        # Content extracted before only needs index entries
+        store.append([(group['ids'], file_hash, None)
+                      for file_hash, group in groups.items() if file_hash in index['hashes']])
+        pending = [(file_hash, group) for file_hash, group in groups.items()
+                   if file_hash not in index['hashes']]
+        if not pending:
+            index_recordings([rid for group in groups.values() for rid in group['ids']])
+            self.stdout.write(self.style.SUCCESS(f'Feature store up to date ({index["rows"]} rows)'))
+            return
+
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        self.stdout.write(f'Extracting {len(pending)} files with {workers} process(es)')
+
+        # Children only decode files, but must not inherit open connections
+        connections.close_all()
+        storage = CoughRecording._meta.get_field('audio_file').storage
+        paths = [storage.path(group['name']) for _, group in pending]
+        extracted = failed = rows = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batch = []
+            results = pool.map(_extract, paths, chunksize=max(1, min(32, len(paths) // (workers * 4))))
+            for (file_hash, group), (matrix, error) in zip(pending, results):
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Error processing {group["name"]}: {error}'))
+                    continue
+                batch.append((group['ids'], file_hash, matrix))
+                extracted += 1
+                if len(batch) >= batch_size:
+                    rows += store.append(batch)
+                    batch = []
+            rows += store.append(batch)
+
+        elapsed = time.perf_counter() - started
+        indexed = index_recordings([rid for group in groups.values() for rid in group['ids']])
+        rate = extracted / elapsed if elapsed else 0
+        size_mb = os.path.getsize(store.matrix_path) / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(
+            f'Extracted {extracted} files ({failed} failed), {rows} frames in {elapsed:.1f}s '
+            f'({rate:.1f} files/s); store is {size_mb:.1f} MB, {indexed} embeddings indexed'
+        ))
@@ -0,0 +1,44 @@
+import time
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from core.waveform import ensure_peaks, peaks_path
+from recordings.models import CoughRecording
+
+
+class Command(BaseCommand):
+    help = 'Compute waveform peaks for recordings stored before previews existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='store_true',
+                          help='Queue a background job per file instead of computing here')
+
+    def handle(self, *args, **options):
+        # One envelope per stored file, however many rows share it
+        sources = {}
+        records = CoughRecording.objects.exclude(file_hash='').exclude(audio_file='')
+        for file_hash, audio_name, canonical_name in records.values_list(
+                'file_hash', 'audio_file', 'canonical_file').iterator():
+            if file_hash not in sources and not default_storage.exists(peaks_path(file_hash)):
+                sources[file_hash] = canonical_name or audio_name
+
+        if options['queue']:
+            from core.jobs import enqueue_many
+            enqueue_many('recordings.waveform_peaks', [{'file_hash': h} for h in sources])
+            self.stdout.write(self.style.SUCCESS(
+                f'Queued {len(sources)} jobs, run them with: python manage.py run_workers'
+            ))
+            return
+
+        generated_count = 0
+        started = time.perf_counter()
+        for file_hash, name in sources.items():
+            try:
+                ensure_peaks(file_hash, name)
+                generated_count += 1
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Error processing {name}: {e}'))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated peaks for {generated_count} of {len(sources)} files in {elapsed:.1f}s'
+        ))
@@ -1,10 +1,8 @@
 import os
-import shutil
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from django.core.files import File
 from recordings.models import CoughRecording
-from mutagen import File as MutagenFile
 
 
 class Command(BaseCommand):
@@ -70,23 +68,11 @@ class Command(BaseCommand):
                 
                 recording.recording_method = recording_method
                 
-                # Copy file to media directory
+                # Store the file and extract its metadata in a single pass
                 with open(file_path, 'rb') as f:
-                    django_file = File(f)
-                    recording.audio_file.save(filename, django_file, save=False)
+                    recording.audio_file = File(f, name=filename)
+                    recording.save()
                 
-                # Extract metadata
-                try:
-                    audio_file = MutagenFile(file_path)
-                    if audio_file:
-                        recording.duration = getattr(audio_file.info, 'length', None)
-                        recording.sample_rate = getattr(audio_file.info, 'sample_rate', None)
-                        recording.bit_rate = getattr(audio_file.info, 'bitrate', None)
-                        recording.channels = getattr(audio_file.info, 'channels', None)
-                except:
-                    pass  # Continue without metadata if extraction fails
-                
-                recording.save()
                 imported_count += 1
                 
                 self.stdout.write(f'✓ Imported: {filename}')
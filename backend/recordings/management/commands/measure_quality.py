@@ -0,0 +1,68 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core.quality import measure_file
+from recordings.models import CoughRecording
+from recordings.signals import invalidate_recordings
+
+
+def _measure(path):
+    """Measure one file in a worker process; errors are returned, not raised"""
+    try:
+        return measure_file(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Compute peak level, clipping, silence and SNR of recordings that have not been measured'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                          help='Number of processes (default: CPU count)')
+        parser.add_argument('--force', action='store_true',
+                          help='Measure every recording again, e.g. after changing thresholds')
+
+    def handle(self, *args, **options):
+        records = CoughRecording.objects.exclude(file_hash='').exclude(audio_file='')
+        if not options['force']:
+            records = records.filter(snr_db__isnull=True)
+
+        # Shared content is measured once
+        groups = {}
+        for pk, file_hash, audio_name in records.values_list('pk', 'file_hash', 'audio_file').iterator():
+            group = groups.setdefault(file_hash, {'name': audio_name, 'pks': []})
+            group['pks'].append(pk)
+        if not groups:
+            self.stdout.write(self.style.SUCCESS('All recordings are measured'))
+            return
+
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Measuring {len(groups)} files with {workers} process(es)')
+
+        # Children only decode files, but must not inherit open connections
+        connections.close_all()
+        storage = CoughRecording._meta.get_field('audio_file').storage
+        pending = list(groups.values())
+        measured = failed = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = [storage.path(group['name']) for group in pending]
+            results = pool.map(_measure, paths, chunksize=max(1, min(32, len(paths) // (workers * 4))))
+            for group, (metrics, error) in zip(pending, results):
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Error processing {group["name"]}: {error}'))
+                    continue
+                updated = CoughRecording.objects.filter(pk__in=group['pks'])
+                updated.update(**metrics)
+                invalidate_recordings(updated.only('recording_id', 'user_id'), stats=False)
+                measured += 1
+
+        elapsed = time.perf_counter() - started
+        rate = measured / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Measured {measured} files ({failed} failed) in {elapsed:.1f}s ({rate:.1f} files/s)'
+        ))
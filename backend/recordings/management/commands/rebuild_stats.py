@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from recordings.models import CoughRecording, DailyRollup, DistributionSketch, HourlyRollup, StatsCounter
+from recordings.signals import invalidate_recordings
+
+
+class Command(BaseCommand):
+    help = 'Recount the materialized statistics, time rollups and distribution sketches from the recordings table'
+
+    def handle(self, *args, **options):
+        before = StatsCounter.objects.summary()
+        started = time.perf_counter()
+        total = StatsCounter.objects.rebuild()
+        hours = HourlyRollup.objects.rebuild(CoughRecording.objects.all())
+        days = DailyRollup.objects.rebuild(HourlyRollup.objects.all())
+        DistributionSketch.objects.rebuild()
+        # No recording changed, but the statistics and their ETag did
+        invalidate_recordings([])
+        after = StatsCounter.objects.summary()
+        drift = {name: (before[name], value) for name, value in after.items() if before[name] != value}
+        for name, (old, new) in drift.items():
+            self.stdout.write(f'{name}: {old} -> {new}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted {total} recordings into {hours} hourly and {days} daily rollups and the sketches in '
+            f'{time.perf_counter() - started:.2f}s ({len(drift)} totals corrected)'
+        ))
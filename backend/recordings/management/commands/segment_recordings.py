@@ -0,0 +1,68 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core.segmentation import segment_file
+from recordings.models import CoughRecording, CoughSegment
+
+
+def _segment(path):
+    """Segment one file in a worker process; errors are returned, not raised"""
+    try:
+        return segment_file(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Detect cough events in recordings that have not been segmented yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                          help='Number of processes (default: CPU count)')
+        parser.add_argument('--force', action='store_true',
+                          help='Segment every recording again, e.g. after tuning thresholds')
+
+    def handle(self, *args, **options):
+        records = CoughRecording.objects.exclude(file_hash='').exclude(audio_file='')
+        if not options['force']:
+            records = records.filter(segment_count__isnull=True)
+
+        # Shared content is segmented once
+        groups = {}
+        for recording_id, file_hash, audio_name, canonical_name in records.values_list(
+                'recording_id', 'file_hash', 'audio_file', 'canonical_file').iterator():
+            group = groups.setdefault(file_hash, {'name': canonical_name or audio_name, 'ids': []})
+            group['ids'].append(recording_id)
+        if not groups:
+            self.stdout.write(self.style.SUCCESS('All recordings are segmented'))
+            return
+
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Segmenting {len(groups)} files with {workers} process(es)')
+
+        # Children only decode files, but must not inherit open connections
+        connections.close_all()
+        storage = CoughRecording._meta.get_field('audio_file').storage
+        pending = list(groups.values())
+        segmented = failed = events = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = [storage.path(group['name']) for group in pending]
+            results = pool.map(_segment, paths, chunksize=max(1, min(32, len(paths) // (workers * 4))))
+            for group, (found, error) in zip(pending, results):
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Error processing {group["name"]}: {error}'))
+                    continue
+                CoughSegment.objects.replace(group['ids'], found)
+                segmented += 1
+                events += len(found)
+
+        elapsed = time.perf_counter() - started
+        rate = segmented / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Segmented {segmented} files ({failed} failed), {events} cough events in {elapsed:.1f}s '
+            f'({rate:.1f} files/s)'
+        ))
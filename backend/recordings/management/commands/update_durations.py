@@ -1,11 +1,26 @@
 from django.core.management.base import BaseCommand
-from recordings.models import CoughRecording
+from django.db import transaction
+from recordings.models import CoughRecording, DailyRollup, HourlyRollup, StatsCounter
+from recordings.signals import invalidate_recordings
 import os
 
 class Command(BaseCommand):
     help = 'Update durations for existing recordings'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='store_true',
+                          help='Queue a background decode job per recording instead of decoding here')
+
     def handle(self, *args, **options):
+        if options['queue']:
+            from core.jobs import enqueue
+            queued_count = 0
+            for recording_id in CoughRecording.objects.values_list('recording_id', flat=True).iterator():
+                enqueue('recordings.probe_metadata', {'recording_id': str(recording_id), 'decode': True})
+                queued_count += 1
+            self.stdout.write(self.style.SUCCESS(f'Queued {queued_count} jobs, run them with: python manage.py run_workers'))
+            return
+        
         try:
             from pydub import AudioSegment
         except ImportError:
@@ -23,8 +38,12 @@ class Command(BaseCommand):
                     actual_duration = len(audio) / 1000.0  # Convert milliseconds to seconds
                     
                     if abs(actual_duration - (record.duration or 0)) > 0.1:
-                        record.duration = actual_duration
-                        record.save()
+                        old_duration, record.duration = record.duration, actual_duration
+                        with transaction.atomic():
+                            record.save()
+                            for model in (StatsCounter, HourlyRollup, DailyRollup):
+                                model.objects.record_duration(record, old_duration)
+                            invalidate_recordings([record])
                         updated_count += 1
                         self.stdout.write(f'Updated {record.file_name}: {actual_duration:.2f}s')
                     else:
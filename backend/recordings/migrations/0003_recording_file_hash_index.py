@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0002_recording_file_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coughrecording',
+            name='file_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0004_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coughrecording',
+            name='original_duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0005_recording_original_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coughrecording',
+            name='canonical_file',
+            field=models.FileField(blank=True, default='', upload_to='canonical'),
+        ),
+    ]
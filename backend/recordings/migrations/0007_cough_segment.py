@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0006_recording_canonical_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coughrecording',
+            name='segment_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='CoughSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.FloatField()),
+                ('end', models.FloatField()),
+                ('onset', models.FloatField()),
+                ('peak_db', models.FloatField()),
+                ('recording', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='recordings.coughrecording')),
+            ],
+            options={
+                'verbose_name': 'Cough Segment',
+                'verbose_name_plural': 'Cough Segments',
+                'ordering': ['recording', 'start'],
+            },
+        ),
+    ]
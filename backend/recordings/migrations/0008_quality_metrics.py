@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0007_cough_segment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coughrecording',
+            name='clipping_ratio',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='coughrecording',
+            name='peak_db',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='coughrecording',
+            name='silence_ratio',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='coughrecording',
+            name='snr_db',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:10
+
+import recordings.models
+from django.db import migrations, models
+
+
+def count_existing(apps, schema_editor):
+    apps.get_model('recordings', 'StatsCounter').objects.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0009_near_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10)),
+                ('key', models.CharField(blank=True, default='', max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+                ('duration_sum', models.FloatField(default=0.0)),
+                ('duration_count', models.BigIntegerField(default=0)),
+                ('size_sum', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Statistics Counter',
+                'verbose_name_plural': 'Statistics Counters',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'key'), name='unique_stats_counter')],
+            },
+            managers=[
+                ('objects', recordings.models.StatsCounterManager()),
+            ],
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+import recordings.models
+from django.db import migrations, models
+
+
+def count_existing(apps, schema_editor):
+    HourlyRollup = apps.get_model('recordings', 'HourlyRollup')
+    HourlyRollup.objects.rebuild(apps.get_model('recordings', 'CoughRecording').objects.all(), 'hour')
+    apps.get_model('recordings', 'DailyRollup').objects.rebuild(HourlyRollup.objects.all(), 'day')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0010_stats_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateTimeField()),
+                ('recording_method', models.CharField(max_length=10)),
+                ('file_format', models.CharField(max_length=10)),
+                ('count', models.BigIntegerField(default=0)),
+                ('duration_sum', models.FloatField(default=0.0)),
+                ('duration_count', models.BigIntegerField(default=0)),
+                ('size_sum', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily Rollup',
+                'verbose_name_plural': 'Daily Rollups',
+                'ordering': ['period'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('period', 'recording_method', 'file_format'), name='unique_daily_rollup')],
+            },
+            managers=[
+                ('objects', recordings.models.RollupManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateTimeField()),
+                ('recording_method', models.CharField(max_length=10)),
+                ('file_format', models.CharField(max_length=10)),
+                ('count', models.BigIntegerField(default=0)),
+                ('duration_sum', models.FloatField(default=0.0)),
+                ('duration_count', models.BigIntegerField(default=0)),
+                ('size_sum', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Hourly Rollup',
+                'verbose_name_plural': 'Hourly Rollups',
+                'ordering': ['period'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('period', 'recording_method', 'file_format'), name='unique_hourly_rollup')],
+            },
+            managers=[
+                ('objects', recordings.models.RollupManager()),
+            ],
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
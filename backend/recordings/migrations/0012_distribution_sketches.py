@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:16
+
+import recordings.models
+from django.db import migrations, models
+
+
+def summarise_existing(apps, schema_editor):
+    apps.get_model('recordings', 'DistributionSketch').objects.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0011_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistributionSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=30, unique=True)),
+                ('sketch', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Distribution Sketch',
+                'verbose_name_plural': 'Distribution Sketches',
+            },
+            managers=[
+                ('objects', recordings.models.DistributionSketchManager()),
+            ],
+        ),
+        migrations.RunPython(summarise_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0012_distribution_sketches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coughrecording',
+            index=models.Index(fields=['created_at', 'id'], name='recording_created_at_id'),
+        ),
+        migrations.AddIndex(
+            model_name='coughrecording',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='recording_user_created_at_id'),
+        ),
+    ]
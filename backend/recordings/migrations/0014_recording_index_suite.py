@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def analyze(apps, schema_editor):
+    """Refresh the planner statistics so queries pick the new indexes"""
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('ANALYZE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0013_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coughrecording',
+            index=models.Index(fields=['recording_method', 'created_at', 'id'], name='recording_method_created_at_id'),
+        ),
+        migrations.AddIndex(
+            model_name='coughrecording',
+            index=models.Index(fields=['file_format', 'created_at', 'id'], name='recording_format_created_at_id'),
+        ),
+        migrations.AddIndex(
+            model_name='coughrecording',
+            index=models.Index(fields=['duration'], name='recording_duration'),
+        ),
+        migrations.AddIndex(
+            model_name='coughrecording',
+            index=models.Index(fields=['file_size'], name='recording_file_size'),
+        ),
+        migrations.RunPython(analyze, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:45
+
+from django.db import migrations
+from recordings import search
+
+
+def create_search_index(apps, schema_editor):
+    search.ensure(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0014_recording_index_suite'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
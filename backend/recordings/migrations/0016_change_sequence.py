@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:03
+
+import django.utils.timezone
+import recordings.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0015_recording_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Change Sequence',
+                'verbose_name_plural': 'Change Sequences',
+            },
+            managers=[
+                ('objects', recordings.models.ChangeSequenceManager()),
+            ],
+        ),
+    ]
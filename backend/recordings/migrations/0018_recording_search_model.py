@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:35
+
+import django.db.models.deletion
+import recordings.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0017_upload_session_claim'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingSearch',
+            fields=[
+                ('recording', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='recordings.coughrecording')),
+                ('document', recordings.search.DocumentField(db_column='recordings_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'recordings_search',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+from core import fingerprint
+
+
+def rekey_buckets(apps, schema_editor):
+    """Replace the bucket keys of stored fingerprints with keys of the current banding"""
+    AudioFingerprint = apps.get_model('recordings', 'AudioFingerprint')
+    FingerprintBucket = apps.get_model('recordings', 'FingerprintBucket')
+    FingerprintBucket.objects.all().delete()
+    batch = []
+    for pk, stored in AudioFingerprint.objects.values_list('pk', 'signature').iterator():
+        batch += [
+            FingerprintBucket(fingerprint_id=pk, key=key)
+            for key in fingerprint.band_keys(fingerprint.from_bytes(stored))
+        ]
+        if len(batch) >= 50000:
+            FingerprintBucket.objects.bulk_create(batch)
+            batch = []
+    FingerprintBucket.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0018_recording_search_model'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_buckets, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,16 @@
-from django.db import models
+from django.db import models, transaction
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
+import datetime
 import uuid
 import os
-from mutagen import File as MutagenFile
+from core import fingerprint
+from core.sketch import KLLSketch
+from core.ingest import ingest_upload
+from core.filelock import FileLock, LockUnavailable
+from .search import DocumentField
+from .signals import invalidate_recordings, recordings_created
 
 
 def upload_to(instance, filename):
@@ -41,6 +48,7 @@ class CoughRecording(models.Model):
     file_size = models.BigIntegerField()  # in bytes
     file_format = models.CharField(max_length=10)  # wav, mp3, etc.
     duration = models.FloatField(null=True, blank=True)  # in seconds
+    original_duration = models.FloatField(null=True, blank=True)  # before truncation
     
     # Recording method
     RECORDING_METHOD_CHOICES = [
@@ -62,8 +70,43 @@ class CoughRecording(models.Model):
     bit_rate = models.IntegerField(null=True, blank=True)
     channels = models.IntegerField(null=True, blank=True)
     
+    # SHA-256 of the stored audio content, shared with core.AudioBlob
+    file_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    
+    # 16 kHz mono FLAC derivative, see core.canonical
+    canonical_file = models.FileField(upload_to='canonical', blank=True, default='')
+    
+    # Number of detected cough events; None until the recording is segmented
+    segment_count = models.PositiveIntegerField(null=True, blank=True)
+    
+    # Quality metrics, see core.quality; None until the recording is measured
+    peak_db = models.FloatField(null=True, blank=True, db_index=True)  # dBFS
+    clipping_ratio = models.FloatField(null=True, blank=True, db_index=True)  # share of samples
+    silence_ratio = models.FloatField(null=True, blank=True, db_index=True)  # share of frames
+    snr_db = models.FloatField(null=True, blank=True, db_index=True)
+    
+    # Earliest recording of the same sound in other bytes (re-encoded, padded),
+    # see core.fingerprint
+    near_duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='near_duplicates'
+    )
+    
     class Meta:
         ordering = ['-created_at']
+        # Chosen from `manage.py explain_endpoints`: each list filter leads an
+        # index that continues in page order, so a filtered page is one range
+        # read with no sort. Meta indexes rather than db_index, which would
+        # make SQLite copy the whole table
+        indexes = [
+            # Keyset pagination, see recordings.pagination
+            models.Index(fields=['created_at', 'id'], name='recording_created_at_id'),
+            models.Index(fields=['user', 'created_at', 'id'], name='recording_user_created_at_id'),
+            models.Index(fields=['recording_method', 'created_at', 'id'], name='recording_method_created_at_id'),
+            models.Index(fields=['file_format', 'created_at', 'id'], name='recording_format_created_at_id'),
+            # ?ordering= on the page-number fallback
+            models.Index(fields=['duration'], name='recording_duration'),
+            models.Index(fields=['file_size'], name='recording_file_size'),
+        ]
         verbose_name = 'Cough Recording'
         verbose_name_plural = 'Cough Recordings'
     
@@ -72,63 +115,54 @@ class CoughRecording(models.Model):
         return f"Cough Recording by {user_display} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
     
     def save(self, *args, **kwargs):
-        if self.audio_file:
-            # Generate timestamp+username filename
-            timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-            if self.user:
-                username = self.user.username
-            elif self.anonymous_name:
-                username = self.anonymous_name
-            else:
-                username = 'anonymous'
-            
-            # Clean username for filename
-            username = ''.join(c for c in username if c.isalnum() or c in '-_')
-            original_ext = os.path.basename(self.audio_file.name).split('.')[-1].lower()
-            
-            # Set the formatted filename
-            self.file_name = f"{timestamp}_{username}.{original_ext}"
-            self.file_size = self.audio_file.size
-            self.file_format = original_ext
-            
-            # Try to extract audio metadata
-            try:
-                # First try with mutagen for basic metadata
-                self.audio_file.file.seek(0)
-                audio_file = MutagenFile(self.audio_file.file)
-                if audio_file and hasattr(audio_file, 'info'):
-                    self.sample_rate = getattr(audio_file.info, 'sample_rate', None)
-                    self.bit_rate = getattr(audio_file.info, 'bitrate', None)
-                    self.channels = getattr(audio_file.info, 'channels', None)
-                    # Try to get duration from mutagen first
-                    duration_from_mutagen = getattr(audio_file.info, 'length', None)
-                    if duration_from_mutagen:
-                        self.duration = duration_from_mutagen
-                self.audio_file.file.seek(0)
-            except Exception as e:
-                pass
-                
-            # Fallback: if still no duration, use defaults
-            if not self.duration:
-                if self.recording_method == 'browser':
-                    self.duration = 10.0  # Default for browser recordings
+        # Blob references, the row and its follow-up work are committed together
+        is_new = self._state.adding
+        with transaction.atomic():
+            if self.audio_file and not self.audio_file._committed:
+                self.apply_ingest_metadata(ingest_upload(self.audio_file))
+            super().save(*args, **kwargs)
+            if is_new:
+                recordings_created.send(sender=CoughRecording, recordings=[self])
+    
+    def apply_ingest_metadata(self, metadata):
+        """Copy the metadata of an ingested upload onto the row"""
+        # Generate timestamp+username filename
+        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+        if self.user:
+            username = self.user.username
+        elif self.anonymous_name:
+            username = self.anonymous_name
+        else:
+            username = 'anonymous'
         
-        # Save first to get the file path, then update duration if needed
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
+        # Clean username for filename
+        username = ''.join(c for c in username if c.isalnum() or c in '-_')
         
-        # If this is a new record and we still don't have duration, try pydub
-        if is_new and not self.duration and self.audio_file:
-            try:
-                from pydub import AudioSegment
-                audio = AudioSegment.from_file(self.audio_file.path)
-                self.duration = len(audio) / 1000.0  # Convert milliseconds to seconds
-                # Update the record with the correct duration
-                CoughRecording.objects.filter(pk=self.pk).update(duration=self.duration)
-            except Exception:
-                # If all else fails, set default for browser recordings
-                if self.recording_method == 'browser':
-                    CoughRecording.objects.filter(pk=self.pk).update(duration=10.0)
+        self.file_name = f"{timestamp}_{username}.{metadata['file_format']}"
+        self.file_size = metadata['file_size']
+        self.file_format = metadata['file_format']
+        self.file_hash = metadata['file_hash']
+        self.sample_rate = metadata['sample_rate']
+        self.bit_rate = metadata['bit_rate']
+        self.channels = metadata['channels']
+        self.was_duplicate = metadata.get('was_duplicate', False)
+        if metadata['duration']:
+            self.duration = metadata['duration']
+        self.original_duration = metadata.get('original_duration') or metadata['duration']
+        
+        # The header had no duration: a background job decodes the file
+        # instead of keeping the request waiting on ffmpeg
+        self.needs_metadata_probe = not metadata['duration']
+        
+        # Fallback until the background probe finds the real duration
+        if not self.duration and self.recording_method == 'browser':
+            self.duration = 10.0  # Default for browser recordings
+    
+    @property
+    def was_truncated(self):
+        """True if only the first MAX_RECORDING_DURATION seconds were stored"""
+        return bool(self.original_duration and self.duration
+                    and self.original_duration > self.duration + 0.05)
     
     @property
     def user_display_name(self):
@@ -141,3 +175,614 @@ class CoughRecording(models.Model):
     def file_size_mb(self):
         """Return file size in MB"""
         return round(self.file_size / (1024 * 1024), 2) if self.file_size else 0
+
+
+class CoughSegmentManager(models.Manager):
+    """Storage of detected cough events"""
+
+    def replace(self, recording_ids, events):
+        """Store `events` (dicts from core.segmentation) for every given recording"""
+        with transaction.atomic():
+            recordings = list(CoughRecording.objects.filter(
+                recording_id__in=recording_ids
+            ).only('recording_id', 'user_id'))
+            pks = [recording.pk for recording in recordings]
+            self.filter(recording_id__in=pks).delete()
+            self.bulk_create([
+                CoughSegment(recording_id=pk, **event)
+                for pk in pks
+                for event in events
+            ])
+            CoughRecording.objects.filter(pk__in=pks).update(segment_count=len(events))
+            invalidate_recordings(recordings, stats=False)
+
+
+class CoughSegment(models.Model):
+    """A cough event detected inside a recording, see core.segmentation"""
+    recording = models.ForeignKey(CoughRecording, on_delete=models.CASCADE, related_name='segments')
+    start = models.FloatField()  # seconds from the start of the clip
+    end = models.FloatField()
+    onset = models.FloatField()  # strongest spectral change near the start
+    peak_db = models.FloatField()  # loudest frame, dBFS
+    
+    objects = CoughSegmentManager()
+    
+    class Meta:
+        ordering = ['recording', 'start']
+        verbose_name = 'Cough Segment'
+        verbose_name_plural = 'Cough Segments'
+    
+    def __str__(self):
+        return f"{self.start:.2f}-{self.end:.2f}s of {self.recording_id}"
+
+
+class AudioFingerprintManager(models.Manager):
+    """Fingerprint storage and LSH lookups"""
+
+    def store(self, file_hash, signature):
+        """Store the signature of some content and its LSH bucket keys, once"""
+        with transaction.atomic():
+            stored, created = self.get_or_create(
+                file_hash=file_hash, defaults={'signature': fingerprint.to_bytes(signature)}
+            )
+            if created:
+                FingerprintBucket.objects.bulk_create([
+                    FingerprintBucket(fingerprint=stored, key=key)
+                    for key in fingerprint.band_keys(signature)
+                ])
+        return stored
+
+    def candidates(self, signature):
+        """Stored content sharing at least one LSH bucket with `signature`"""
+        return self.filter(buckets__key__in=fingerprint.band_keys(signature)).distinct()
+
+    def similar(self, signature, exclude_hash='', threshold=fingerprint.SIMILARITY_THRESHOLD):
+        """
+        [(file_hash, similarity)] of stored content similar to `signature`,
+        most similar first. Only content sharing an LSH bucket is compared.
+        """
+        candidates = self.candidates(signature).exclude(
+            file_hash=exclude_hash
+        ).values_list('file_hash', 'signature')
+        scored = [
+            (file_hash, fingerprint.similarity(signature, fingerprint.from_bytes(stored)))
+            for file_hash, stored in candidates
+        ]
+        return sorted([item for item in scored if item[1] >= threshold], key=lambda item: -item[1])
+
+
+class AudioFingerprint(models.Model):
+    """MinHash signature of stored audio content, see core.fingerprint"""
+    file_hash = models.CharField(max_length=64, unique=True)
+    signature = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = AudioFingerprintManager()
+    
+    class Meta:
+        verbose_name = 'Audio Fingerprint'
+        verbose_name_plural = 'Audio Fingerprints'
+    
+    def __str__(self):
+        return self.file_hash[:12]
+
+
+class FingerprintBucket(models.Model):
+    """One LSH band key of a fingerprint; content sharing a key is a candidate duplicate"""
+    fingerprint = models.ForeignKey(AudioFingerprint, on_delete=models.CASCADE, related_name='buckets')
+    key = models.BigIntegerField(db_index=True)
+
+
+class UploadSession(models.Model):
+    """A resumable upload whose bytes are appended to a spool file"""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('finalizing', 'Finalizing'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+    # A finalize claim older than this belongs to a request that died
+    FINALIZE_TIMEOUT = datetime.timedelta(minutes=10)
+    
+    session_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    anonymous_name = models.CharField(max_length=100, null=True, blank=True)
+    recording_method = models.CharField(max_length=10, choices=CoughRecording.RECORDING_METHOD_CHOICES)
+    
+    # What the client announced when opening the session
+    file_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    total_size = models.BigIntegerField()
+    
+    # Number of bytes received so far, i.e. the offset of the next chunk
+    received_size = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    recording = models.ForeignKey(CoughRecording, on_delete=models.SET_NULL, null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Upload Session'
+        verbose_name_plural = 'Upload Sessions'
+    
+    def __str__(self):
+        return f"Upload {self.session_id} ({self.received_size}/{self.total_size} bytes)"
+    
+    @property
+    def spool_path(self):
+        """Path of the partial file on local disk"""
+        return os.path.join(settings.UPLOAD_SPOOL_DIR, f"{self.session_id.hex}.part")
+    
+    def append_chunk(self, offset, stream, length):
+        """
+        Write `length` bytes from `stream` at `offset`, which must equal the
+        bytes already received. Returns the new offset, or None if the
+        offset does not match or another request is writing the session.
+        """
+        try:
+            with FileLock(f"{self.spool_path}.lock", blocking=False):
+                self.refresh_from_db(fields=['received_size', 'status'])
+                if self.status != 'open' or offset != self.received_size:
+                    return None
+                
+                spooled = os.path.getsize(self.spool_path) if os.path.exists(self.spool_path) else 0
+                if spooled < offset:
+                    # The spool lost data; make the client resend from what is on disk
+                    UploadSession.objects.filter(pk=self.pk).update(received_size=spooled)
+                    self.received_size = spooled
+                    return None
+                
+                with open(self.spool_path, 'r+b' if spooled else 'wb') as spool:
+                    # Drop anything an interrupted write left past the offset
+                    spool.truncate(offset)
+                    spool.seek(offset)
+                    remaining = length
+                    while remaining > 0:
+                        chunk = stream.read(min(remaining, 64 * 1024))
+                        if not chunk:
+                            break
+                        spool.write(chunk)
+                        remaining -= len(chunk)
+                
+                self.received_size = offset + length - remaining
+                UploadSession.objects.filter(pk=self.pk).update(
+                    received_size=self.received_size, updated_at=timezone.now()
+                )
+                return self.received_size
+        except LockUnavailable:
+            return None
+    
+    def claim(self):
+        """
+        Move a fully received session to 'finalizing'. Returns False if
+        another request holds the claim or the session is not finalizable.
+        """
+        now = timezone.now()
+        claimed = UploadSession.objects.filter(
+            models.Q(status='open') | models.Q(status='finalizing', updated_at__lt=now - self.FINALIZE_TIMEOUT),
+            pk=self.pk, received_size=self.total_size,
+        ).update(status='finalizing', updated_at=now)
+        if claimed:
+            self.status = 'finalizing'
+        return bool(claimed)
+    
+    def release(self, status):
+        """End a claim without a recording: 'failed' also drops the spool"""
+        UploadSession.objects.filter(pk=self.pk, status='finalizing').update(
+            status=status, updated_at=timezone.now()
+        )
+        self.status = status
+        if status == 'failed':
+            self.discard_spool()
+    
+    def discard_spool(self):
+        """Remove the partial file if it is still there"""
+        for path in (self.spool_path, f"{self.spool_path}.lock"):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+class StatsCounterManager(models.Manager):
+    """Running totals of CoughRecording rows, see StatsCounter"""
+    use_in_migrations = True
+    
+    SUMMARY_KINDS = ['total', 'anonymous', 'users', 'method', 'format']
+    
+    def _add(self, deltas):
+        """Add {(kind, key): (count, duration_sum, duration_count, size_sum)} to the counters"""
+        deltas = {slot: values for slot, values in deltas.items() if any(values)}
+        if not deltas:
+            return
+        self.bulk_create([self.model(kind=kind, key=key) for kind, key in deltas], ignore_conflicts=True)
+        for (kind, key), (count, duration_sum, duration_count, size_sum) in deltas.items():
+            self.filter(kind=kind, key=key).update(
+                count=models.F('count') + count,
+                duration_sum=models.F('duration_sum') + duration_sum,
+                duration_count=models.F('duration_count') + duration_count,
+                size_sum=models.F('size_sum') + size_sum,
+            )
+    
+    def record(self, recordings, sign=1):
+        """
+        Count new (sign=1) or deleted (sign=-1) recordings. Must run in the
+        transaction that creates or deletes them so the totals never drift.
+        """
+        deltas = {}
+        users = {}
+        for recording in recordings:
+            duration = recording.duration or 0.0
+            values = (sign, sign * duration, sign * (recording.duration is not None), sign * (recording.file_size or 0))
+            slots = [('total', ''), ('method', recording.recording_method), ('format', recording.file_format)]
+            if recording.user_id is None:
+                slots.append(('anonymous', ''))
+            else:
+                users[str(recording.user_id)] = users.get(str(recording.user_id), 0) + sign
+            for slot in slots:
+                deltas[slot] = tuple(a + b for a, b in zip(deltas.get(slot, (0, 0.0, 0, 0)), values))
+        for user, count in users.items():
+            deltas[('user', user)] = (count, 0.0, 0, 0)
+        self._add(deltas)
+        
+        if users:
+            # Distinct contributors change when a user's count leaves or reaches zero
+            now = dict(self.filter(kind='user', key__in=list(users)).values_list('key', 'count'))
+            joined = sum(1 for user, count in users.items() if count > 0 and now.get(user) == count)
+            left = sum(1 for user, count in users.items() if count < 0 and now.get(user) == 0)
+            self._add({('users', ''): (joined - left, 0.0, 0, 0)})
+            self.filter(kind='user', key__in=list(users), count__lte=0).delete()
+    
+    def record_duration(self, recording, old_duration):
+        """Move a recording's contribution from `old_duration` to its current duration"""
+        delta = (0, (recording.duration or 0.0) - (old_duration or 0.0),
+                 (recording.duration is not None) - (old_duration is not None), 0)
+        self._add({
+            ('total', ''): delta,
+            ('method', recording.recording_method): delta,
+            ('format', recording.file_format): delta,
+        })
+    
+    def rebuild(self):
+        """Recount everything from the recordings table; returns the number of recordings"""
+        from django.db.models import Count, Sum
+        recordings = self.model._meta.apps.get_model('recordings', 'CoughRecording').objects
+        totals = dict(
+            count=Count('id'), duration_sum=Sum('duration'),
+            duration_count=Count('duration'), size_sum=Sum('file_size'),
+        )
+        
+        def counter(kind, key, row):
+            return self.model(kind=kind, key=key or '', count=row['count'],
+                              duration_sum=row['duration_sum'] or 0.0,
+                              duration_count=row['duration_count'], size_sum=row['size_sum'] or 0)
+        
+        total = recordings.aggregate(**totals)
+        counters = [
+            counter('total', '', total),
+            counter('anonymous', '', recordings.filter(user__isnull=True).aggregate(**totals)),
+        ]
+        for kind, field in (('method', 'recording_method'), ('format', 'file_format')):
+            counters += [counter(kind, row[field], row)
+                         for row in recordings.values(field).order_by().annotate(**totals)]
+        per_user = list(recordings.filter(user__isnull=False).values('user').order_by().annotate(count=Count('id')))
+        counters += [self.model(kind='user', key=str(row['user']), count=row['count']) for row in per_user]
+        counters.append(self.model(kind='users', key='', count=len(per_user)))
+        
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(counters)
+        return total['count']
+    
+    def summary(self):
+        """The /api/recordings/stats/ numbers, read from a handful of counter rows"""
+        counters = {(row.kind, row.key): row for row in self.filter(kind__in=self.SUMMARY_KINDS)}
+        empty = self.model()
+        total = counters.get(('total', ''), empty)
+        return {
+            'total_recordings': total.count,
+            'total_users': counters.get(('users', ''), empty).count,
+            'total_anonymous': counters.get(('anonymous', ''), empty).count,
+            'total_duration': total.duration_sum,
+            'total_size_mb': round(total.size_sum / (1024 * 1024), 2),
+            'avg_duration': round(total.duration_sum / total.duration_count, 2) if total.duration_count else 0,
+            'recordings_by_method': {key: row.count for (kind, key), row in counters.items()
+                                     if kind == 'method' and row.count},
+            'recordings_by_format': {key: row.count for (kind, key), row in counters.items()
+                                     if kind == 'format' and row.count},
+        }
+
+
+class StatsCounter(models.Model):
+    """
+    Materialized totals behind the statistics endpoint, updated in the same
+    transaction as every create and delete. Rows: ('total', ''),
+    ('anonymous', ''), ('users', '') for distinct contributors, and one per
+    recording method, file format and contributing user. `manage.py
+    rebuild_stats` recounts them from the recordings table.
+    """
+    kind = models.CharField(max_length=10)
+    key = models.CharField(max_length=100, blank=True, default='')
+    count = models.BigIntegerField(default=0)
+    duration_sum = models.FloatField(default=0.0)
+    duration_count = models.BigIntegerField(default=0)  # recordings with a known duration
+    size_sum = models.BigIntegerField(default=0)
+    
+    objects = StatsCounterManager()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='unique_stats_counter'),
+        ]
+        verbose_name = 'Statistics Counter'
+        verbose_name_plural = 'Statistics Counters'
+    
+    def __str__(self):
+        return f"{self.kind}:{self.key} = {self.count}"
+
+
+class RollupManager(models.Manager):
+    """Incremental updates and recounts of a time-bucketed rollup table"""
+    use_in_migrations = True
+    
+    def _add(self, deltas):
+        """Add {(period, method, format): (count, duration_sum, duration_count, size_sum)} to the rows"""
+        deltas = {slot: values for slot, values in deltas.items() if any(values)}
+        if not deltas:
+            return
+        self.bulk_create([
+            self.model(period=period, recording_method=method, file_format=file_format)
+            for period, method, file_format in deltas
+        ], ignore_conflicts=True)
+        for (period, method, file_format), (count, duration_sum, duration_count, size_sum) in deltas.items():
+            self.filter(period=period, recording_method=method, file_format=file_format).update(
+                count=models.F('count') + count,
+                duration_sum=models.F('duration_sum') + duration_sum,
+                duration_count=models.F('duration_count') + duration_count,
+                size_sum=models.F('size_sum') + size_sum,
+            )
+    
+    def record(self, recordings, sign=1):
+        """Count new (sign=1) or deleted (sign=-1) recordings in the bucket of their created_at"""
+        deltas = {}
+        for recording in recordings:
+            slot = (self.model.truncate(recording.created_at), recording.recording_method, recording.file_format)
+            values = (sign, sign * (recording.duration or 0.0), sign * (recording.duration is not None),
+                      sign * (recording.file_size or 0))
+            deltas[slot] = tuple(a + b for a, b in zip(deltas.get(slot, (0, 0.0, 0, 0)), values))
+        self._add(deltas)
+    
+    def record_duration(self, recording, old_duration):
+        """Move a recording's contribution from `old_duration` to its current duration"""
+        self._add({
+            (self.model.truncate(recording.created_at), recording.recording_method, recording.file_format): (
+                0, (recording.duration or 0.0) - (old_duration or 0.0),
+                (recording.duration is not None) - (old_duration is not None), 0,
+            ),
+        })
+    
+    def rebuild(self, source, resolution=None):
+        """
+        Recount from `source`, a queryset of finer rows: CoughRecording for
+        hours, HourlyRollup for days. `resolution` defaults to the model's
+        (migrations pass it, historical models have no RESOLUTION).
+        Returns the number of rows written.
+        """
+        resolution = resolution or self.model.RESOLUTION
+        from django.db.models import Count, Sum
+        from django.db.models.functions import Trunc
+        if source.model._meta.model_name == 'coughrecording':
+            totals = dict(count=Count('id'), duration_sum=Sum('duration'),
+                          duration_count=Count('duration'), size_sum=Sum('file_size'))
+            field = 'created_at'
+        else:
+            totals = dict(count=Sum('count'), duration_sum=Sum('duration_sum'),
+                          duration_count=Sum('duration_count'), size_sum=Sum('size_sum'))
+            field = 'period'
+        rows = source.annotate(
+            bucket=Trunc(field, resolution, tzinfo=datetime.timezone.utc)
+        ).values('bucket', 'recording_method', 'file_format').order_by().annotate(**totals)
+        rollups = [
+            self.model(period=row['bucket'], recording_method=row['recording_method'],
+                       file_format=row['file_format'], count=row['count'],
+                       duration_sum=row['duration_sum'] or 0.0,
+                       duration_count=row['duration_count'] or 0, size_sum=row['size_sum'] or 0)
+            for row in rows if row['count']
+        ]
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rollups, batch_size=1000)
+        return len(rollups)
+
+
+class Rollup(models.Model):
+    """
+    Recordings created in one time bucket (UTC) with one method and format.
+    Updated with the StatsCounter totals in the creating and deleting
+    transactions; `manage.py rebuild_stats` recounts them.
+    """
+    RESOLUTION = None
+    
+    period = models.DateTimeField()  # start of the bucket
+    recording_method = models.CharField(max_length=10)
+    file_format = models.CharField(max_length=10)
+    count = models.BigIntegerField(default=0)
+    duration_sum = models.FloatField(default=0.0)
+    duration_count = models.BigIntegerField(default=0)
+    size_sum = models.BigIntegerField(default=0)
+    
+    objects = RollupManager()
+    
+    class Meta:
+        abstract = True
+        ordering = ['period']
+    
+    @classmethod
+    def truncate(cls, moment):
+        """Start of the bucket holding `moment`"""
+        moment = moment.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+        return moment.replace(hour=0) if cls.RESOLUTION == 'day' else moment
+    
+    def __str__(self):
+        return f"{self.period:%Y-%m-%d %H:00} {self.recording_method}/{self.file_format}: {self.count}"
+
+
+class HourlyRollup(Rollup):
+    RESOLUTION = 'hour'
+    
+    class Meta(Rollup.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'recording_method', 'file_format'],
+                                    name='unique_hourly_rollup'),
+        ]
+        verbose_name = 'Hourly Rollup'
+        verbose_name_plural = 'Hourly Rollups'
+
+
+class DailyRollup(Rollup):
+    """Recounted from the hourly rows; weeks and months are summed from these"""
+    RESOLUTION = 'day'
+    
+    class Meta(Rollup.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'recording_method', 'file_format'],
+                                    name='unique_daily_rollup'),
+        ]
+        verbose_name = 'Daily Rollup'
+        verbose_name_plural = 'Daily Rollups'
+
+
+class DistributionSketchManager(models.Manager):
+    """Quantile sketches of numeric recording fields, see DistributionSketch"""
+    use_in_migrations = True
+    
+    FIELDS = ('duration', 'file_size', 'sample_rate')
+    
+    def add(self, field, values):
+        """Merge `values` of one field into its stored sketch"""
+        values = [value for value in values if value is not None]
+        if not values:
+            return
+        batch = KLLSketch()
+        batch.update(values)
+        with transaction.atomic():
+            stored, _ = self.select_for_update().get_or_create(field=field, defaults={'sketch': b''})
+            sketch = KLLSketch.from_bytes(stored.sketch) if stored.sketch else KLLSketch()
+            sketch.merge(batch)
+            stored.sketch = sketch.to_bytes()
+            stored.save(update_fields=['sketch', 'updated_at'])
+    
+    def record(self, recordings):
+        """
+        Add new recordings; runs in their creating transaction. A duration
+        still to be probed is left out: sketches cannot replace a value, so
+        the probe job adds the real one.
+        """
+        for field in self.FIELDS:
+            self.add(field, [getattr(recording, field) for recording in recordings
+                             if field != 'duration' or not getattr(recording, 'needs_metadata_probe', False)])
+    
+    def rebuild(self, chunk_size=100000):
+        """Summarise every recording again, dropping deleted ones; returns the number of recordings"""
+        recordings = self.model._meta.apps.get_model('recordings', 'CoughRecording').objects
+        sketches = {}
+        for field in self.FIELDS:
+            sketch = KLLSketch()
+            values = recordings.exclude(**{f'{field}__isnull': True}).values_list(field, flat=True)
+            chunk = []
+            for value in values.iterator(chunk_size=chunk_size):
+                chunk.append(value)
+                if len(chunk) >= chunk_size:
+                    sketch.update(chunk)
+                    chunk = []
+            sketch.update(chunk)
+            sketches[field] = sketch
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create([self.model(field=field, sketch=sketch.to_bytes())
+                              for field, sketch in sketches.items()])
+        return recordings.count()
+    
+    def sketches(self):
+        """{field: KLLSketch} for every field, empty ones included"""
+        stored = dict(self.values_list('field', 'sketch'))
+        return {field: KLLSketch.from_bytes(stored[field]) if stored.get(field) else KLLSketch()
+                for field in self.FIELDS}
+
+
+class DistributionSketch(models.Model):
+    """
+    KLL quantile sketch (core.sketch) of one numeric CoughRecording field,
+    merged with every new batch of recordings in its creating transaction.
+    Sketches cannot forget values, so deleted recordings count until
+    `manage.py rebuild_stats` summarises the table again.
+    """
+    field = models.CharField(max_length=30, unique=True)
+    sketch = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = DistributionSketchManager()
+    
+    class Meta:
+        verbose_name = 'Distribution Sketch'
+        verbose_name_plural = 'Distribution Sketches'
+    
+    def __str__(self):
+        return self.field
+
+
+class ChangeSequenceManager(models.Manager):
+    """The global recordings change sequence, see ChangeSequence"""
+    use_in_migrations = True
+    
+    NAME = 'recordings'
+    
+    def bump(self):
+        """Advance the sequence; run in the writing transaction so it rolls back with the write"""
+        now = timezone.now()
+        if not self.filter(name=self.NAME).update(value=models.F('value') + 1, changed_at=now):
+            self.get_or_create(name=self.NAME, defaults={'value': 1, 'changed_at': now})
+    
+    def current(self):
+        """(value, changed_at) of the sequence, (0, None) before the first write"""
+        row = self.filter(name=self.NAME).values_list('value', 'changed_at').first()
+        return row or (0, None)
+
+
+class ChangeSequence(models.Model):
+    """
+    Counter advanced with every CoughRecording write, from which the list,
+    detail and statistics endpoints derive their ETag and Last-Modified
+    (recordings.changes). It only ever grows, so a value seen once never
+    describes different data.
+    """
+    name = models.CharField(max_length=30, unique=True)
+    value = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    objects = ChangeSequenceManager()
+    
+    class Meta:
+        verbose_name = 'Change Sequence'
+        verbose_name_plural = 'Change Sequences'
+    
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class RecordingSearch(models.Model):
+    """
+    The FTS5 table of recordings.search, one row per recording under its
+    id. Created and kept in sync by that module, not by migrations; mapped
+    only so `?search=` can join it and order by its bm25 `rank`.
+    """
+    recording = models.OneToOneField(CoughRecording, on_delete=models.DO_NOTHING, primary_key=True,
+                                     db_column='rowid', db_constraint=False, related_name='search')
+    document = DocumentField(db_column='recordings_search')
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'recordings_search'
@@ -0,0 +1,145 @@
+"""
+Keyset pagination for recording lists. Pages are ordered by
+(created_at, id) and a cursor holds the position of the last row seen,
+so a page is an index range scan from that position instead of
+OFFSET n, and rows inserted meanwhile never shift, repeat or skip rows on
+later pages. `?page=`, orderings on other fields and search results in
+relevance order keep the page-number pagination. Both take `?page_size=`
+up to MAX_PAGE_SIZE.
+"""
+import base64
+import binascii
+import contextlib
+import datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .models import StatsCounter
+
+COUNT_LIMIT = 10000  # filtered approximate counts stop here
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(created_at, pk, reverse=False) -> str:
+    position = f'{created_at.isoformat()}|{pk}|{int(reverse)}'
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(created_at, id, reverse) of a cursor; NotFound if it is malformed"""
+    try:
+        created_at, pk, reverse = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.datetime.fromisoformat(created_at), int(pk), reverse == '1'
+    except (binascii.Error, UnicodeError, ValueError):
+        raise NotFound('Invalid cursor.')
+
+
+class RecordingPageNumberPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class RecordingCursorPagination(BasePagination):
+    """
+    `?cursor=` from the `next` / `previous` links pages through recordings,
+    newest first (`?ordering=created_at` for oldest first). The total in
+    `count` is exact by default: read from the statistics counters for an
+    unfiltered list, COUNT(*) otherwise. `?count=approximate` counts at
+    most COUNT_LIMIT rows of a filtered list and `?count=none` leaves the
+    total out.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def get_page_size(self, request):
+        with contextlib.suppress(KeyError, ValueError):
+            return _positive_int(request.query_params[self.page_size_query_param],
+                                 strict=True, cutoff=self.max_page_size)
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        # Other orderings (a field, search relevance) keep page numbers
+        query = queryset.query
+        ordering = tuple(query.order_by) or tuple(queryset.model._meta.ordering)
+        if 'page' in request.query_params or ordering not in (('created_at',), ('-created_at',)):
+            self.fallback = RecordingPageNumberPagination()
+            return self.fallback.paginate_queryset(queryset, request, view)
+        self.fallback = None
+        self.descending = ordering == ('-created_at',)
+        self.count = self.get_count(queryset, request, view)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        created_at = pk = None
+        reverse = False
+        if cursor:
+            created_at, pk, reverse = decode_cursor(cursor)
+
+        # A previous page is read backwards from the cursor and flipped
+        descending = self.descending != reverse
+        fields = ('-created_at', '-id') if descending else ('created_at', 'id')
+        queryset = queryset.order_by(*fields)
+        if cursor:
+            if descending:
+                queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+            else:
+                queryset = queryset.filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=pk)
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = more, True
+        else:
+            self.has_previous, self.has_next = bool(cursor), more
+        self.rows = rows
+        return rows
+
+    def get_count(self, queryset, request, view):
+        mode = request.query_params.get(self.count_query_param, 'exact')
+        if mode == 'none':
+            return None
+        # Views name the StatsCounter (kind, key) that holds their unfiltered total
+        counter = getattr(view, 'stats_counter', None)
+        # Compared on the row set alone; the selected columns may differ
+        unfiltered = (str(queryset.values('pk').order_by().query)
+                      == str(view.get_queryset().values('pk').order_by().query))
+        if counter and unfiltered:
+            # Updated in the same transaction as every write, so as exact as COUNT(*)
+            kind, key = counter(request)
+            row = StatsCounter.objects.filter(kind=kind, key=key).first()
+            return row.count if row else 0
+        if mode == 'approximate':
+            return queryset.order_by()[:COUNT_LIMIT].count()
+        return queryset.count()
+
+    def _link(self, row, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(row.created_at, row.id, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self._link(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.fallback:
+            return self.fallback.get_paginated_response(data)
+        page = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.count is not None:
+            page['count'] = self.count
+        page['results'] = data
+        return Response(page)
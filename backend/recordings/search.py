@@ -0,0 +1,140 @@
+"""
+Full-text search over recordings with SQLite FTS5.
+`recordings_search` holds the searchable text of every recording
+(contributor username, anonymous name, file name) under the recording's
+id as rowid, with prefix indexes so `?search=` terms match word
+beginnings from an index instead of a LIKE '%term%' scan. Triggers on
+the recordings and user tables keep it in sync with every insert, update
+and delete, bulk ones included. The unmanaged RecordingSearch model lets
+querysets join it. Other databases use DRF's SearchFilter.
+"""
+import logging
+import re
+from django.db import connection, models
+from rest_framework.filters import SearchFilter
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'recordings_search'
+TRIGGERS = {
+    'recordings_search_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS recordings_search_insert AFTER INSERT ON recordings_coughrecording BEGIN
+            INSERT INTO {TABLE} (rowid, username, anonymous_name, file_name)
+            VALUES (new.id, (SELECT username FROM auth_user WHERE id = new.user_id),
+                    new.anonymous_name, new.file_name);
+        END""",
+    'recordings_search_update': f"""
+        CREATE TRIGGER IF NOT EXISTS recordings_search_update
+        AFTER UPDATE OF user_id, anonymous_name, file_name ON recordings_coughrecording BEGIN
+            DELETE FROM {TABLE} WHERE rowid = old.id;
+            INSERT INTO {TABLE} (rowid, username, anonymous_name, file_name)
+            VALUES (new.id, (SELECT username FROM auth_user WHERE id = new.user_id),
+                    new.anonymous_name, new.file_name);
+        END""",
+    'recordings_search_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS recordings_search_delete AFTER DELETE ON recordings_coughrecording BEGIN
+            DELETE FROM {TABLE} WHERE rowid = old.id;
+        END""",
+    'recordings_search_username': f"""
+        CREATE TRIGGER IF NOT EXISTS recordings_search_username AFTER UPDATE OF username ON auth_user BEGIN
+            UPDATE {TABLE} SET username = new.username
+            WHERE rowid IN (SELECT id FROM recordings_coughrecording WHERE user_id = new.id);
+        END""",
+}
+
+
+def available(using=connection) -> bool:
+    return using.vendor == 'sqlite'
+
+
+def rebuild(using=connection) -> int:
+    """Refill the search table from the recordings; returns the number of rows"""
+    with using.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(f"""
+            INSERT INTO {TABLE} (rowid, username, anonymous_name, file_name)
+            SELECT r.id, u.username, r.anonymous_name, r.file_name
+            FROM recordings_coughrecording r LEFT JOIN auth_user u ON u.id = r.user_id
+        """)
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def ensure(using=connection) -> bool:
+    """
+    Create the search table and triggers where missing. SQLite drops a
+    table's triggers when a migration rebuilds it, so a missing trigger
+    means updates were not mirrored and the table is refilled. Returns
+    True if it was.
+    """
+    if not available(using):
+        return False
+    with using.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE 'recordings_search%'")
+        existing = {row[0] for row in cursor.fetchall()}
+        if TABLE in existing and existing.issuperset(TRIGGERS):
+            return False
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+                username, anonymous_name, file_name,
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
+        """)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+    count = rebuild(using)
+    logger.info(f"Search index rebuilt with {count} recordings")
+    return True
+
+
+def drop(using=connection) -> None:
+    if not available(using):
+        return
+    with using.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Match(models.Lookup):
+    """`document__match=expression`: FTS5 MATCH against the whole table"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class DocumentField(models.TextField):
+    """The hidden FTS5 column named after its table; only for __match lookups"""
+
+
+DocumentField.register_lookup(Match)
+
+
+def match_expression(terms) -> str:
+    """An FTS5 query matching recordings with a word starting with each term"""
+    words = [word for term in terms for word in re.findall(r'\w+', term.lower())]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    `?search=` through the FTS5 table. Results are ordered by relevance
+    (bm25) unless `ordering` is given, which keeps cursor pagination for
+    `ordering=-created_at` / `created_at`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not available():
+            return super().filter_queryset(request, queryset, view)
+        expression = match_expression(self.get_search_terms(request))
+        if not expression:
+            return queryset
+        # Joined (RecordingSearch), so bm25 is computed in one pass over the matches
+        queryset = queryset.filter(search__document__match=expression)
+        if 'ordering' in request.query_params:
+            return queryset
+        return queryset.order_by('search__rank', '-created_at')
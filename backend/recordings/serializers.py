@@ -1,24 +1,89 @@
-from rest_framework import serializers
+import uuid
+from operator import itemgetter
+from rest_framework import ISO_8601, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
 from django.contrib.auth.models import User
+from django.utils.encoding import filepath_to_uri
 from .models import CoughRecording
 
 
-class CoughRecordingSerializer(serializers.ModelSerializer):
+def _field_names(request, param):
+    return [name.strip() for name in request.query_params.get(param, '').split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    On GET, serializes only the fields listed in `?fields=` and drops those
+    in `?omit=` (comma separated). `column_sources` names the model columns
+    behind computed fields, so `load_only` can read just the columns the
+    remaining fields need.
+    """
+    column_sources = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        wanted, omitted = _field_names(request, 'fields'), _field_names(request, 'omit')
+        unknown = [name for name in wanted + omitted if name not in self.fields]
+        if unknown:
+            raise ValidationError({
+                'fields': f'Unknown field(s) {", ".join(unknown)}; choose from {", ".join(self.fields)}'
+            })
+        for name in list(self.fields):
+            if (wanted and name not in wanted) or name in omitted:
+                self.fields.pop(name)
+
+    def columns(self, *always):
+        """The key, `always` and the model columns the serialized fields read"""
+        columns = {'id', *always}
+        for name, field in self.fields.items():
+            columns.update(self.column_sources.get(name, [field.source]))
+        return sorted(columns)
+
+    def load_only(self, queryset, *always):
+        """`queryset` reading only the key, `always` and the columns of the serialized fields"""
+        columns = self.columns(*always)
+        related = {column.split('__')[0] for column in columns if '__' in column}
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+
+class CoughRecordingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user_display_name = serializers.ReadOnlyField()
+    was_truncated = serializers.ReadOnlyField()
     file_size_mb = serializers.ReadOnlyField()
     audio_file_url = serializers.SerializerMethodField()
+    canonical_file_url = serializers.SerializerMethodField()
+    near_duplicate_of = serializers.SlugRelatedField(slug_field='recording_id', read_only=True)
+    column_sources = {
+        'user_display_name': ['user__username', 'anonymous_name', 'recording_id'],
+        'audio_file_url': ['audio_file'],
+        'canonical_file_url': ['canonical_file'],
+        'file_size_mb': ['file_size'],
+        'was_truncated': ['duration', 'original_duration'],
+    }
     
     class Meta:
         model = CoughRecording
         fields = [
             'recording_id', 'user_display_name', 'anonymous_name',
-            'audio_file', 'audio_file_url', 'file_name', 'file_size', 
-            'file_size_mb', 'file_format', 'duration', 'recording_method',
+            'audio_file', 'audio_file_url', 'canonical_file_url', 'file_name', 'file_size', 
+            'file_size_mb', 'file_format', 'duration', 'original_duration',
+            'was_truncated', 'segment_count', 'peak_db', 'clipping_ratio',
+            'silence_ratio', 'snr_db', 'near_duplicate_of', 'recording_method',
             'created_at', 'uploaded_at', 'sample_rate', 'bit_rate', 'channels'
         ]
         read_only_fields = [
             'recording_id', 'file_name', 'file_size', 'file_size_mb',
-            'file_format', 'duration', 'created_at', 'uploaded_at',
+            'file_format', 'duration', 'original_duration', 'segment_count',
+            'peak_db', 'clipping_ratio', 'silence_ratio', 'snr_db', 'created_at', 'uploaded_at',
             'sample_rate', 'bit_rate', 'channels', 'user_display_name'
         ]
     
@@ -29,6 +94,13 @@ class CoughRecordingSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.audio_file.url)
         return None
     
+    def get_canonical_file_url(self, obj):
+        if obj.canonical_file:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.canonical_file.url)
+        return None
+    
     def create(self, validated_data):
         # Set user if authenticated, otherwise use anonymous_name
         request = self.context.get('request')
@@ -52,18 +124,25 @@ class CoughRecordingSerializer(serializers.ModelSerializer):
         return ip
 
 
-class CoughRecordingListSerializer(serializers.ModelSerializer):
+class CoughRecordingListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Simplified serializer for listing recordings"""
     user_display_name = serializers.ReadOnlyField()
     file_size_mb = serializers.ReadOnlyField()
     audio_file_url = serializers.SerializerMethodField()
+    peaks_url = serializers.SerializerMethodField()
+    column_sources = {
+        'user_display_name': ['user__username', 'anonymous_name', 'recording_id'],
+        'audio_file_url': ['audio_file'],
+        'peaks_url': ['file_hash', 'recording_id'],
+        'file_size_mb': ['file_size'],
+    }
     
     class Meta:
         model = CoughRecording
         fields = [
             'recording_id', 'user_display_name', 'file_name', 'audio_file_url',
-            'file_size_mb', 'file_format', 'duration', 'recording_method',
-            'created_at'
+            'peaks_url', 'file_size_mb', 'file_format', 'duration', 'recording_method',
+            'snr_db', 'clipping_ratio', 'created_at'
         ]
     
     def get_audio_file_url(self, obj):
@@ -72,6 +151,94 @@ class CoughRecordingListSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.audio_file.url)
         return None
+    
+    def get_peaks_url(self, obj):
+        request = self.context.get('request')
+        if request and obj.file_hash:
+            return request.build_absolute_uri(
+                reverse('recording-peaks', kwargs={'recording_id': obj.recording_id})
+            )
+        return None
+
+
+class RecordingListRows:
+    """
+    CoughRecordingListSerializer output built from `values_list` rows
+    instead of model instances and per-row field calls. The absolute
+    media and peaks URL prefixes are computed once per request. Must stay
+    in step with the serializer (see RecordingListRowsParityTests).
+    """
+    # Fields whose representation is the database value itself
+    VERBATIM = (serializers.CharField, serializers.ChoiceField, serializers.FloatField,
+                serializers.IntegerField, serializers.ReadOnlyField)
+
+    def __init__(self, serializer):
+        """`serializer` is a CoughRecordingListSerializer with the request in its context, fields already trimmed"""
+        self.serializer = serializer
+        self.request = serializer.context['request']
+        # created_at and id position the cursor links
+        self.columns = serializer.columns('created_at')
+        self.at = {column: index for index, column in enumerate(self.columns)}
+
+    def queryset(self, queryset):
+        """`queryset` as named rows of just the needed columns"""
+        return queryset.values_list(*self.columns, named=True)
+
+    def render(self, rows):
+        """A list of result dicts, one per row"""
+        makers = [(name, self.maker(name, field)) for name, field in self.serializer.fields.items()]
+        return [{name: make(row) for name, make in makers} for row in rows]
+
+    def maker(self, name, field):
+        """A function turning a row into the field's representation"""
+        at = self.at
+        if name == 'user_display_name':
+            username, anonymous_name, recording_id = at['user__username'], at['anonymous_name'], at['recording_id']
+            return lambda row: (row[username] if row[username] is not None
+                                else row[anonymous_name] or f"Anonymous_{row[recording_id].hex[:8]}")
+        if name == 'file_size_mb':
+            size = at['file_size']
+            return lambda row: round(row[size] / (1024 * 1024), 2) if row[size] else 0
+        if name == 'audio_file_url':
+            return self.media_url_maker(at['audio_file'])
+        if name == 'peaks_url':
+            file_hash, recording_id = at['file_hash'], at['recording_id']
+            placeholder = uuid.UUID(int=0)
+            head, tail = self.request.build_absolute_uri(
+                reverse('recording-peaks', kwargs={'recording_id': placeholder})
+            ).split(str(placeholder))
+            return lambda row: f'{head}{row[recording_id]}{tail}' if row[file_hash] else None
+        index = at[field.source]
+        if isinstance(field, self.VERBATIM):
+            return itemgetter(index)
+        if isinstance(field, serializers.DateTimeField):
+            return self.datetime_maker(index, field)
+        represent = field.to_representation
+        return lambda row: None if row[index] is None else represent(row[index])
+
+    def datetime_maker(self, index, field):
+        """DateTimeField.to_representation with the time zone and format looked up once"""
+        zone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if zone is None or output_format is None or output_format.lower() != ISO_8601:
+            return lambda row: field.to_representation(row[index])
+
+        def iso(row):
+            value = row[index]
+            if not value:
+                return None
+            value = value.astimezone(zone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return iso
+
+    def media_url_maker(self, index):
+        storage = CoughRecording._meta.get_field('audio_file').storage
+        if not isinstance(storage, FileSystemStorage):
+            # Other storages may sign or route every URL
+            build = self.request.build_absolute_uri
+            return lambda row: build(storage.url(row[index])) if row[index] else None
+        prefix = self.request.build_absolute_uri(storage.base_url)
+        return lambda row: prefix + filepath_to_uri(row[index]).lstrip('/') if row[index] else None
 
 
 class CoughRecordingStatsSerializer(serializers.Serializer):
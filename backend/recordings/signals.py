@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.db import transaction
+from django.dispatch import receiver, Signal
+from core.ingest import release_blob
+from core.jobs import enqueue, enqueue_many
+from core.response_cache import bump
+from core.vector_index import VectorIndex
+
+# Sent inside the creating transaction with `recordings`, a list of new
+# CoughRecording rows. Unlike post_save it also fires for bulk_create.
+recordings_created = Signal()
+
+
+def invalidate_recordings(recordings, stats=True):
+    """
+    Drop cached responses showing these recordings once the current
+    transaction commits: all lists, their detail and owner namespaces,
+    and with `stats` the statistics. Advances the change sequence behind
+    the ETags in the same transaction.
+    """
+    from .changes import publish
+    from .models import ChangeSequence
+    ChangeSequence.objects.bump()
+    namespaces = ['recordings']
+    for recording in recordings:
+        namespaces.append(f'recording:{recording.recording_id}')
+        if recording.user_id:
+            namespaces.append(f'user:{recording.user_id}')
+    if stats:
+        namespaces.append('stats')
+    transaction.on_commit(lambda: (bump(*namespaces), publish()))
+
+
+@receiver(recordings_created)
+def queue_metadata_probes(sender, recordings, **kwargs):
+    """Decode files whose header had no duration in a background job"""
+    enqueue_many('recordings.probe_metadata', [
+        {'recording_id': str(recording.recording_id), 'in_sketch': False}
+        for recording in recordings
+        if getattr(recording, 'needs_metadata_probe', False)
+    ])
+
+
+@receiver(recordings_created)
+def queue_canonical_transcodes(sender, recordings, **kwargs):
+    """Queue one FLAC derivative job per new piece of content"""
+    if not settings.CANONICAL_AUDIO_ENABLED:
+        return
+    enqueue_many('recordings.canonicalize', [
+        {'file_hash': file_hash}
+        for file_hash in dict.fromkeys(recording.file_hash for recording in recordings)
+        if file_hash
+    ])
+
+
+@receiver(recordings_created)
+def queue_waveform_peaks(sender, recordings, **kwargs):
+    """Queue one peak envelope job per new piece of content"""
+    enqueue_many('recordings.waveform_peaks', [
+        {'file_hash': file_hash}
+        for file_hash in dict.fromkeys(recording.file_hash for recording in recordings)
+        if file_hash
+    ])
+
+
+@receiver(recordings_created)
+def queue_feature_extraction(sender, recordings, **kwargs):
+    """Add the new recordings to the feature store in one background job"""
+    recording_ids = [str(recording.recording_id) for recording in recordings if recording.file_hash]
+    if recording_ids:
+        enqueue('recordings.extract_features', {'recording_ids': recording_ids})
+
+
+@receiver(recordings_created)
+def queue_segmentation(sender, recordings, **kwargs):
+    """Detect cough events in the new recordings in one background job"""
+    recording_ids = [str(recording.recording_id) for recording in recordings if recording.file_hash]
+    if recording_ids:
+        enqueue('recordings.segment', {'recording_ids': recording_ids})
+
+
+@receiver(recordings_created)
+def queue_quality_metrics(sender, recordings, **kwargs):
+    """Measure the audio quality of the new recordings in one background job"""
+    recording_ids = [str(recording.recording_id) for recording in recordings if recording.file_hash]
+    if recording_ids:
+        enqueue('recordings.measure_quality', {'recording_ids': recording_ids})
+
+
+@receiver(recordings_created)
+def queue_fingerprinting(sender, recordings, **kwargs):
+    """Fingerprint the new recordings and look for near duplicates in one background job"""
+    recording_ids = [str(recording.recording_id) for recording in recordings if recording.file_hash]
+    if recording_ids:
+        enqueue('recordings.fingerprint', {'recording_ids': recording_ids})
+
+
+@receiver(post_save, sender='recordings.CoughRecording')
+def invalidate_saved_recording(sender, instance, created, **kwargs):
+    """Edits through save(), e.g. in the admin; new rows are counted by count_new_recordings"""
+    if not created:
+        invalidate_recordings([instance])
+
+
+@receiver(post_delete, sender='recordings.CoughRecording')
+def release_audio_blob(sender, instance, **kwargs):
+    """Drop the deleted recording's reference to its stored audio"""
+    release_blob(instance.file_hash)
+
+
+@receiver(post_delete, sender='recordings.CoughRecording')
+def drop_unused_fingerprint(sender, instance, **kwargs):
+    """Forget the fingerprint of content no recording uses any more"""
+    from .models import AudioFingerprint
+    if instance.file_hash and not sender.objects.filter(file_hash=instance.file_hash).exists():
+        AudioFingerprint.objects.filter(file_hash=instance.file_hash).delete()
+
+
+@receiver(post_delete, sender='recordings.CoughRecording')
+def drop_from_similarity_index(sender, instance, **kwargs):
+    """Stop returning the deleted recording from similarity searches"""
+    recording_id = instance.recording_id
+    transaction.on_commit(lambda: VectorIndex().remove([recording_id]))
+
+
+@receiver(recordings_created)
+def count_new_recordings(sender, recordings, **kwargs):
+    """Keep the materialized statistics in step with the new rows"""
+    from .models import DailyRollup, DistributionSketch, HourlyRollup, StatsCounter
+    for model in (StatsCounter, HourlyRollup, DailyRollup, DistributionSketch):
+        model.objects.record(recordings)
+    invalidate_recordings(recordings)
+
+
+@receiver(post_delete, sender='recordings.CoughRecording')
+def count_deleted_recording(sender, instance, **kwargs):
+    """Runs inside the deleting transaction, so the counters roll back with it"""
+    from .models import DailyRollup, HourlyRollup, StatsCounter
+    for model in (StatsCounter, HourlyRollup, DailyRollup):
+        model.objects.record([instance], sign=-1)
+    invalidate_recordings([instance])
@@ -0,0 +1,43 @@
+"""
+Synthetic recordings for the benchmark and query-plan commands, inserted
+into a throwaway test database so real data is never touched. The mix of
+methods, formats, durations, sizes and quality metrics is roughly that of
+the collected dataset, so the query planner sees realistic selectivity.
+"""
+import datetime
+import random
+import uuid
+from django.contrib.auth.models import User
+from django.utils import timezone
+from .models import CoughRecording
+
+FORMATS = ['webm', 'webm', 'webm', 'wav', 'wav', 'mp3', 'ogg', 'm4a']
+
+
+def create_recordings(rows, batch=10000, users=50, seed=0):
+    """Insert `rows` recordings, three per second up to now; a tenth belong to `users` accounts"""
+    rng = random.Random(seed)
+    accounts = [User.objects.create_user(f'synthetic{i}') for i in range(users)]
+    start = timezone.now() - datetime.timedelta(seconds=rows // 3 + 1)
+    for first in range(0, rows, batch):
+        recordings = []
+        for i in range(first, min(first + batch, rows)):
+            file_format = rng.choice(FORMATS)
+            measured = rng.random() < 0.9
+            recordings.append(CoughRecording(
+                recording_id=uuid.UUID(int=i + 1),
+                user=rng.choice(accounts) if accounts and rng.random() < 0.1 else None,
+                anonymous_name=f'participant{rng.randrange(rows // 10 + 1)}',
+                audio_file=f'cough_recordings/synthetic_{i}.{file_format}',
+                file_name=f'synthetic_{i}.{file_format}',
+                file_size=rng.randrange(20000, 2000000),
+                file_format=file_format,
+                duration=round(rng.uniform(1, 10), 2),
+                recording_method='browser' if file_format == 'webm' else 'upload',
+                created_at=start + datetime.timedelta(seconds=i // 3),
+                peak_db=round(rng.uniform(-40, 0), 1) if measured else None,
+                clipping_ratio=rng.random() * 0.01 if measured else None,
+                silence_ratio=rng.random() if measured else None,
+                snr_db=round(rng.uniform(0, 40), 1) if measured else None,
+            ))
+        CoughRecording.objects.bulk_create(recordings)
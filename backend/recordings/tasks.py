@@ -0,0 +1,181 @@
+"""
+Background tasks for recordings, run by `manage.py run_workers`
+"""
+import logging
+from django.db import transaction
+from core.audio_decode import DecodeError
+from core.canonical import ensure_canonical
+from core.exceptions import AudioProcessingError
+from core.feature_store import FeatureStore
+from core import fingerprint
+from core.features import extract_file
+from core.jobs import task
+from core.quality import measure_file
+from core.segmentation import segment_file
+from core.utils import AudioMetadataExtractor
+from core.vector_index import index_recordings
+from core.waveform import ensure_peaks
+from .duplicates import flag_near_duplicates
+from .models import AudioFingerprint, CoughRecording, CoughSegment, DailyRollup, DistributionSketch, HourlyRollup, StatsCounter
+from .signals import invalidate_recordings
+
+logger = logging.getLogger(__name__)
+
+
+def group_by_content(recordings):
+    """{file_hash: [recordings]} so shared audio is analysed once"""
+    groups = {}
+    for recording in recordings:
+        groups.setdefault(recording.file_hash, []).append(recording)
+    return groups
+
+
+@task('recordings.probe_metadata')
+def probe_metadata(recording_id, decode=False, in_sketch=True):
+    """
+    Fill in audio metadata from the stored file. Tries the header first and
+    falls back to a full pydub decode; decode=True always decodes.
+    in_sketch=False: the duration sketch does not hold this recording yet.
+    """
+    recording = CoughRecording.objects.filter(recording_id=recording_id).first()
+    if recording is None or not recording.audio_file:
+        return  # Deleted since the job was queued
+    
+    path = recording.audio_file.path
+    if decode:
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(path)
+        metadata = {
+            'duration': len(audio) / 1000.0,  # Convert milliseconds to seconds
+            'sample_rate': audio.frame_rate,
+            'channels': audio.channels,
+        }
+    else:
+        metadata = AudioMetadataExtractor.extract_metadata(path)
+    
+    if not metadata.get('duration'):
+        raise AudioProcessingError(f'Could not determine duration of {recording.file_name}',
+                                   audio_format=recording.file_format)
+    
+    updates = {'duration': metadata['duration']}
+    if not recording.original_duration:
+        updates['original_duration'] = metadata['duration']
+    for field in ('sample_rate', 'bit_rate', 'channels'):
+        if metadata.get(field) and not getattr(recording, field):
+            updates[field] = metadata[field]
+    with transaction.atomic():
+        CoughRecording.objects.filter(pk=recording.pk).update(**updates)
+        old_duration, recording.duration = recording.duration, metadata['duration']
+        for model in (StatsCounter, HourlyRollup, DailyRollup):
+            model.objects.record_duration(recording, old_duration)
+        # Sketches cannot replace a value, only add the first one
+        if old_duration is None or not in_sketch:
+            DistributionSketch.objects.add('duration', [recording.duration])
+        if 'sample_rate' in updates:
+            DistributionSketch.objects.add('sample_rate', [updates['sample_rate']])
+        invalidate_recordings([recording])
+    logger.info(f"Probed {recording.file_name}: {metadata['duration']:.2f}s")
+
+
+@task('recordings.canonicalize')
+def canonicalize(file_hash):
+    """Write the 16 kHz mono FLAC derivative of stored audio and link it"""
+    recording = CoughRecording.objects.filter(file_hash=file_hash).exclude(audio_file='').first()
+    if recording is None:
+        return  # Deleted since the job was queued
+    
+    name = ensure_canonical(file_hash, recording.audio_file.name)
+    CoughRecording.objects.filter(file_hash=file_hash).update(canonical_file=name)
+    invalidate_recordings(CoughRecording.objects.filter(file_hash=file_hash), stats=False)
+    logger.info(f"Canonical derivative ready for {file_hash[:12]}")
+
+
+@task('recordings.waveform_peaks')
+def waveform_peaks(file_hash):
+    """Compute the waveform peaks of stored audio for playback previews"""
+    recording = CoughRecording.objects.filter(file_hash=file_hash).exclude(audio_file='').first()
+    if recording is None:
+        return  # Deleted since the job was queued
+    
+    # The canonical derivative is smaller and already 16 kHz mono
+    source = recording.canonical_file.name or recording.audio_file.name
+    try:
+        ensure_peaks(file_hash, source)
+    except DecodeError as e:
+        # Retrying will not help until ffmpeg is installed
+        logger.warning(f"No waveform peaks for {recording.file_name}: {e}")
+
+
+@task('recordings.extract_features')
+def extract_features(recording_ids):
+    """Append the features of new recordings to the feature store and the similarity index"""
+    store = FeatureStore()
+    known_hashes = store.load_index()['hashes']
+    recordings = CoughRecording.objects.filter(recording_id__in=recording_ids).exclude(file_hash='')
+    
+    items = []
+    for file_hash, group in group_by_content(recordings).items():
+        matrix = None
+        if file_hash not in known_hashes:
+            recording = group[0]
+            try:
+                matrix = extract_file((recording.canonical_file or recording.audio_file).path)
+            except DecodeError as e:
+                logger.warning(f"No features for {recording.file_name}: {e}")
+                continue
+        items.append(([r.recording_id for r in group], file_hash, matrix))
+    store.append(items)
+    # Their embeddings become searchable right away
+    index_recordings([rid for recording_ids, _, _ in items for rid in recording_ids])
+
+
+@task('recordings.segment')
+def segment(recording_ids):
+    """Detect and store the cough events of new recordings"""
+    recordings = CoughRecording.objects.filter(recording_id__in=recording_ids).exclude(file_hash='')
+    for group in group_by_content(recordings).values():
+        recording = group[0]
+        try:
+            events = segment_file((recording.canonical_file or recording.audio_file).path)
+        except DecodeError as e:
+            logger.warning(f"Cannot segment {recording.file_name}: {e}")
+            continue
+        CoughSegment.objects.replace([r.recording_id for r in group], events)
+
+
+@task('recordings.measure_quality')
+def measure_quality(recording_ids):
+    """Store peak level, clipping, silence and SNR of new recordings"""
+    recordings = CoughRecording.objects.filter(recording_id__in=recording_ids).exclude(file_hash='')
+    for group in group_by_content(recordings).values():
+        recording = group[0]
+        try:
+            # The original, not the canonical derivative: resampling changes peaks
+            metrics = measure_file(recording.audio_file.path)
+        except DecodeError as e:
+            logger.warning(f"Cannot measure {recording.file_name}: {e}")
+            continue
+        CoughRecording.objects.filter(pk__in=[r.pk for r in group]).update(**metrics)
+    invalidate_recordings(recordings, stats=False)
+
+
+@task('recordings.fingerprint')
+def fingerprint_recordings(recording_ids):
+    """Fingerprint new recordings and flag near duplicates of older ones"""
+    recordings = CoughRecording.objects.filter(recording_id__in=recording_ids).exclude(file_hash='')
+    groups = group_by_content(recordings)
+    stored = dict(AudioFingerprint.objects.filter(file_hash__in=groups).values_list('file_hash', 'signature'))
+    
+    signatures = {}
+    for file_hash, group in groups.items():
+        if file_hash in stored:
+            signatures[file_hash] = fingerprint.from_bytes(stored[file_hash])
+            continue
+        recording = group[0]
+        try:
+            signatures[file_hash] = fingerprint.signature_file(
+                (recording.canonical_file or recording.audio_file).path
+            )
+        except DecodeError as e:
+            logger.warning(f"Cannot fingerprint {recording.file_name}: {e}")
+    flag_near_duplicates(sorted(recordings, key=lambda r: r.pk), signatures)
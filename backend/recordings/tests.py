@@ -1,3 +1,1213 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import uuid
+import time
+import wave
+import mutagen
+import numpy as np
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import addModuleCleanup, mock, skipUnless
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from core import (
+    audio_probe, canonical, feature_store, features, fingerprint, jobs, quality, response_cache, sqlite_cache,
+    vector_index,
+)
+from core.ingest import store_blob
+from core.models import AudioBlob, Job
+from core.sketch import KLLSketch
+from core.truncation import truncate_upload
+from . import bulk, synthetic, tasks, timeseries
+from .management.commands import explain_endpoints
+from .models import (
+    AudioFingerprint, ChangeSequence, CoughRecording, CoughSegment, DailyRollup, DistributionSketch,
+    StatsCounter, UploadSession,
+)
+from .signals import recordings_created
+from .serializers import CoughRecordingListSerializer, RecordingListRows
 
-# Create your tests here.
+
+def sqlite_caches(directory):
+    return {'default': {
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+    }}
+
+
+def setUpModule():
+    # Tests that use the configured cache write to a temporary file, not the one in BASE_DIR
+    directory = tempfile.mkdtemp()
+    addModuleCleanup(shutil.rmtree, directory, ignore_errors=True)
+    settings = override_settings(CACHES=sqlite_caches(directory))
+    settings.enable()
+    addModuleCleanup(settings.disable)
+
+
+def wav_bytes(seconds=0.5, rate=16000, channels=1):
+    """A silent 16-bit WAV file"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(b'\0\0' * channels * int(seconds * rate))
+    return buffer.getvalue()
+
+
+class TemporaryMediaMixin:
+    """Media and upload spool directories that are removed after the test"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=f'{directory}/media', UPLOAD_SPOOL_DIR=f'{directory}/spool')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class RecordingListRowsParityTests(TestCase):
+    """RecordingListRows must render exactly what CoughRecordingListSerializer does"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('marianne')
+        recordings = [
+            dict(user=user, anonymous_name='ignored', file_hash='a' * 64, duration=2.5, snr_db=31.2,
+                 clipping_ratio=0.0, audio_file='cough_recordings/2025/11/28/dry cough#1 ü.webm'),
+            dict(anonymous_name='participant7', file_size=0, duration=None,
+                 audio_file='cough_recordings/b.wav'),
+            dict(anonymous_name='', file_size=1536000, audio_file=''),
+            dict(anonymous_name=None, file_hash='b' * 64, recording_method='browser',
+                 file_format='webm', audio_file='cough_recordings/c.webm'),
+        ]
+        CoughRecording.objects.bulk_create([
+            CoughRecording(**{
+                'recording_id': uuid.uuid4(), 'file_name': f'file_{i}.wav', 'file_size': 245760,
+                'file_format': 'wav', 'recording_method': 'upload', **fields,
+            })
+            for i, fields in enumerate(recordings)
+        ])
+
+    def assertSameOutput(self, query):
+        request = Request(APIRequestFactory().get('/api/recordings/list/', query, HTTP_HOST='example.org:8000'))
+        serializer = CoughRecordingListSerializer(context={'request': request})
+        queryset = serializer.load_only(CoughRecording.objects.all(), 'created_at').order_by('id')
+        expected = CoughRecordingListSerializer(queryset, many=True, context={'request': request}).data
+
+        rows = RecordingListRows(serializer)
+        rendered = rows.render(rows.queryset(queryset))
+
+        self.assertEqual(len(rendered), 4)
+        self.assertEqual([list(item.items()) for item in rendered], [list(item.items()) for item in expected])
+
+    def test_all_fields(self):
+        self.assertSameOutput({})
+
+    def test_sparse_fields(self):
+        self.assertSameOutput({'fields': 'recording_id,user_display_name,peaks_url'})
+        self.assertSameOutput({'omit': 'audio_file_url,user_display_name'})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ConditionalGetTests(TestCase):
+    """A write of any kind must turn the next conditional GET from 304 into 200"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recording = CoughRecording.objects.create(
+            file_name='a.wav', file_size=245760, file_format='wav', recording_method='upload',
+            anonymous_name='participant1', audio_file='cough_recordings/a.wav',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assertRevalidates(self, url, write):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_save(self):
+        def write():
+            self.recording.anonymous_name = 'participant2'
+            self.recording.save()
+        self.assertRevalidates('/api/recordings/list/', write)
+
+    def test_segment_replace(self):
+        events = [{'start': 0.1, 'end': 0.4, 'onset': 0.12, 'peak_db': -12.0}]
+        self.assertRevalidates(
+            f'/api/recordings/detail/{self.recording.recording_id}/',
+            lambda: CoughSegment.objects.replace([self.recording.recording_id], events),
+        )
+
+    def test_rebuild_stats(self):
+        self.assertRevalidates('/api/recordings/stats/', lambda: call_command('rebuild_stats', stdout=StringIO()))
+
+    def test_flag_duplicate_clusters(self):
+        later = CoughRecording.objects.create(
+            file_name='b.wav', file_size=245760, file_format='wav', recording_method='upload',
+            anonymous_name='participant1', audio_file='cough_recordings/b.wav', file_hash='b' * 64,
+        )
+        CoughRecording.objects.filter(pk=self.recording.pk).update(file_hash='a' * 64)
+        signature = np.arange(128, dtype=np.uint32)
+        AudioFingerprint.objects.store('a' * 64, signature)
+        AudioFingerprint.objects.store('b' * 64, signature)
+        sequence, _ = ChangeSequence.objects.current()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('duplicate_clusters', '--flag', stdout=StringIO())
+        later.refresh_from_db()
+        self.assertEqual(later.near_duplicate_of_id, self.recording.pk)
+        self.assertGreater(ChangeSequence.objects.current()[0], sequence)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ResumableUploadTests(TemporaryMediaMixin, TestCase):
+    """Byte ranges must arrive in order, and a session finalizes into exactly one recording"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.data = wav_bytes()
+        response = self.client.post('/api/recordings/uploads/', {
+            'file_name': 'cough.wav', 'total_size': len(self.data), 'content_type': 'audio/wav',
+            'anonymous_name': 'participant1', 'recording_method': 'upload',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.session = UploadSession.objects.get(session_id=response.json()['session_id'])
+        self.url = f'/api/recordings/uploads/{self.session.session_id}/'
+
+    def put(self, start, end, total=None, body=None):
+        return self.client.put(
+            self.url, body if body is not None else self.data[start:end], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{total or len(self.data)}',
+        )
+
+    def finalize(self):
+        return self.client.post(f'{self.url}finalize/')
+
+    def upload(self):
+        half = len(self.data) // 2
+        self.assertEqual(self.put(0, half).json()['offset'], half)
+        self.assertEqual(self.put(half, len(self.data)).json()['offset'], len(self.data))
+
+    def test_content_range_is_checked(self):
+        self.assertEqual(self.client.put(self.url, self.data[:10], content_type='application/octet-stream').status_code, 400)
+        self.assertEqual(self.put(0, 10, total=len(self.data) + 1).status_code, 400)
+        # The range says 10 bytes, the body has 9
+        self.assertEqual(self.put(0, 10, body=self.data[:9]).status_code, 400)
+
+    def test_chunks_out_of_order_or_repeated(self):
+        self.assertEqual(self.put(0, 100).json()['offset'], 100)
+        skipped = self.put(200, 300)
+        self.assertEqual(skipped.status_code, 409)
+        self.assertEqual(skipped['Upload-Offset'], '100')
+        # A retried chunk the server already has is refused, not appended twice
+        repeated = self.put(0, 100)
+        self.assertEqual(repeated.status_code, 409)
+        self.assertEqual(repeated.json()['offset'], 100)
+        self.assertEqual(self.put(100, len(self.data)).json()['offset'], len(self.data))
+        with open(self.session.spool_path, 'rb') as spool:
+            self.assertEqual(spool.read(), self.data)
+
+    def test_finalize(self):
+        self.put(0, 100)
+        self.assertEqual(self.finalize().status_code, 409)
+        self.put(100, len(self.data))
+        created = self.finalize()
+        self.assertEqual(created.status_code, 201)
+        repeated = self.finalize()
+        self.assertEqual(repeated.status_code, 200)
+        self.assertEqual(repeated.json()['recording_id'], created.json()['recording_id'])
+        self.assertEqual(CoughRecording.objects.count(), 1)
+
+    def test_finalize_while_claimed(self):
+        self.upload()
+        self.assertTrue(UploadSession.objects.get(pk=self.session.pk).claim())
+        self.assertEqual(self.finalize().status_code, 409)
+        self.assertFalse(CoughRecording.objects.exists())
+
+    def test_finalize_after_recording_deleted(self):
+        self.upload()
+        self.assertEqual(self.finalize().status_code, 201)
+        CoughRecording.objects.get().delete()
+        self.assertEqual(self.finalize().status_code, 410)
+
+    def test_finalize_without_spool(self):
+        self.upload()
+        self.session.discard_spool()
+        self.assertEqual(self.finalize().status_code, 422)
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).status, 'failed')
+        self.assertEqual(self.finalize().status_code, 410)
+
+
+calls = []
+
+
+@jobs.task('tests.record')
+def record_call(value):
+    calls.append(value)
+
+
+@jobs.task('tests.fail')
+def fail_always():
+    raise RuntimeError('failed on purpose')
+
+
+class JobQueueTests(TestCase):
+    """Jobs are claimed once, retried with backoff and recovered from dead workers"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_once(self):
+        job = jobs.enqueue('tests.record', {'value': 1})
+        claimed = jobs.claim_next('worker-a')
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts, claimed.locked_by),
+                         (job.pk, 'running', 1, 'worker-a'))
+        self.assertIsNone(jobs.claim_next('worker-b'))
+        self.assertTrue(jobs.run_job(claimed))
+        self.assertEqual(calls, [1])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'done')
+
+    def test_not_due(self):
+        jobs.enqueue('tests.record', {'value': 1}, delay=60)
+        self.assertIsNone(jobs.claim_next('worker-a'))
+
+    def test_retry_then_fail(self):
+        job = jobs.enqueue('tests.fail', max_attempts=2)
+        before = timezone.now()
+        self.assertFalse(jobs.run_job(jobs.claim_next('worker-a')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('pending', 1, ''))
+        self.assertIn('failed on purpose', job.last_error)
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=jobs.retry_delay(1)))
+        # Retried only once it is due again
+        self.assertIsNone(jobs.claim_next('worker-a'))
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertFalse(jobs.run_job(jobs.claim_next('worker-a')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
+
+    @override_settings(JOB_RETRY_BASE_DELAY=10)
+    def test_backoff_doubles(self):
+        self.assertEqual([jobs.retry_delay(n) for n in (1, 2, 3, 4)], [10, 20, 40, 80])
+        job = jobs.enqueue('tests.fail', max_attempts=3)
+        for attempt in (1, 2):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            before = timezone.now()
+            jobs.run_job(jobs.claim_next('worker-a'))
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            delay = (job.run_after - before).total_seconds()
+            self.assertAlmostEqual(delay, jobs.retry_delay(attempt), delta=1)
+
+    def test_claim_order(self):
+        later = jobs.enqueue('tests.record', {'value': 1})
+        Job.objects.filter(pk=later.pk).update(run_after=timezone.now() - timedelta(seconds=1))
+        first, second = jobs.enqueue_many('tests.record', [{'value': 2}, {'value': 3}])
+        Job.objects.filter(pk__in=[first.pk, second.pk]).update(run_after=timezone.now() - timedelta(seconds=5))
+        self.assertEqual(jobs.work('worker-a', once=True), 3)
+        self.assertEqual(calls, [2, 3, 1])
+
+    def test_unknown_task(self):
+        job = jobs.enqueue('tests.missing', max_attempts=1)
+        self.assertFalse(jobs.run_job(jobs.claim_next('worker-a')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('No task registered', job.last_error)
+
+    def test_stale_jobs_released_by_workers(self):
+        job = jobs.enqueue('tests.record', {'value': 2})
+        jobs.claim_next('dead-worker')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.work('worker-a', once=True), 1)
+        self.assertEqual(calls, [2])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'done')
+
+
+class KLLSketchTests(TestCase):
+    """Rank error stays within the documented bound, also after merging and serialising"""
+
+    def assertRankError(self, sketch, values, bound=0.01):
+        values = np.sort(values)
+        qs = np.linspace(0.01, 0.99, 99)
+        estimates = sketch.quantiles(qs)
+        # Share of the inputs at or below each estimate
+        ranks = np.searchsorted(values, estimates, side='right') / len(values)
+        self.assertLess(np.abs(ranks - qs).max(), bound)
+
+    def test_error_bound(self):
+        values = np.random.default_rng(1).lognormal(0, 1, 200000)
+        sketch = KLLSketch()
+        sketch.update(values)
+        self.assertEqual(sketch.count, len(values))
+        self.assertEqual((sketch.min, sketch.max), (values.min(), values.max()))
+        self.assertRankError(sketch, values)
+
+    def test_merge(self):
+        rng = np.random.default_rng(2)
+        first, second = rng.normal(0, 1, 50000), rng.normal(3, 1, 70000)
+        merged, other = KLLSketch(), KLLSketch()
+        merged.update(first)
+        other.update(second)
+        merged.merge(other)
+        self.assertEqual(merged.count, 120000)
+        self.assertRankError(merged, np.concatenate([first, second]))
+
+    def test_bytes_round_trip(self):
+        sketch = KLLSketch()
+        sketch.update(np.random.default_rng(3).uniform(0, 10, 30000))
+        restored = KLLSketch.from_bytes(sketch.to_bytes())
+        self.assertEqual((restored.k, restored.count, restored.min, restored.max),
+                         (sketch.k, sketch.count, sketch.min, sketch.max))
+        self.assertEqual([list(level) for level in restored.levels], [list(level) for level in sketch.levels])
+        self.assertEqual(restored.quantiles([0.1, 0.5, 0.9]), sketch.quantiles([0.1, 0.5, 0.9]))
+        self.assertIsNone(KLLSketch.from_bytes(KLLSketch().to_bytes()).quantiles([0.5]))
+
+
+class ProbedDurationTests(TemporaryMediaMixin, TestCase):
+    """The 10 s browser placeholder is replaced everywhere once the real duration is probed"""
+
+    def test_placeholder_replaced(self):
+        name = default_storage.save('cough_recordings/browser.wav', ContentFile(wav_bytes(seconds=0.5)))
+        recording = CoughRecording(audio_file=name, anonymous_name='participant1', recording_method='browser')
+        recording.apply_ingest_metadata({
+            'file_format': 'wav', 'file_size': default_storage.size(name), 'file_hash': 'c' * 64,
+            'sample_rate': None, 'bit_rate': None, 'channels': None, 'duration': None,
+        })
+        self.assertEqual(recording.duration, 10.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            CoughRecording.objects.bulk_create([recording])
+            recordings_created.send(sender=CoughRecording, recordings=[recording])
+        self.assertEqual(StatsCounter.objects.summary()['total_duration'], 10.0)
+        self.assertEqual(DistributionSketch.objects.sketches()['duration'].count, 0)
+
+        job = Job.objects.get(name='recordings.probe_metadata')
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.probe_metadata(**job.payload)
+        self.assertAlmostEqual(StatsCounter.objects.summary()['total_duration'], 0.5)
+        sketch = DistributionSketch.objects.sketches()['duration']
+        self.assertEqual(sketch.count, 1)
+        self.assertAlmostEqual(sketch.quantiles([0.5])[0], 0.5, places=5)
+
+
+class TruncationTests(TestCase):
+    """Uploads over the limit are cut to it; a stuck ffmpeg only costs TRUNCATION_TIMEOUT"""
+
+    def test_wav_cut_length(self):
+        upload = SimpleUploadedFile('long.wav', wav_bytes(seconds=3.0, rate=8000), 'audio/wav')
+        truncated = truncate_upload(upload, 3.0, max_duration=1.25)
+        try:
+            data = truncated.read()
+            self.assertEqual(truncated.sha256, hashlib.sha256(data).hexdigest())
+            with wave.open(io.BytesIO(data)) as cut:
+                self.assertEqual(cut.getnframes(), 10000)
+            self.assertEqual(len(data), 44 + 10000 * 2)
+        finally:
+            truncated.close()
+        self.assertEqual(upload.file.tell(), 0)
+        self.assertIsNone(truncate_upload(upload, 3.0, max_duration=5))
+
+    @skipUnless(os.name == 'posix', 'needs a shell script standing in for ffmpeg')
+    @override_settings(TRUNCATION_TIMEOUT=0.5)
+    def test_ffmpeg_timeout(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        ffmpeg = os.path.join(directory, 'ffmpeg')
+        with open(ffmpeg, 'w') as f:
+            f.write(f'#!/bin/sh\nexec {shutil.which("sleep")} 30\n')
+        os.chmod(ffmpeg, 0o755)
+        upload = SimpleUploadedFile('long.mp3', b'\xff\xfb' * 200000, 'audio/mpeg')
+        started = time.monotonic()
+        with mock.patch.dict(os.environ, {'PATH': directory}):
+            self.assertIsNone(truncate_upload(upload, 60.0, max_duration=10))
+        self.assertLess(time.monotonic() - started, 5)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class FullTextSearchTests(TestCase):
+    """?search= matches word beginnings through FTS5 and orders by relevance unless asked otherwise"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('wet cough', 'dry cough cough', 'laugh', 'coughing fit'):
+            CoughRecording.objects.create(
+                file_name=f'{name}.wav', file_size=1000, file_format='wav', recording_method='upload',
+                anonymous_name=name.replace(' ', '_'), audio_file=f'cough_recordings/{name}.wav',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, **params):
+        response = self.client.get('/api/recordings/list/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['file_name'] for item in response.json()['results']]
+
+    def test_relevance(self):
+        names = self.names(search='cough')
+        self.assertEqual(sorted(names), ['coughing fit.wav', 'dry cough cough.wav', 'wet cough.wav'])
+        # The file that says it twice ranks first
+        self.assertEqual(names[0], 'dry cough cough.wav')
+        self.assertEqual(self.names(search='coughing'), ['coughing fit.wav'])
+        self.assertEqual(self.names(search='sneeze'), [])
+
+    def test_ordering(self):
+        self.assertEqual(self.names(search='cough', ordering='created_at'),
+                         ['wet cough.wav', 'dry cough cough.wav', 'coughing fit.wav'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CursorPaginationTests(TestCase):
+    """Cursor pages keep their totals and neither repeat nor skip rows when recordings arrive in between"""
+
+    def setUp(self):
+        cache.clear()
+        for _ in range(5):
+            self.create()
+
+    def create(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return CoughRecording.objects.create(
+                file_name='a.wav', file_size=1000, file_format='wav', recording_method='upload',
+                anonymous_name='participant', audio_file='cough_recordings/a.wav',
+            )
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_count(self):
+        self.assertEqual(self.get('/api/recordings/list/')['count'], 5)
+        self.assertEqual(self.get('/api/recordings/list/', {'search': 'a'})['count'], 5)
+        self.assertEqual(self.get('/api/recordings/list/', {'count': 'approximate'})['count'], 5)
+        self.assertNotIn('count', self.get('/api/recordings/list/', {'count': 'none'}))
+
+    def test_inserts_between_pages(self):
+        for ordering in ('-created_at', 'created_at'):
+            tiebreak = '-id' if ordering.startswith('-') else 'id'
+            expected = [str(rid) for rid in CoughRecording.objects.order_by(ordering, tiebreak)
+                        .values_list('recording_id', flat=True)]
+            page = self.get('/api/recordings/list/', {'page_size': 2, 'ordering': ordering, 'count': 'none'})
+            seen = []
+            while True:
+                seen += [item['recording_id'] for item in page['results']]
+                if not page['next']:
+                    break
+                self.create()
+                page = self.get(page['next'])
+            if ordering == '-created_at':
+                self.assertEqual(seen, expected)
+            else:
+                # Oldest first runs on into the rows added meanwhile
+                self.assertEqual(seen[:len(expected)], expected)
+                self.assertEqual(len(seen), len(set(seen)))
+
+
+class BlobReferenceTests(TemporaryMediaMixin, TestCase):
+    """Recordings of the same content share one blob, whose file goes with the last of them"""
+
+    def create(self, content, sha256):
+        blob, duplicate = store_blob(ContentFile(content, name='a.wav'), sha256)
+        recording = CoughRecording.objects.create(
+            file_name='a.wav', file_size=len(content), file_format='wav', recording_method='upload',
+            anonymous_name='participant', audio_file=blob.name, file_hash=sha256,
+        )
+        return recording, duplicate
+
+    def test_release_on_delete(self):
+        content = wav_bytes()
+        sha256 = hashlib.sha256(content).hexdigest()
+        first, duplicate = self.create(content, sha256)
+        self.assertFalse(duplicate)
+        second, duplicate = self.create(content, sha256)
+        self.assertTrue(duplicate)
+        blob = AudioBlob.objects.get(sha256=sha256)
+        self.assertEqual(blob.ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(AudioBlob.objects.get(sha256=sha256).ref_count, 1)
+        self.assertTrue(default_storage.exists(blob.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(AudioBlob.objects.filter(sha256=sha256).exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
+
+def ebml(element_id, payload=b'', unknown_size=False):
+    """One EBML element; the size is a 4-byte vint, or 'unknown' as MediaRecorder writes it"""
+    size = b'\x01' + b'\xff' * 7 if unknown_size else (0x10000000 | len(payload)).to_bytes(4, 'big')
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big') + size + payload
+
+
+def webm_bytes(duration_ms=None, clusters=(), rate=48000, channels=1):
+    """
+    A WebM header with a Duration in Info, or without one like MediaRecorder
+    output, followed by clusters of {cluster timecode: [block offsets]} in ms
+    """
+    info = ebml(0x2AD7B1, (1000000).to_bytes(3, 'big'))
+    if duration_ms is not None:
+        info += ebml(0x4489, struct.pack('>d', duration_ms))
+    audio = ebml(0xB5, struct.pack('>d', rate)) + ebml(0x9F, bytes([channels]))
+    tracks = ebml(0xAE, ebml(0xD7, b'\x01') + ebml(0xE1, audio))
+    body = ebml(0x1549A966, info) + ebml(0x1654AE6B, tracks)
+    for timecode, blocks in clusters:
+        body += ebml(0x1F43B675, ebml(0xE7, timecode.to_bytes(2, 'big')) + b''.join(
+            ebml(0xA3, b'\x81' + struct.pack('>h', offset) + b'\x80' + bytes(40)) for offset in blocks
+        ), unknown_size=True)
+    return ebml(0x1A45DFA3, ebml(0x4282, b'webm')) + ebml(0x18538067, body, unknown_size=True)
+
+
+def mp4_box(box_type, payload=b''):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def m4a_bytes(movie=(1000, 2500), track=(44100, 0), rate=44100, channels=2):
+    """An M4A header; `movie` and `track` are the (timescale, duration) of mvhd and mdhd"""
+    mvhd = mp4_box(b'mvhd', bytes(4) + struct.pack('>IIII', 0, 0, *movie) + bytes(80))
+    mdhd = mp4_box(b'mdhd', bytes(4) + struct.pack('>IIII', 0, 0, *track) + bytes(4))
+    entry = struct.pack('>I4s6xH8xHHHHI', 36, b'mp4a', 1, channels, 16, 0, 0, rate << 16)
+    stbl = mp4_box(b'stbl', mp4_box(b'stsd', struct.pack('>II', 0, 1) + entry))
+    trak = mp4_box(b'trak', mp4_box(b'mdia', mdhd + mp4_box(b'minf', stbl)))
+    return mp4_box(b'ftyp', b'M4A ' + bytes(4) + b'M4A isom') + mp4_box(b'moov', mvhd + trak) + mp4_box(b'mdat', bytes(64))
+
+
+class HeaderProbeTests(TemporaryMediaMixin, TestCase):
+    """The header prober reports what mutagen reads from the whole file, and browser formats from their headers"""
+
+    def probe(self, content):
+        return audio_probe.probe(io.BytesIO(content))
+
+    def test_webm_duration(self):
+        probed = self.probe(webm_bytes(duration_ms=2500.0, clusters=[(0, [0, 20])]))
+        self.assertEqual(probed['format'], 'webm')
+        self.assertEqual((probed['duration'], probed['sample_rate'], probed['channels']), (2.5, 48000, 1))
+
+    def test_webm_without_duration(self):
+        # 20 ms frames up to 2480 ms: the last one ends at 2.5 s
+        clusters = [(timecode, list(range(0, 1000, 20))) for timecode in (0, 1000)]
+        clusters.append((2000, list(range(0, 500, 20))))
+        probed = self.probe(webm_bytes(clusters=clusters))
+        self.assertAlmostEqual(probed['duration'], 2.5)
+        self.assertEqual(probed['sample_rate'], 48000)
+
+    def test_m4a(self):
+        probed = self.probe(m4a_bytes())
+        self.assertEqual(probed['format'], 'm4a')
+        self.assertEqual((probed['duration'], probed['sample_rate'], probed['channels']), (2.5, 44100, 2))
+        # No movie duration: the audio track's is used
+        self.assertEqual(self.probe(m4a_bytes(movie=(1000, 0), track=(44100, 110250)))['duration'], 2.5)
+        self.assertIsNone(self.probe(m4a_bytes(movie=(1000, 0)))['duration'])
+
+    def test_missing_duration_queues_probe(self):
+        for name, content in (('a.webm', webm_bytes()), ('a.m4a', m4a_bytes(movie=(1000, 0)))):
+            with self.subTest(name=name):
+                recording = CoughRecording(
+                    recording_method='browser', anonymous_name='participant',
+                    audio_file=SimpleUploadedFile(name, content),
+                )
+                with self.captureOnCommitCallbacks(execute=True):
+                    recording.save()
+                self.assertTrue(recording.needs_metadata_probe)
+                self.assertEqual(recording.duration, 10.0)
+                self.assertTrue(Job.objects.filter(
+                    name='recordings.probe_metadata', payload__recording_id=str(recording.recording_id)
+                ).exists())
+
+    def encode(self, directory, ext, rate, channels):
+        path = os.path.join(directory, f'{rate}_{channels}.{ext}')
+        subprocess.run([
+            'ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate={rate}:duration=2.5',
+            '-ac', str(channels), path,
+        ], check=True)
+        return path
+
+    @skipUnless(shutil.which('ffmpeg'), 'needs ffmpeg to encode the fixtures')
+    def test_matches_mutagen(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        for ext in ('wav', 'mp3', 'ogg'):
+            for rate, channels in ((22050, 1), (44100, 2)):
+                with self.subTest(ext=ext, rate=rate, channels=channels):
+                    path = self.encode(directory, ext, rate, channels)
+                    probed = audio_probe.probe_path(path)
+                    info = mutagen.File(path).info
+                    self.assertEqual(probed['format'], ext)
+                    self.assertEqual(probed['sample_rate'], info.sample_rate)
+                    self.assertEqual(probed['channels'], info.channels)
+                    self.assertAlmostEqual(probed['duration'], info.length, delta=0.03)
+
+
+def cough_samples(seed, seconds=2.0, rate=fingerprint.SAMPLE_RATE):
+    """Decaying bursts of coloured noise, roughly what a few coughs look like"""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * rate))
+    for start in rng.uniform(0.1, seconds - 0.5, 4):
+        n = int(rng.uniform(0.2, 0.4) * rate)
+        burst = np.convolve(rng.normal(size=n), rng.normal(size=24), 'same')
+        burst *= np.exp(-np.arange(n) / (0.08 * rate))
+        samples[int(start * rate):int(start * rate) + n] += burst
+    return samples
+
+
+class FingerprintIndexTests(TestCase):
+    """The LSH buckets find re-encoded copies and keep unrelated content out of the candidates"""
+
+    def test_reencoded_copy(self):
+        original = cough_samples(3)
+        # Low-passed, quieter, with a little noise and silence in front, as after a lossy codec
+        copy = np.convolve(original, np.ones(3) / 3, 'same') * 0.7
+        copy += np.random.default_rng(4).normal(scale=0.001 * np.abs(original).max(), size=copy.size)
+        copy = np.concatenate([np.zeros(2048), copy])
+        AudioFingerprint.objects.store('a' * 64, fingerprint.signature_samples(original))
+        AudioFingerprint.objects.store('b' * 64, fingerprint.signature_samples(cough_samples(53)))
+
+        found = AudioFingerprint.objects.similar(fingerprint.signature_samples(copy))
+        self.assertEqual([file_hash for file_hash, _ in found], ['a' * 64])
+
+    def test_candidates_bounded(self):
+        # 200 sets sharing 10 of 190 landmarks with the query, J = 0.05
+        query = np.arange(100)
+        for n in range(200):
+            other = np.concatenate([query[:10], 1000 + n * 100 + np.arange(90)])
+            AudioFingerprint.objects.store(f'{n:064d}', fingerprint.minhash(other))
+        candidates = AudioFingerprint.objects.candidates(fingerprint.minhash(query)).count()
+        # About BANDS * 0.05 ** ROWS = 0.3% are expected, with two rows per band it was 15%
+        self.assertLess(candidates, 10)
+        self.assertEqual(AudioFingerprint.objects.similar(fingerprint.minhash(query)), [])
+
+
+class WaveformPeaksTests(TemporaryMediaMixin, TestCase):
+    """Peaks are served once the background job stored them, with a body that depends only on the audio"""
+
+    def create(self, content):
+        sha256 = hashlib.sha256(content).hexdigest()
+        blob, _ = store_blob(ContentFile(content, name='a.wav'), sha256)
+        return CoughRecording.objects.create(
+            file_name='a.wav', file_size=len(content), file_format='wav', recording_method='upload',
+            anonymous_name='participant', audio_file=blob.name, file_hash=sha256,
+        )
+
+    def test_peaks(self):
+        content = wav_bytes()
+        first, second = self.create(content), self.create(content)
+        url = f'/api/recordings/peaks/{first.recording_id}/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        tasks.waveform_peaks(first.file_hash)
+        response = self.client.get(url, {'resolution': 100})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['max']), 100)
+        self.assertIn('immutable', response['Cache-Control'])
+        # Recordings of the same content share the ETag, so they must share the body
+        other = self.client.get(f'/api/recordings/peaks/{second.recording_id}/', {'resolution': 100})
+        self.assertEqual(other['ETag'], response['ETag'])
+        self.assertEqual(other.content, response.content)
+        self.assertEqual(self.client.get(url, {'resolution': 100}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+class SegmentsEndpointTests(TestCase):
+    """GET only reads the segments the background job stored"""
+
+    def test_segments(self):
+        recording = CoughRecording.objects.create(
+            file_name='a.wav', file_size=1000, file_format='wav', recording_method='upload',
+            anonymous_name='participant', audio_file='cough_recordings/a.wav',
+        )
+        url = f'/api/recordings/segments/{recording.recording_id}/'
+        sequence = ChangeSequence.objects.current()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(ChangeSequence.objects.current(), sequence)
+
+        events = [{'start': 0.1, 'end': 0.4, 'onset': 0.12, 'peak_db': -12.0}]
+        CoughSegment.objects.replace([recording.recording_id], events)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['segments'], events)
+
+
+class SQLiteCacheTests(TestCase):
+    """The shared SQLite cache behaves like Django's other backends, incr included"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings = override_settings(CACHES=sqlite_caches(directory))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.cache = caches['default']
+        self.assertEqual(self.cache.path, os.path.join(directory, 'cache.sqlite3'))
+
+    def test_values(self):
+        self.cache.set_many({'int': 3, 'bool': True, 'dict': {'a': [1, 2]}, 'big': 2 ** 70})
+        self.assertEqual(self.cache.get_many(['int', 'bool', 'dict', 'big', 'missing']),
+                         {'int': 3, 'bool': True, 'dict': {'a': [1, 2]}, 'big': 2 ** 70})
+        self.assertIs(self.cache.get('bool'), True)
+        self.assertTrue(self.cache.delete('int'))
+        self.assertEqual(self.cache.get('int', 'gone'), 'gone')
+
+    def test_expiry_and_add(self):
+        self.cache.set('old', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('old'))
+        self.assertFalse(self.cache.has_key('old'))
+        # An expired row counts as absent
+        self.assertTrue(self.cache.add('old', 2))
+        self.assertFalse(self.cache.add('old', 3))
+        self.assertEqual(self.cache.get('old'), 2)
+
+    def test_incr(self):
+        for returning in (True, False):
+            with self.subTest(returning=returning), mock.patch.object(sqlite_cache, 'RETURNING', returning):
+                self.cache.set('n', 1)
+                self.assertEqual(self.cache.incr('n'), 2)
+                self.assertEqual(self.cache.incr('n', 5), 7)
+                self.assertEqual(self.cache.decr('n'), 6)
+                self.cache.set('f', 1.5)
+                self.assertEqual(self.cache.incr('f'), 2.5)
+                with self.assertRaises(ValueError):
+                    self.cache.incr('missing')
+
+    def test_cull(self):
+        self.cache._max_entries = 10
+        with mock.patch.object(sqlite_cache, 'CULL_EVERY', 5):
+            for n in range(30):
+                self.cache.set(f'key{n}', n)
+        count, = self.cache._connection().execute('SELECT COUNT(*) FROM cache').fetchone()
+        self.assertLessEqual(count, 15)
+        self.assertEqual(self.cache.get('key29'), 29)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TimeseriesTests(TestCase):
+    """Buckets are whole UTC hours, days, weeks from Monday and calendar months"""
+
+    def test_bucket_start(self):
+        sunday = utc(2026, 10, 18, 23, 59, 59)
+        self.assertEqual(timeseries.bucket_start(sunday, 'hour'), utc(2026, 10, 18, 23))
+        self.assertEqual(timeseries.bucket_start(sunday, 'day'), utc(2026, 10, 18))
+        self.assertEqual(timeseries.bucket_start(sunday, 'week'), utc(2026, 10, 12))
+        self.assertEqual(timeseries.bucket_start(utc(2026, 10, 12), 'week'), utc(2026, 10, 12))
+        self.assertEqual(timeseries.bucket_start(sunday, 'month'), utc(2026, 10, 1))
+        # Monday 01:00 in UTC+2 is still Sunday in UTC
+        local = datetime(2026, 10, 19, 1, tzinfo=dt_timezone(timedelta(hours=2)))
+        self.assertEqual(timeseries.bucket_start(local, 'week'), utc(2026, 10, 12))
+
+    def test_next_bucket(self):
+        self.assertEqual(timeseries.next_bucket(utc(2025, 12, 1), 'month'), utc(2026, 1, 1))
+        self.assertEqual(timeseries.next_bucket(utc(2026, 11, 1), 'month'), utc(2026, 12, 1))
+        self.assertEqual(timeseries.next_bucket(utc(2025, 12, 29), 'week'), utc(2026, 1, 5))
+        self.assertEqual(timeseries.next_bucket(utc(2025, 12, 31, 23), 'hour'), utc(2026, 1, 1))
+
+    def test_bucket_starts(self):
+        starts = timeseries.bucket_starts(utc(2025, 11, 15), utc(2026, 2, 1), 'month')
+        self.assertEqual(starts, [utc(2025, 11, 1), utc(2025, 12, 1), utc(2026, 1, 1)])
+        # Stops one past the cap, so callers can tell the range was too long
+        hours = timeseries.bucket_starts(utc(2020, 1, 1), utc(2026, 1, 1), 'hour')
+        self.assertEqual(len(hours), timeseries.MAX_POINTS + 1)
+
+    def test_series(self):
+        for day, count in ((utc(2025, 12, 31), 2), (utc(2026, 1, 1), 3)):
+            DailyRollup.objects.create(period=day, recording_method='upload', file_format='wav',
+                                       count=count, duration_sum=count * 2.0, duration_count=count,
+                                       size_sum=count * 1024 * 1024)
+        series = timeseries.timeseries(utc(2025, 11, 1), utc(2026, 2, 1), 'month')
+        self.assertEqual([point['count'] for point in series], [0, 2, 3])
+        self.assertEqual(series[2]['by_format'], {'wav': 3})
+        self.assertEqual(series[2]['total_size_mb'], 3.0)
+        # Both days fall in the week of Monday 29 December
+        weeks = timeseries.timeseries(utc(2025, 12, 22), utc(2026, 1, 12), 'week')
+        self.assertEqual([point['count'] for point in weeks], [0, 5, 0])
+
+    def test_too_many_points(self):
+        response = self.client.get('/api/recordings/stats/timeseries/',
+                                   {'bucket': 'hour', 'from': '2020-01-01', 'to': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkIngestTests(TemporaryMediaMixin, TestCase):
+    """Bulk files are prepared in parallel, stored once per content and inserted all or nothing"""
+
+    client_info = {'ip_address': '127.0.0.1', 'user_agent': 'tests'}
+
+    def files(self):
+        return [
+            SimpleUploadedFile('a.wav', wav_bytes(0.5), content_type='audio/wav'),
+            SimpleUploadedFile('notes.txt', b'not audio', content_type='text/plain'),
+            SimpleUploadedFile('b.wav', wav_bytes(0.5), content_type='audio/wav'),
+            SimpleUploadedFile('c.wav', wav_bytes(1.0), content_type='audio/wav'),
+        ]
+
+    def test_ingest(self):
+        items = bulk.ingest_files(self.files(), 'participant', 'upload', None, self.client_info)
+        self.assertEqual(['recording' in item for item in items], [True, False, True, True])
+        self.assertIn('error', items[1])
+        recordings = [items[i]['recording'] for i in (0, 2, 3)]
+        self.assertEqual([r.anonymous_name for r in recordings], ['participant_1', 'participant_3', 'participant_4'])
+        self.assertEqual([r.duration for r in recordings], [0.5, 0.5, 1.0])
+        self.assertEqual(CoughRecording.objects.count(), 3)
+        # The two copies of the same content share one stored blob
+        self.assertEqual(recordings[0].file_hash, recordings[1].file_hash)
+        self.assertEqual(AudioBlob.objects.get(sha256=recordings[0].file_hash).ref_count, 2)
+        self.assertEqual(AudioBlob.objects.count(), 2)
+
+    def test_insert_is_atomic(self):
+        with mock.patch.object(CoughRecording.objects, 'bulk_create', side_effect=RuntimeError('disk full')):
+            items = bulk.ingest_files(self.files(), 'participant', 'upload', None, self.client_info)
+        self.assertTrue(all('error' in item and 'recording' not in item for item in items))
+        self.assertFalse(CoughRecording.objects.exists())
+        self.assertFalse(AudioBlob.objects.exists())
+
+
+class CanonicalDerivativeTests(TemporaryMediaMixin, TestCase):
+    """One 16 kHz mono FLAC per content, linked from every recording of it and removed with the last one"""
+
+    def create(self, content):
+        sha256 = hashlib.sha256(content).hexdigest()
+        blob, _ = store_blob(ContentFile(content, name='a.wav'), sha256)
+        return CoughRecording.objects.create(
+            file_name='a.wav', file_size=len(content), file_format='wav', recording_method='upload',
+            anonymous_name='participant', audio_file=blob.name, file_hash=sha256,
+        )
+
+    @skipUnless(shutil.which('ffmpeg'), 'needs ffmpeg to transcode')
+    def test_canonicalize(self):
+        content = wav_bytes(1.0, rate=44100, channels=2)
+        first, second = self.create(content), self.create(content)
+        tasks.canonicalize(first.file_hash)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.canonical_file.name, canonical.canonical_path(first.file_hash))
+        self.assertEqual(second.canonical_file.name, first.canonical_file.name)
+        probed = audio_probe.probe_path(first.canonical_file.path)
+        self.assertEqual((probed['format'], probed['sample_rate'], probed['channels']), ('flac', 16000, 1))
+        self.assertAlmostEqual(probed['duration'], 1.0, places=2)
+
+    def test_missing_ffmpeg(self):
+        recording = self.create(wav_bytes())
+        with mock.patch('core.canonical.shutil.which', return_value=None):
+            with self.assertRaises(canonical.TranscodeError):
+                tasks.canonicalize(recording.file_hash)
+        self.assertFalse(default_storage.exists(canonical.canonical_path(recording.file_hash)))
+
+    def test_deleted_with_last_recording(self):
+        content = wav_bytes()
+        first, second = self.create(content), self.create(content)
+        name = default_storage.save(canonical.canonical_path(first.file_hash), ContentFile(b'fLaC'))
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+
+
+class FeatureStoreTests(TestCase):
+    """Features round-trip through the matrix and the journaled index, also after a restart or a crash"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.store = feature_store.FeatureStore(directory)
+        self.addCleanup(self.store.clear)
+
+    def frames(self, n, value):
+        return np.full((n, features.N_FEATURES), value, dtype=np.float32)
+
+    def reload(self):
+        """The index as a new process reads it"""
+        feature_store._loaded.pop(self.store.directory, None)
+        return self.store.load_index()
+
+    def test_append_and_get(self):
+        a, b, c = (str(uuid.uuid4()) for _ in range(3))
+        self.assertEqual(self.store.append([([a], 'h1', self.frames(3, 1)), ([b], 'h2', self.frames(2, 2))]), 5)
+        # Known content only gets an index entry
+        self.assertEqual(self.store.append([([c], 'h1', None)]), 0)
+        np.testing.assert_array_equal(self.store.get(c), self.frames(3, 1))
+        np.testing.assert_array_equal(self.store.get(b), self.frames(2, 2))
+        self.assertIsNone(self.store.get(uuid.uuid4()))
+        self.assertEqual(np.load(self.store.matrix_path).shape, (5, features.N_FEATURES))
+
+        index = self.store.load_index()
+        self.assertEqual(self.reload(), index)
+        self.assertEqual(self.store.prune([a, b]), 1)
+        self.assertNotIn(c, self.reload()['recordings'])
+
+    def test_half_written_line(self):
+        a, b = str(uuid.uuid4()), str(uuid.uuid4())
+        self.store.append([([a], 'h1', self.frames(1, 1))])
+        with open(self.store.journal_path, 'ab') as journal:
+            journal.write(b'{"rows":99,"recor')
+        self.assertEqual(self.reload()['rows'], 1)
+        self.store.append([([b], 'h2', self.frames(1, 2))])
+        index = self.reload()
+        self.assertEqual((index['rows'], sorted(index['recordings'])), (2, sorted([a, b])))
+
+    def test_compaction(self):
+        with mock.patch.object(feature_store, 'COMPACT_MIN_BYTES', 0):
+            for n in range(3):
+                self.store.append([([str(uuid.uuid4())], f'h{n}', self.frames(1, n))])
+        index = self.store.load_index()
+        self.assertGreater(index['generation'], 0)
+        # The journal belongs to the generation written to index.json
+        with open(self.store.journal_path, 'rb') as journal:
+            self.assertEqual(json.loads(journal.readline())['generation'], index['generation'])
+        with open(self.store.index_path) as f:
+            self.assertEqual(json.load(f)['generation'], index['generation'])
+        self.assertEqual(self.reload(), index)
+        self.assertEqual((index['rows'], len(index['recordings'])), (3, 3))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class QualityMetricsTests(TemporaryMediaMixin, TestCase):
+    """Quality metrics are measured from the samples and filter lists and exports"""
+
+    rate = 16000
+
+    def tone(self, amplitude, seconds=1.0):
+        t = np.arange(int(seconds * self.rate)) / self.rate
+        return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+    def test_measure_samples(self):
+        noise = np.random.default_rng(0).normal(scale=0.001, size=self.rate).astype(np.float32)
+        metrics = quality.measure_samples(np.concatenate([self.tone(0.5), noise]), self.rate)
+        self.assertAlmostEqual(metrics['peak_db'], -6.0, delta=0.1)
+        self.assertEqual(metrics['clipping_ratio'], 0.0)
+        self.assertAlmostEqual(metrics['snr_db'], 54, delta=3)
+        # Half of it is silent
+        metrics = quality.measure_samples(np.concatenate([self.tone(0.5), np.zeros(self.rate)]), self.rate)
+        self.assertAlmostEqual(metrics['silence_ratio'], 0.5, delta=0.02)
+        clipped = np.clip(self.tone(2.0), -1.0, 1.0)
+        self.assertGreater(quality.measure_samples(clipped, self.rate)['clipping_ratio'], 0.5)
+
+    def test_measure_task(self):
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(self.rate)
+            out.writeframes((self.tone(0.5) * 32767).astype('<i2').tobytes())
+        content = buffer.getvalue()
+        sha256 = hashlib.sha256(content).hexdigest()
+        blob, _ = store_blob(ContentFile(content, name='a.wav'), sha256)
+        recording = CoughRecording.objects.create(
+            file_name='a.wav', file_size=len(content), file_format='wav', recording_method='upload',
+            anonymous_name='participant', audio_file=blob.name, file_hash=sha256,
+        )
+        tasks.measure_quality([str(recording.recording_id)])
+        recording.refresh_from_db()
+        self.assertAlmostEqual(recording.peak_db, -6.0, delta=0.1)
+        self.assertEqual(recording.clipping_ratio, 0.0)
+
+    def test_filters(self):
+        for name, snr, clipping in (('clean', 30.0, 0.0), ('noisy', 5.0, 0.0), ('clipped', 30.0, 0.02),
+                                    ('unmeasured', None, None)):
+            CoughRecording.objects.create(
+                file_name=f'{name}.wav', file_size=1000, file_format='wav', recording_method='upload',
+                anonymous_name=name, audio_file=f'cough_recordings/{name}.wav', snr_db=snr, clipping_ratio=clipping,
+            )
+        query = {'snr_db_min': 10, 'clipping_ratio_max': 0.001}
+        response = self.client.get('/api/recordings/list/', query)
+        self.assertEqual([item['file_name'] for item in response.json()['results']], ['clean.wav'])
+        export = self.client.get('/api/recordings/export-csv/', query).content.decode()
+        self.assertEqual(len(export.strip().splitlines()), 2)
+        self.assertIn('clean.wav', export)
+        self.assertEqual(self.client.get('/api/recordings/export-csv/', {'snr_db_min': 'loud'}).status_code, 400)
+
+
+class VectorIndexTests(TestCase):
+    """Similarity search finds the closest embeddings, with and without IVF, across adds and removals"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.index = vector_index.VectorIndex(self.directory)
+        self.ids = [uuid.uuid4() for _ in range(400)]
+        self.raw = np.random.default_rng(0).normal(size=(400, 16)).astype(np.float32)
+
+    def exact(self, queries, k):
+        """Brute-force rows of the k most similar vectors"""
+        scores = queries @ np.array(self.index._state.vectors).T
+        return np.argsort(-scores, axis=1)[:, :k]
+
+    def test_exact_search(self):
+        self.index.build(self.ids, self.raw)
+        self.assertTrue(self.index.open())
+        self.assertEqual(self.index.count, 400)
+        queries = self.index.normalize(self.raw[:5])
+        rows, scores = self.index.search(queries, 3, nprobe=0)
+        np.testing.assert_array_equal(rows, self.exact(queries, 3))
+        self.assertEqual(self.index.recording_ids(rows[:, 0]), self.ids[:5])
+        np.testing.assert_allclose(scores[:, 0], 1.0, atol=1e-5)
+        # Fewer vectors than asked for pad with -1
+        self.index.build(self.ids[:2], self.raw[:2])
+        self.index.open()
+        rows, _ = self.index.search(self.index.normalize(self.raw[:1]), 4)
+        self.assertEqual(rows[0].tolist()[2:], [-1, -1])
+
+    def test_ivf_search(self):
+        meta = self.index.build(self.ids, self.raw, nlist=8)
+        self.assertEqual(meta['nlist'], 8)
+        self.index.open()
+        offsets = self.index._state.offsets
+        self.assertEqual((offsets[0], offsets[-1]), (0, 400))
+        # A vector's own cluster is always probed, so it finds itself
+        rows, scores = self.index.search(self.index.normalize(self.raw[:20]), 5, nprobe=2)
+        self.assertEqual(self.index.recording_ids(rows[:, 0]), self.ids[:20])
+        # Probing every cluster is the exact search
+        queries = self.index.normalize(self.raw[20:30])
+        rows, _ = self.index.search(queries, 5, nprobe=8)
+        np.testing.assert_array_equal(rows, self.exact(queries, 5))
+
+    def test_add_and_remove(self):
+        self.assertEqual(self.index.add(self.ids[:1], self.raw[:1]), -1)
+        self.index.build(self.ids[:300], self.raw[:300], nlist=4)
+        self.assertEqual(self.index.add(self.ids[300:], self.raw[300:]), 100)
+        self.index.open()
+        self.assertEqual((self.index.count, self.index._state.meta['built']), (400, 300))
+        # The unclustered tail is scanned even when its cluster is not probed
+        rows, _ = self.index.search(self.index.normalize(self.raw[350:351]), 1, nprobe=1)
+        self.assertEqual(self.index.recording_ids(rows[0]), [self.ids[350]])
+
+        # Adding a recording again replaces its vector
+        replacement = np.random.default_rng(1).normal(size=(1, 16)).astype(np.float32)
+        self.index.add(self.ids[:1], replacement)
+        self.index.open()
+        self.assertEqual(self.index.count, 400)
+        np.testing.assert_allclose(self.index.vector(self.ids[0]), self.index.normalize(replacement)[0], atol=1e-6)
+        rows, _ = self.index.search(self.index.normalize(self.raw[:1]), 400, nprobe=0)
+        self.assertEqual(self.index.recording_ids(rows[0]).count(self.ids[0]), 1)
+
+        self.assertEqual(self.index.remove(self.ids[:2] + [uuid.uuid4()]), 2)
+        self.index.open()
+        self.assertEqual(self.index.count, 398)
+        self.assertIsNone(self.index.vector(self.ids[1]))
+        rows, _ = self.index.search(self.index.normalize(self.raw[1:2]), 400, nprobe=0)
+        found = self.index.recording_ids(rows[0][rows[0] >= 0])
+        self.assertEqual(len(found), 398)
+        self.assertNotIn(self.ids[1], found)
+
+    def test_similar_endpoint(self):
+        recordings = [
+            CoughRecording.objects.create(
+                file_name=f'{n}.wav', file_size=1000, file_format='wav', recording_method='upload',
+                anonymous_name='participant', audio_file=f'cough_recordings/{n}.wav',
+            )
+            for n in range(3)
+        ]
+        url = f'/api/recordings/similar/{recordings[0].recording_id}/'
+        with override_settings(VECTOR_INDEX_DIR=self.directory), \
+                mock.patch.object(vector_index, '_index', None):
+            self.assertEqual(self.client.get(url).status_code, 503)
+            raw = np.array([[1, 0, 0], [1, 0.1, 0], [0, 1, 0]], dtype=np.float32)
+            vector_index.VectorIndex().build([r.recording_id for r in recordings], raw)
+            self.assertEqual(self.client.get(url, {'k': 0}).status_code, 400)
+            response = self.client.get(url, {'k': 1})
+            self.assertEqual(response.status_code, 200)
+            results = response.json()['results']
+            self.assertEqual([item['recording_id'] for item in results], [str(recordings[1].recording_id)])
+            self.assertGreater(results[0]['similarity'], 0.99)
+            self.assertEqual(self.client.get(f'/api/recordings/similar/{uuid.uuid4()}/').status_code, 404)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ResponseCacheTests(TestCase):
+    """A write invalidates only the cached responses of the namespaces it touches"""
+
+    def setUp(self):
+        cache.clear()
+        self.first, self.second = (
+            CoughRecording.objects.create(
+                file_name=f'{name}.wav', file_size=1000, file_format='wav', recording_method='upload',
+                anonymous_name=name, audio_file=f'cough_recordings/{name}.wav',
+            )
+            for name in ('first', 'second')
+        )
+
+    def test_generations(self):
+        generation, = response_cache.generations(['recordings'])
+        self.assertEqual(response_cache.generations(['recordings']), [generation])
+        response_cache.bump('recordings', 'recordings')
+        self.assertEqual(response_cache.generations(['recordings']), [generation + 1])
+        # A generation lost to eviction restarts above every earlier one
+        cache.delete(response_cache._generation_key('recordings'))
+        self.assertGreater(response_cache.generations(['recordings'])[0], generation + 1)
+
+    def test_write_invalidates_touched_namespaces(self):
+        list_url = '/api/recordings/list/'
+        detail_url = f'/api/recordings/detail/{self.second.recording_id}/'
+        self.client.get(list_url)
+        self.client.get(detail_url)
+        self.assertEqual(self.client.get(list_url).json(), self.client.get(list_url).json())
+        self.client.get(detail_url)
+        self.assertEqual(response_cache.counters()['recordings'], {'hits': 2, 'misses': 1, 'hit_rate': 0.667})
+        self.assertEqual(response_cache.counters()['recording']['hits'], 1)
+
+        self.first.file_name = 'renamed.wav'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.save()
+        names = [item['file_name'] for item in self.client.get(list_url).json()['results']]
+        self.assertIn('renamed.wav', names)
+        self.assertEqual(response_cache.counters()['recordings']['misses'], 2)
+        # The other recording's detail stays cached
+        self.client.get(detail_url)
+        self.assertEqual(response_cache.counters()['recording'], {'hits': 2, 'misses': 1, 'hit_rate': 0.667})
+
+
+class ExplainEndpointsTests(TestCase):
+    """explain_endpoints finds no full scans on the shipped indexes and writes nothing"""
+
+    def test_strict(self):
+        synthetic.create_recordings(300, users=5)
+        call_command('rebuild_stats', stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        before = (CoughRecording.objects.count(), Job.objects.count(), ChangeSequence.objects.current())
+        out = StringIO()
+        call_command('explain_endpoints', '--strict', stdout=out)
+        self.assertIn('0 with a full scan or sort', out.getvalue())
+        self.assertEqual((CoughRecording.objects.count(), Job.objects.count(), ChangeSequence.objects.current()),
+                         before)
+
+    def test_problem(self):
+        command = explain_endpoints.Command()
+        sql = 'SELECT * FROM t WHERE a = 1 ORDER BY b LIMIT 20'
+        self.assertEqual(command.problem('SCAN recordings_coughrecording', sql), 'full scan')
+        self.assertEqual(command.problem('SCAN recordings_coughrecording USING INDEX idx', sql), 'full index scan')
+        self.assertIsNone(command.problem('SCAN recordings_coughrecording USING INDEX idx',
+                                          'SELECT * FROM t ORDER BY b LIMIT 20'))
+        self.assertIsNone(command.problem('SCAN recordings_statscounter', sql))
+        self.assertIsNone(command.problem('SCAN recordings_search VIRTUAL TABLE INDEX 0:M1', sql))
+        self.assertEqual(command.problem('USE TEMP B-TREE FOR ORDER BY', sql), 'sort')
+        self.assertIsNone(command.problem('SEARCH recordings_coughrecording USING INDEX idx (user_id=?)', sql))
@@ -0,0 +1,88 @@
+"""
+Recording statistics over time, read from the hourly and daily rollups.
+Hours come from HourlyRollup, days from DailyRollup, and weeks (starting
+Monday) and months are summed from the daily rows, so a year of data is
+a few hundred rows per method and format whatever the number of recordings.
+All buckets are in UTC.
+"""
+import datetime
+from .models import DailyRollup, HourlyRollup
+
+BUCKETS = ('hour', 'day', 'week', 'month')
+DEFAULT_SPANS = {
+    'hour': datetime.timedelta(days=2),
+    'day': datetime.timedelta(days=30),
+    'week': datetime.timedelta(weeks=26),
+    'month': datetime.timedelta(days=365),
+}
+MAX_POINTS = 1000
+
+
+def bucket_start(moment, bucket):
+    """Start of the bucket holding `moment` (an aware datetime)"""
+    moment = moment.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if bucket == 'hour':
+        return moment
+    moment = moment.replace(hour=0)
+    if bucket == 'week':
+        return moment - datetime.timedelta(days=moment.weekday())
+    if bucket == 'month':
+        return moment.replace(day=1)
+    return moment
+
+
+def next_bucket(start, bucket):
+    """Start of the bucket after the one starting at `start`"""
+    if bucket == 'month':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    step = {'hour': datetime.timedelta(hours=1), 'day': datetime.timedelta(days=1),
+            'week': datetime.timedelta(weeks=1)}[bucket]
+    return start + step
+
+
+def bucket_starts(start, end, bucket):
+    """Starts of the buckets overlapping [start, end)"""
+    current = bucket_start(start, bucket)
+    starts = []
+    while current < end and len(starts) <= MAX_POINTS:
+        starts.append(current)
+        current = next_bucket(current, bucket)
+    return starts
+
+
+def timeseries(start, end, bucket):
+    """
+    One point per bucket overlapping [start, end), empty buckets included:
+    recordings, seconds recorded, size and the method and format mix.
+    Buckets are whole, so the first one may begin before `start`.
+    """
+    starts = bucket_starts(start, end, bucket)
+    points = {
+        moment: {'start': moment.isoformat(), 'count': 0, 'total_duration': 0.0, 'total_size': 0,
+                 'by_method': {}, 'by_format': {}}
+        for moment in starts
+    }
+    if not starts:
+        return []
+    model = HourlyRollup if bucket == 'hour' else DailyRollup
+    rows = model.objects.filter(period__gte=starts[0], period__lt=end).values_list(
+        'period', 'recording_method', 'file_format', 'count', 'duration_sum', 'size_sum'
+    )
+    for period, method, file_format, count, duration_sum, size_sum in rows:
+        point = points.get(bucket_start(period, bucket))
+        if point is None or not count:
+            continue
+        point['count'] += count
+        point['total_duration'] += duration_sum
+        point['total_size'] += size_sum
+        point['by_method'][method] = point['by_method'].get(method, 0) + count
+        point['by_format'][file_format] = point['by_format'].get(file_format, 0) + count
+
+    series = []
+    for moment in starts:
+        point = points[moment]
+        total_size = point.pop('total_size')
+        point['total_duration'] = round(point['total_duration'], 2)
+        point['total_size_mb'] = round(total_size / (1024 * 1024), 2)
+        series.append(point)
+    return series
@@ -4,10 +4,18 @@ from . import views
 urlpatterns = [
     path('upload/', views.CoughRecordingCreateView.as_view(), name='recording-create'),
     path('bulk-upload/', views.bulk_upload_recordings, name='bulk-upload'),
+    path('uploads/', views.create_upload_session, name='upload-session-create'),
+    path('uploads/<uuid:session_id>/', views.upload_session_detail, name='upload-session-detail'),
+    path('uploads/<uuid:session_id>/finalize/', views.finalize_upload_session, name='upload-session-finalize'),
     path('list/', views.CoughRecordingListView.as_view(), name='recording-list'),
     path('detail/<uuid:recording_id>/', views.CoughRecordingDetailView.as_view(), name='recording-detail'),
     path('my-recordings/', views.UserRecordingsView.as_view(), name='user-recordings'),
+    path('peaks/<uuid:recording_id>/', views.recording_peaks, name='recording-peaks'),
+    path('segments/<uuid:recording_id>/', views.recording_segments, name='recording-segments'),
+    path('similar/<uuid:recording_id>/', views.similar_recordings, name='recording-similar'),
     path('stats/', views.recording_stats, name='recording-stats'),
+    path('stats/timeseries/', views.recording_stats_timeseries, name='recording-stats-timeseries'),
+    path('stats/distribution/', views.recording_stats_distribution, name='recording-stats-distribution'),
     path('export-csv/', views.export_csv, name='export-csv'),
     path('export-html/', views.export_html, name='export-html'),
     path('export-zip/', views.export_zip, name='export-zip'),
@@ -1,26 +1,47 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.filters import OrderingFilter
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
 from django.http import HttpResponse
-from django.db.models import Count, Sum, Avg
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
 from django.contrib.auth.models import User
-from django.core.cache import cache
+from django.utils.decorators import method_decorator
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from types import SimpleNamespace
+import datetime
 import csv
 import io
 import zipfile
 import os
 import logging
 from django.conf import settings
-from .models import CoughRecording
+from .models import CoughRecording, DistributionSketch, StatsCounter, UploadSession
+from . import timeseries
+from .changes import conditional_response
+from .bulk import ingest_files
+from .filters import CoughRecordingFilter
+from .pagination import RecordingCursorPagination
+from .search import FullTextSearchFilter
 from .serializers import (
     CoughRecordingSerializer, 
     CoughRecordingListSerializer,
-    CoughRecordingStatsSerializer
+    CoughRecordingStatsSerializer,
+    RecordingListRows
 )
 from core.validators import validate_audio_file, validate_anonymous_name, validate_recording_method
 from core.exceptions import ValidationError, FileProcessingError
 from core.utils import get_client_info, log_user_action, AudioMetadataExtractor
 from core.audio_processor import AudioProcessor
+from core.ingest import SpooledUpload
+from core.embeddings import embed
+from core.feature_store import FeatureStore
+from core.vector_index import DEFAULT_NPROBE, get_index
+from core.response_cache import cache_response
+from core.waveform import DEFAULT_PEAK_RESOLUTION, PEAK_RESOLUTIONS, load_peaks
 
 logger = logging.getLogger(__name__)
 
@@ -57,11 +78,6 @@ class CoughRecordingCreateView(generics.CreateAPIView):
                 user_agent=client_info['user_agent']
             )
             
-            # Clear caches when new recording is added
-            cache.delete('recording_stats')
-            cache.delete('recordings_list')
-            cache.clear()  # Clear all cache to ensure fresh data
-            
             # Log the action
             log_user_action(
                 user=self.request.user if self.request.user.is_authenticated else None,
@@ -80,103 +96,216 @@ class CoughRecordingCreateView(generics.CreateAPIView):
             raise ValidationError(str(e))
 
 
-class CoughRecordingListView(generics.ListAPIView):
+class RecordingRowsListMixin:
+    """Lists through RecordingListRows: pages are read as values_list rows, no model instances"""
+    
+    def list(self, request, *args, **kwargs):
+        rows = RecordingListRows(self.get_serializer())
+        page = self.paginate_queryset(rows.queryset(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(rows.render(page))
+
+
+@method_decorator(conditional_response, name='get')
+@method_decorator(cache_response('recordings'), name='get')
+class CoughRecordingListView(RecordingRowsListMixin, generics.ListAPIView):
     """List all cough recordings with filtering and optimized queries"""
     serializer_class = CoughRecordingListSerializer
     permission_classes = [permissions.AllowAny]
-    filterset_fields = ['recording_method', 'file_format', 'user']
+    filterset_class = CoughRecordingFilter
+    pagination_class = RecordingCursorPagination
+    # Search last, so its relevance order is not replaced by the default ordering
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
     search_fields = ['user__username', 'anonymous_name', 'file_name']
-    ordering_fields = ['created_at', 'duration', 'file_size']
+    ordering_fields = ['created_at', 'duration', 'file_size', 'peak_db', 'clipping_ratio',
+                       'silence_ratio', 'snr_db']
     ordering = ['-created_at']
     
     def get_queryset(self):
-        """Optimized queryset with select_related for better performance"""
-        return CoughRecording.objects.select_related('user').all()
+        """Only the columns the requested fields need; created_at for the cursor links"""
+        return self.get_serializer().load_only(CoughRecording.objects.all(), 'created_at')
+    
+    def stats_counter(self, request):
+        return ('total', '')
 
 
+@method_decorator(conditional_response, name='get')
+@method_decorator(cache_response(
+    'recording', lambda request, recording_id: [f'recording:{recording_id}']
+), name='get')
 class CoughRecordingDetailView(generics.RetrieveAPIView):
     """Get detailed view of a specific recording"""
-    queryset = CoughRecording.objects.all()
     serializer_class = CoughRecordingSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'recording_id'
+    
+    def get_queryset(self):
+        # user_agent, ip_address and the file hash are never serialized, so never read
+        return self.get_serializer().load_only(CoughRecording.objects.all())
 
 
-class UserRecordingsView(generics.ListAPIView):
+@method_decorator(cache_response('user', lambda request: [f'user:{request.user.pk}']), name='get')
+class UserRecordingsView(RecordingRowsListMixin, generics.ListAPIView):
     """List recordings for authenticated user"""
     serializer_class = CoughRecordingListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RecordingCursorPagination
     
     def get_queryset(self):
-        return CoughRecording.objects.filter(user=self.request.user)
+        queryset = CoughRecording.objects.filter(user=self.request.user)
+        return self.get_serializer().load_only(queryset, 'created_at')
+    
+    def stats_counter(self, request):
+        return ('user', str(request.user.pk))
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@conditional_response
+@cache_response('stats')
 def recording_stats(request):
-    """Get comprehensive statistics about recordings with caching"""
-    # Try to get cached stats first
-    cache_key = 'recording_stats'
-    cached_stats = cache.get(cache_key)
-    
-    if cached_stats:
-        logger.info("Returning cached statistics")
-        return Response(cached_stats)
-    
-    logger.info("Generating fresh statistics")
-    
-    total_recordings = CoughRecording.objects.count()
-    total_users = CoughRecording.objects.filter(user__isnull=False).values('user').distinct().count()
-    total_anonymous = CoughRecording.objects.filter(user__isnull=True).count()
-    
-    # Aggregate statistics
-    aggregates = CoughRecording.objects.aggregate(
-        total_duration=Sum('duration'),
-        total_size=Sum('file_size'),
-        avg_duration=Avg('duration')
-    )
-    
-    # Convert total size to MB
-    total_size_mb = (aggregates['total_size'] or 0) / (1024 * 1024)
-    
-    # Recordings by method
-    recordings_by_method = dict(
-        CoughRecording.objects.values('recording_method').annotate(
-            count=Count('id')
-        ).values_list('recording_method', 'count')
-    )
-    
-    # Recordings by format
-    recordings_by_format = dict(
-        CoughRecording.objects.values('file_format').annotate(
-            count=Count('id')
-        ).values_list('file_format', 'count')
-    )
-    
-    stats_data = {
-        'total_recordings': total_recordings,
-        'total_users': total_users,
-        'total_anonymous': total_anonymous,
-        'total_duration': aggregates['total_duration'] or 0,
-        'total_size_mb': round(total_size_mb, 2),
-        'avg_duration': round(aggregates['avg_duration'] or 0, 2),
-        'recordings_by_method': recordings_by_method,
-        'recordings_by_format': recordings_by_format,
-    }
+    """
+    Get comprehensive statistics about recordings.
+    Reads the materialized counters, so the cost does not grow with the table.
+    """
+    serializer = CoughRecordingStatsSerializer(StatsCounter.objects.summary())
+    return Response(serializer.data)
+
+
+DISTRIBUTION_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+@cache_response('stats')
+def recording_stats_distribution(request):
+    """
+    Percentiles and histograms of duration, file size and sample rate,
+    estimated from stored quantile sketches in constant time. `?field=`
+    picks one field, `?bins=` sets the histogram buckets (default 20).
+    """
+    fields = DistributionSketch.objects.FIELDS
+    field = request.GET.get('field')
+    if field is not None and field not in fields:
+        return Response({
+            'success': False,
+            'error': f'field must be one of {", ".join(fields)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        bins = int(request.GET.get('bins', 20))
+    except ValueError:
+        bins = 0
+    if not 1 <= bins <= 200:
+        return Response(
+            {'success': False, 'error': 'bins must be an integer between 1 and 200'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    serializer = CoughRecordingStatsSerializer(stats_data)
-    response_data = serializer.data
+    distributions = {}
+    for name, sketch in DistributionSketch.objects.sketches().items():
+        if field is not None and name != field:
+            continue
+        if sketch.count == 0:
+            distributions[name] = {'count': 0, 'min': None, 'max': None, 'percentiles': {},
+                                   'histogram': {'edges': [], 'counts': []}}
+            continue
+        values = sketch.quantiles([p / 100 for p in DISTRIBUTION_PERCENTILES])
+        edges, counts = sketch.histogram(bins)
+        distributions[name] = {
+            'count': sketch.count,
+            'min': sketch.min,
+            'max': sketch.max,
+            'percentiles': {f'p{p}': round(value, 3) for p, value in zip(DISTRIBUTION_PERCENTILES, values)},
+            'histogram': {'edges': [round(edge, 3) for edge in edges], 'counts': counts},
+        }
+    return Response({'success': True, 'distributions': distributions})
+
+
+def _parse_moment(value):
+    """An aware datetime from an ISO date or datetime query value, or None"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, datetime.timezone.utc)
+    return moment
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+@cache_response('stats')
+def recording_stats_timeseries(request):
+    """
+    Uploads, seconds recorded, size and method/format mix per hour, day,
+    week or month between `from` and `to` (ISO dates or datetimes, UTC).
+    """
+    bucket = request.GET.get('bucket', 'day')
+    if bucket not in timeseries.BUCKETS:
+        return Response({
+            'success': False,
+            'error': f'bucket must be one of {", ".join(timeseries.BUCKETS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Cache for 5 minutes
-    cache.set(cache_key, response_data, 300)
+    try:
+        end = _parse_moment(request.GET['to']) if request.GET.get('to') else timezone.now()
+        start = (_parse_moment(request.GET['from']) if request.GET.get('from')
+                 else end - timeseries.DEFAULT_SPANS[bucket])
+    except ValueError:
+        start = end = None
+    if start is None or end is None or start >= end:
+        return Response(
+            {'success': False, 'error': 'from and to must be ISO dates or datetimes with from before to'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(timeseries.bucket_starts(start, end, bucket)) > timeseries.MAX_POINTS:
+        return Response({
+            'success': False,
+            'error': f'Range covers more than {timeseries.MAX_POINTS} {bucket}s; use a coarser bucket'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response(response_data)
+    return Response({
+        'success': True,
+        'bucket': bucket,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'series': timeseries.timeseries(start, end, bucket),
+    })
+
+
+def _export_filter(request):
+    """The list endpoint's filters applied to an export request"""
+    return CoughRecordingFilter(request.GET, queryset=CoughRecording.objects.all().select_related('user'))
+
+
+def _invalid_filter_response(filterset):
+    return Response({
+        'success': False,
+        'error': 'Invalid filter parameters',
+        'details': filterset.errors
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _quality_columns(recording):
+    """Quality metrics for export rows; blank where not measured"""
+    return [
+        '' if value is None else value
+        for value in (recording.peak_db, recording.clipping_ratio,
+                      recording.silence_ratio, recording.snr_db)
+    ]
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def export_csv(request):
-    """Export all recordings data to CSV for thesis research"""
+    """
+    Export recordings data to CSV for thesis research.
+    Accepts the list filters, e.g. ?snr_db_min=10&clipping_ratio_max=0.001
+    """
+    filterset = _export_filter(request)
+    if not filterset.is_valid():
+        return _invalid_filter_response(filterset)
     from django.utils import timezone
     timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
     response = HttpResponse(content_type='text/csv')
@@ -187,14 +316,15 @@ def export_csv(request):
     # CSV Headers
     headers = [
         'Recording ID', 'User Type', 'User Name', 'File Name', 'File Size (MB)',
-        'File Format', 'Duration (seconds)', 'Recording Method', 'Created At',
-        'Uploaded At', 'Sample Rate', 'Bit Rate', 'Channels', 'IP Address',
-        'User Agent', 'Audio File URL'
+        'File Format', 'Duration (seconds)', 'Original Duration (seconds)',
+        'Recording Method', 'Created At', 'Uploaded At', 'Sample Rate',
+        'Bit Rate', 'Channels', 'Peak (dBFS)', 'Clipping Ratio', 'Silence Ratio',
+        'SNR (dB)', 'IP Address', 'User Agent', 'Audio File URL'
     ]
     writer.writerow(headers)
     
     # Write data rows
-    for recording in CoughRecording.objects.all().select_related('user'):
+    for recording in filterset.qs:
         user_type = 'Registered' if recording.user else 'Anonymous'
         user_name = recording.user_display_name
         audio_url = request.build_absolute_uri(recording.audio_file.url) if recording.audio_file else ''
@@ -207,12 +337,14 @@ def export_csv(request):
             recording.file_size_mb,
             recording.file_format,
             recording.duration or '',
+            recording.original_duration or '',
             recording.get_recording_method_display(),
             recording.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             recording.uploaded_at.strftime('%Y-%m-%d %H:%M:%S'),
             recording.sample_rate or '',
             recording.bit_rate or '',
             recording.channels or '',
+            *_quality_columns(recording),
             recording.ip_address or '',
             recording.user_agent or '',
             audio_url
@@ -225,7 +357,10 @@ def export_csv(request):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def export_html(request):
-    """Export all recordings data to HTML with embedded audio players"""
+    """Export recordings data to HTML with embedded audio players; accepts the list filters"""
+    filterset = _export_filter(request)
+    if not filterset.is_valid():
+        return _invalid_filter_response(filterset)
     from django.utils import timezone
     timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
     response = HttpResponse(content_type='text/html')
@@ -263,7 +398,7 @@ def export_html(request):
             </tr>
     """
     
-    for recording in CoughRecording.objects.all().select_related('user'):
+    for recording in filterset.qs:
         user_type = 'Registered' if recording.user else 'Anonymous'
         user_name = recording.user_display_name
         audio_url = request.build_absolute_uri(recording.audio_file.url) if recording.audio_file else ''
@@ -305,8 +440,17 @@ def export_html(request):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def export_zip(request):
-    """Export all recordings as ZIP file with CSV and audio files"""
+    """
+    Export recordings as ZIP file with CSV and audio files.
+    Accepts the list filters, so unusable clips are never sent. With
+    ?canonical=true the 16 kHz mono FLAC derivatives are packed instead
+    of the originals where they exist.
+    """
+    filterset = _export_filter(request)
+    if not filterset.is_valid():
+        return _invalid_filter_response(filterset)
     from django.utils import timezone
+    use_canonical = request.GET.get('canonical', '').lower() in ('1', 'true')
     timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
     response = HttpResponse(content_type='application/zip')
     response['Content-Disposition'] = f'attachment; filename="data_{timestamp}.zip"'
@@ -322,18 +466,23 @@ def export_zip(request):
         # CSV Headers
         headers = [
             'Recording ID', 'User Type', 'User Name', 'Audio File Name', 'File Size (MB)',
-            'File Format', 'Duration (seconds)', 'Recording Method', 'Created At',
-            'Uploaded At', 'Sample Rate', 'Bit Rate', 'Channels', 'IP Address', 'User Agent'
+            'File Format', 'Duration (seconds)', 'Original Duration (seconds)',
+            'Recording Method', 'Created At', 'Uploaded At', 'Sample Rate',
+            'Bit Rate', 'Channels', 'Peak (dBFS)', 'Clipping Ratio', 'Silence Ratio',
+            'SNR (dB)', 'IP Address', 'User Agent'
         ]
         writer.writerow(headers)
         
         # Add each recording to ZIP
-        for recording in CoughRecording.objects.all().select_related('user'):
+        for recording in filterset.qs:
             user_type = 'Registered' if recording.user else 'Anonymous'
             user_name = recording.user_display_name
             
             # Add audio file to ZIP
-            if recording.audio_file and os.path.exists(recording.audio_file.path):
+            if use_canonical and recording.canonical_file and os.path.exists(recording.canonical_file.path):
+                flac_name = os.path.splitext(recording.file_name)[0] + '.flac'
+                zip_file.write(recording.canonical_file.path, f"audio_files/{flac_name}")
+            elif recording.audio_file and os.path.exists(recording.audio_file.path):
                 zip_file.write(recording.audio_file.path, f"audio_files/{recording.file_name}")
             
             # Add row to CSV
@@ -345,12 +494,14 @@ def export_zip(request):
                 recording.file_size_mb,
                 recording.file_format,
                 recording.duration or '',
+                recording.original_duration or '',
                 recording.get_recording_method_display(),
                 recording.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                 recording.uploaded_at.strftime('%Y-%m-%d %H:%M:%S'),
                 recording.sample_rate or '',
                 recording.bit_rate or '',
                 recording.channels or '',
+                *_quality_columns(recording),
                 recording.ip_address or '',
                 recording.user_agent or ''
             ]
@@ -397,65 +548,53 @@ def bulk_upload_recordings(request):
     warnings = []
     errors = []
     
-    for i, audio_file in enumerate(files):
-        try:
-            # Validate file
-            validate_audio_file(audio_file)
-            
-            # Process audio file
-            processed_file, was_truncated, original_duration = AudioProcessor.process_audio_file(audio_file)
-            
-            # Get client info
-            client_info = get_client_info(request)
-            
-            # Create numbered anonymous name for bulk uploads
-            file_anonymous_name = anonymous_name
-            if len(files) > 1:
-                file_anonymous_name = f"{anonymous_name}_{i + 1}"
-            
-            # Create recording directly
-            instance = CoughRecording.objects.create(
-                audio_file=processed_file,
-                anonymous_name=file_anonymous_name,
-                recording_method=recording_method,
-                ip_address=client_info['ip_address'],
-                user_agent=client_info['user_agent'],
-                user=request.user if request.user.is_authenticated else None
-            )
-            
-            result = {
+    # Probing and storage writes run in parallel, rows are inserted together
+    items = ingest_files(
+        files,
+        anonymous_name=anonymous_name,
+        recording_method=recording_method,
+        user=request.user if request.user.is_authenticated else None,
+        client_info=get_client_info(request)
+    )
+    
+    for i, (audio_file, item) in enumerate(zip(files, items)):
+        if 'error' in item:
+            errors.append({
                 'file_index': i,
                 'file_name': audio_file.name,
-                'recording_id': str(instance.recording_id),
-                'status': 'success'
-            }
-            
-            # Add warnings for duration issues
-            if was_truncated:
-                warnings.append({
-                    'file_index': i,
-                    'file_name': audio_file.name,
-                    'type': 'duration_warning',
-                    'message': f'Audio duration ({original_duration:.1f}s) exceeds research standard (10s). Consider re-recording for optimal research quality.',
-                    'original_duration': original_duration,
-                    'recommended_duration': 10.0
-                })
-                result['warning'] = 'Duration exceeds research standard'
-            
-            results.append(result)
-                
-        except Exception as e:
-            errors.append({
+                'error': str(item['error'])
+            })
+            continue
+        
+        instance = item['recording']
+        result = {
+            'file_index': i,
+            'file_name': audio_file.name,
+            'recording_id': str(instance.recording_id),
+            'status': 'success'
+        }
+        if instance.was_duplicate:
+            result['duplicate'] = True
+        
+        # Add warnings for duration issues
+        original_duration = item['metadata']['original_duration']
+        if original_duration and original_duration > AudioProcessor.MAX_DURATION:
+            if instance.was_truncated:
+                message = f'Audio duration ({original_duration:.1f}s) exceeds research standard (10s). Only the first 10s were kept.'
+            else:
+                message = f'Audio duration ({original_duration:.1f}s) exceeds research standard (10s). Consider re-recording for optimal research quality.'
+            warnings.append({
                 'file_index': i,
                 'file_name': audio_file.name,
-                'error': str(e)
+                'type': 'duration_warning',
+                'message': message,
+                'original_duration': original_duration,
+                'recommended_duration': 10.0,
+                'truncated': instance.was_truncated
             })
-    
-    # Clear all caches if any files were successfully uploaded
-    if results:
-        cache.delete('recording_stats')
-        cache.delete('recordings_list')
-        cache.clear()  # Ensure fresh data
+            result['warning'] = 'Duration exceeds research standard'
+        
+        results.append(result)
     
     # Prepare response
     response_data = {
@@ -496,3 +635,350 @@ def delete_user_recording(request, recording_id):
             {'success': False, 'error': 'Recording not found'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def recording_peaks(request, recording_id):
+    """
+    Waveform min/max envelope of a recording for playback previews.
+    The body depends only on the stored audio, so responses are cacheable
+    for a year. Peaks are computed by a background job after upload; until
+    then the answer is 404.
+    """
+    try:
+        resolution = int(request.GET.get('resolution', DEFAULT_PEAK_RESOLUTION))
+    except ValueError:
+        resolution = None
+    if resolution not in PEAK_RESOLUTIONS:
+        return Response({
+            'success': False,
+            'error': f'resolution must be one of {", ".join(map(str, PEAK_RESOLUTIONS))}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    file_hash = CoughRecording.objects.filter(recording_id=recording_id).values_list('file_hash', flat=True).first()
+    if not file_hash:
+        return Response(
+            {'success': False, 'error': 'Recording not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    etag = f'"{file_hash}-{resolution}"'
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        try:
+            peaks = load_peaks(file_hash, resolution)
+        except OSError:
+            return Response(
+                {'success': False, 'error': 'Waveform not computed for this recording yet'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        response = Response({
+            'success': True,
+            'resolution': resolution,
+            'min': peaks[:, 0].tolist(),
+            'max': peaks[:, 1].tolist(),
+        })
+    
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def recording_segments(request, recording_id):
+    """Cough events detected inside a recording; 404 until the segmentation job has run"""
+    recording = CoughRecording.objects.filter(recording_id=recording_id).only(
+        'recording_id', 'duration', 'segment_count'
+    ).first()
+    if recording is None:
+        return Response(
+            {'success': False, 'error': 'Recording not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if recording.segment_count is None:
+        return Response(
+            {'success': False, 'error': 'Recording not segmented yet'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    segments = list(recording.segments.values('start', 'end', 'onset', 'peak_db'))
+    return Response({
+        'success': True,
+        'recording_id': str(recording.recording_id),
+        'duration': recording.duration,
+        'segment_count': len(segments),
+        'segments': segments,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def similar_recordings(request, recording_id):
+    """
+    Recordings that sound most like the given one, by cosine similarity of
+    their pooled spectral embeddings. `?k=` sets the count (default 20,
+    at most 100) and `?exact=true` scans the whole index instead of the
+    nearest IVF clusters.
+    """
+    try:
+        k = int(request.GET.get('k', 20))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= 100:
+        return Response(
+            {'success': False, 'error': 'k must be an integer between 1 and 100'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    nprobe = 0 if request.GET.get('exact', '').lower() in ('1', 'true') else DEFAULT_NPROBE
+    
+    if not CoughRecording.objects.filter(recording_id=recording_id).exists():
+        return Response(
+            {'success': False, 'error': 'Recording not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    index = get_index()
+    if not index.count:
+        return Response(
+            {'success': False, 'error': 'Similarity index has not been built yet'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
+    query = index.vector(recording_id)
+    if query is None:
+        # Features may exist before the index caught up with them
+        frames = FeatureStore().get(recording_id)
+        if frames is None:
+            return Response(
+                {'success': False, 'error': 'Features not extracted for this recording yet'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        query = index.normalize(embed(frames)[None, :])[0]
+    
+    rows, scores = index.search(query, k + 1, nprobe=nprobe)
+    hits = rows[0] >= 0
+    matches = [
+        (rid, float(score))
+        for rid, score in zip(index.recording_ids(rows[0][hits]), scores[0][hits])
+        if rid != recording_id
+    ][:k]
+    found = CoughRecording.objects.select_related('user').in_bulk(
+        [rid for rid, _ in matches], field_name='recording_id'
+    )
+    results = []
+    for rid, score in matches:
+        # Rows deleted since the last index update are skipped
+        if rid in found:
+            item = CoughRecordingListSerializer(found[rid], context={'request': request}).data
+            item['similarity'] = round(score, 4)
+            results.append(item)
+    return Response({
+        'success': True,
+        'recording_id': str(recording_id),
+        'exact': nprobe == 0,
+        'count': len(results),
+        'results': results,
+    })
+
+
+def _parse_content_range(header):
+    """Parse 'bytes <start>-<end>/<total>' into integers, or None"""
+    try:
+        unit, byte_range = header.split(' ', 1)
+        span, total = byte_range.split('/', 1)
+        start, end = span.split('-', 1)
+        if unit.strip() != 'bytes':
+            return None
+        return int(start), int(end), int(total)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _session_response(session, status_code=status.HTTP_200_OK):
+    response = Response({
+        'session_id': str(session.session_id),
+        'offset': session.received_size,
+        'total_size': session.total_size,
+        'status': session.status,
+    }, status=status_code)
+    response['Upload-Offset'] = str(session.received_size)
+    return response
+
+
+def _get_upload_session(request, session_id):
+    """Look up a session the requesting user is allowed to write to"""
+    session = UploadSession.objects.filter(session_id=session_id).first()
+    if session is None or (session.user_id and session.user_id != request.user.id):
+        return None
+    return session
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def create_upload_session(request):
+    """Open a resumable upload for one audio file"""
+    file_name = request.data.get('file_name', '')
+    content_type = request.data.get('content_type', '')
+    anonymous_name = request.data.get('anonymous_name')
+    recording_method = request.data.get('recording_method', 'upload')
+    
+    try:
+        total_size = int(request.data.get('total_size'))
+    except (TypeError, ValueError):
+        return Response({
+            'success': False,
+            'error': 'total_size must be an integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        if total_size <= 0:
+            raise DjangoValidationError('File is empty')
+        validate_audio_file(SimpleNamespace(name=file_name, size=total_size, content_type=content_type))
+        if anonymous_name:
+            validate_anonymous_name(anonymous_name)
+        validate_recording_method(recording_method)
+    except DjangoValidationError as e:
+        return Response({
+            'success': False,
+            'error': e.messages[0]
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    session = UploadSession.objects.create(
+        user=request.user if request.user.is_authenticated else None,
+        anonymous_name=anonymous_name,
+        recording_method=recording_method,
+        file_name=file_name,
+        content_type=content_type,
+        total_size=total_size,
+    )
+    logger.info(f"Upload session opened: {session.session_id} ({total_size} bytes)")
+    return _session_response(session, status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT'])
+@permission_classes([permissions.AllowAny])
+def upload_session_detail(request, session_id):
+    """Report the current offset (GET/HEAD) or append a byte range (PUT)"""
+    session = _get_upload_session(request, session_id)
+    if session is None:
+        return Response(
+            {'success': False, 'error': 'Upload session not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if request.method == 'GET':
+        return _session_response(session)
+    
+    content_range = _parse_content_range(request.META.get('HTTP_CONTENT_RANGE'))
+    if content_range is None:
+        return Response({
+            'success': False,
+            'error': 'Content-Range header of the form "bytes start-end/total" is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    start, end, total = content_range
+    length = end - start + 1
+    content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if total != session.total_size or length <= 0 or end >= total or length != content_length:
+        return Response({
+            'success': False,
+            'error': 'Content-Range does not match the session or the request body'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if session.append_chunk(start, request.stream, length) is None:
+        # Wrong offset or a concurrent write; the client resumes from here
+        return _session_response(session, status.HTTP_409_CONFLICT)
+    
+    return _session_response(session)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def finalize_upload_session(request, session_id):
+    """Turn a fully received upload into a CoughRecording"""
+    session = _get_upload_session(request, session_id)
+    if session is None:
+        return Response(
+            {'success': False, 'error': 'Upload session not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Finalizing twice returns the same recording, so clients can retry safely
+    if session.status == 'complete':
+        if session.recording is None:
+            return Response(
+                {'success': False, 'error': 'The recording made from this upload has been deleted'},
+                status=status.HTTP_410_GONE
+            )
+        serializer = CoughRecordingSerializer(session.recording, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+    
+    if session.status == 'failed':
+        return Response(
+            {'success': False, 'error': 'This upload could not be stored, start a new one'},
+            status=status.HTTP_410_GONE
+        )
+    
+    # Incomplete, or another request is finalizing it right now
+    if session.received_size != session.total_size or not session.claim():
+        return _session_response(session, status.HTTP_409_CONFLICT)
+    
+    client_info = get_client_info(request)
+    upload = None
+    try:
+        upload = SpooledUpload(session.spool_path, session.file_name, session.content_type or None)
+        if upload.size != session.total_size:
+            raise FileProcessingError('Spool file is incomplete', session.file_name)
+        validate_audio_file(upload)
+        with transaction.atomic():
+            instance = CoughRecording.objects.create(
+                audio_file=upload,
+                anonymous_name=session.anonymous_name,
+                recording_method=session.recording_method,
+                ip_address=client_info['ip_address'],
+                user_agent=client_info['user_agent'],
+                user=session.user
+            )
+            session.status = 'complete'
+            session.recording = instance
+            session.save(update_fields=['status', 'recording', 'updated_at'])
+    except DjangoValidationError as e:
+        session.release('failed')
+        return Response({
+            'success': False,
+            'error': e.messages[0]
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except (OSError, FileProcessingError) as e:
+        # Missing or truncated spool, or the file could not be stored
+        logger.error(f"Finalizing upload session {session.session_id} failed: {e}")
+        session.release('failed')
+        return Response({
+            'success': False,
+            'error': 'The uploaded file could not be stored, start a new upload'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    except Exception:
+        # Unexpected: let the client retry instead of leaving the claim behind
+        session.release('open')
+        raise
+    finally:
+        if upload is not None:
+            upload.close()
+    
+    session.discard_spool()
+    
+    log_user_action(
+        user=session.user,
+        action='recording_created',
+        details={
+            'recording_id': str(instance.recording_id),
+            'method': session.recording_method,
+            'file_size': session.total_size,
+            'upload_session': str(session.session_id)
+        }
+    )
+    logger.info(f"Recording created from upload session {session.session_id}: {instance.recording_id}")
+    
+    serializer = CoughRecordingSerializer(instance, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
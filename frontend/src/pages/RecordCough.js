@@ -172,43 +172,37 @@ const RecordCough = () => {
     setMessage({ type: '', text: '' });
 
     try {
-      const formData = new FormData();
+      let files = [];
+      const fields = {};
       
       if (recordedBlob) {
         const audioFile = new File([recordedBlob], 'cough_recording.webm', {
           type: 'audio/webm'
         });
-        formData.append('audio_file', audioFile);
-        formData.append('recording_method', 'browser');
+        files = [audioFile];
+        fields.recording_method = 'browser';
       } else if (uploadFile) {
-        if (Array.isArray(uploadFile)) {
-          // Multiple files - use bulk upload
-          uploadFile.forEach(file => {
-            formData.append('audio_files', file);
-          });
-        } else {
-          // Single file
-          formData.append('audio_file', uploadFile);
-        }
-        formData.append('recording_method', 'upload');
+        files = Array.isArray(uploadFile) ? uploadFile : [uploadFile];
+        fields.recording_method = 'upload';
         
         // Add progress tracking for bulk uploads
-        if (Array.isArray(uploadFile) && uploadFile.length > 1) {
-          console.log(`Starting bulk upload of ${uploadFile.length} files`);
+        if (files.length > 1) {
+          console.log(`Starting bulk upload of ${files.length} files`);
         }
       }
 
       if (anonymousName.trim()) {
-        formData.append('anonymous_name', anonymousName.trim());
+        fields.anonymous_name = anonymousName.trim();
       }
 
       let response;
       let isBulkUpload = Array.isArray(uploadFile) && uploadFile.length > 1;
       
       try {
+        // Resumable uploads only re-send missing bytes after a dropped connection
         response = isBulkUpload 
-          ? await recordingsAPI.bulkUpload(formData)
-          : await recordingsAPI.upload(formData);
+          ? await recordingsAPI.resumableBulkUpload(files, fields)
+          : await recordingsAPI.resumableUpload(files[0], fields);
       } catch (uploadError) {
         // Check if it's a timeout but files might still be uploaded
         if (uploadError.code === 'ECONNABORTED' || uploadError.message?.includes('timeout')) {
@@ -11,6 +11,9 @@ const ViewRecordings = () => {
     recording_method: '',
     file_format: '',
   });
+  // The API returns next/previous links: a cursor, or a page number for searches ranked by relevance
+  const [pageParams, setPageParams] = useState({});
+  const [pageLinks, setPageLinks] = useState({ next: null, previous: null });
   const [currentPage, setCurrentPage] = useState(1);
   const [totalPages, setTotalPages] = useState(1);
   const [showModal, setShowModal] = useState(false);
@@ -23,7 +26,7 @@ const ViewRecordings = () => {
   const debouncedSearch = useCallback(
     debounce((searchValue) => {
       setFilters(prev => ({ ...prev, search: searchValue }));
-      setCurrentPage(1);
+      goToFirstPage();
     }, 500),
     []
   );
@@ -36,7 +39,7 @@ const ViewRecordings = () => {
     }, 100); // Small delay to show loading state
     
     return () => clearTimeout(timer);
-  }, [currentPage, filters]);
+  }, [pageParams, filters]);
 
   useEffect(() => {
     debouncedSearch(searchTerm);
@@ -86,7 +89,8 @@ const ViewRecordings = () => {
     setLoading(true);
     try {
       const params = {
-        page: currentPage,
+        ...pageParams,
+        count: currentPage === 1 ? 'approximate' : 'none', // total only on the first page
         _t: Date.now(), // Cache-busting parameter
         ...Object.fromEntries(
           Object.entries(filters).filter(([_, value]) => value !== '')
@@ -96,8 +100,9 @@ const ViewRecordings = () => {
       const response = await recordingsAPI.list(params);
       setRecordings(response.data.results || response.data);
       
-      if (response.data.count) {
-        setTotalPages(Math.ceil(response.data.count / 20));
+      setPageLinks({ next: response.data.next, previous: response.data.previous });
+      if (response.data.count !== undefined) {
+        setTotalPages(Math.max(1, Math.ceil(response.data.count / 20)));
       }
     } catch (error) {
       showModalDialog('error', '❌ Error Loading Recordings', 
@@ -117,7 +122,7 @@ const ViewRecordings = () => {
         ...filters,
         [name]: value,
       });
-      setCurrentPage(1);
+      goToFirstPage();
     }
   };
 
@@ -128,9 +133,24 @@ const ViewRecordings = () => {
       recording_method: '',
       file_format: '',
     });
+    goToFirstPage();
+  };
+
+  const pageParamsFrom = (link) => {
+    const query = new URL(link).searchParams;
+    return Object.fromEntries(['cursor', 'page'].filter(key => query.has(key)).map(key => [key, query.get(key)]));
+  };
+
+  const goToFirstPage = () => {
+    setPageParams({});
     setCurrentPage(1);
   };
 
+  const goToPage = (link, step) => {
+    setPageParams(pageParamsFrom(link));
+    setCurrentPage(page => Math.max(1, page + step));
+  };
+
   return (
     <Container className="py-5" style={{ marginTop: '80px' }}>
       <Row className="mb-4">
@@ -326,55 +346,36 @@ const ViewRecordings = () => {
       </Row>
 
       {/* Modern Pagination */}
-      {totalPages > 1 && (
+      {(pageLinks.next || pageLinks.previous) && (
         <Row className="mt-4">
           <Col>
             <div className="pagination-modern">
               <button 
                 className="page-btn"
-                onClick={() => setCurrentPage(1)}
-                disabled={currentPage === 1}
+                onClick={goToFirstPage}
+                disabled={!pageLinks.previous}
               >
                 First
               </button>
               <button 
                 className="page-btn"
-                onClick={() => setCurrentPage(currentPage - 1)}
-                disabled={currentPage === 1}
+                onClick={() => goToPage(pageLinks.previous, -1)}
+                disabled={!pageLinks.previous}
               >
                 Previous
               </button>
               
-              {[...Array(Math.min(5, totalPages))].map((_, index) => {
-                const pageNumber = Math.max(1, currentPage - 2) + index;
-                if (pageNumber <= totalPages) {
-                  return (
-                    <button
-                      key={pageNumber}
-                      className={`page-btn ${pageNumber === currentPage ? 'active' : ''}`}
-                      onClick={() => setCurrentPage(pageNumber)}
-                    >
-                      {pageNumber}
-                    </button>
-                  );
-                }
-                return null;
-              })}
+              <button className="page-btn active" disabled>
+                Page {currentPage} of {Math.max(currentPage, totalPages)}
+              </button>
               
               <button 
                 className="page-btn"
-                onClick={() => setCurrentPage(currentPage + 1)}
-                disabled={currentPage === totalPages}
+                onClick={() => goToPage(pageLinks.next, 1)}
+                disabled={!pageLinks.next}
               >
                 Next
               </button>
-              <button 
-                className="page-btn"
-                onClick={() => setCurrentPage(totalPages)}
-                disabled={currentPage === totalPages}
-              >
-                Last
-              </button>
             </div>
           </Col>
         </Row>
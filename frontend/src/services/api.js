@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { API_CONFIG, STORAGE_KEYS } from '../utils/constants';
+import { API_CONFIG, FILE_CONFIG, RECORDING_CONFIG, STORAGE_KEYS } from '../utils/constants';
 import { parseApiError, logError } from '../utils/errorHandler';
 import { retryWithBackoff } from '../utils/helpers';
 
@@ -92,6 +92,49 @@ const apiWithRetry = (apiCall) => {
   return retryWithBackoff(apiCall, API_CONFIG.RETRY_ATTEMPTS, API_CONFIG.RETRY_DELAY);
 };
 
+// Resumable upload: open a session, send byte ranges, then finalize.
+// After a failure the server's offset is queried so only missing bytes are re-sent.
+const uploadInChunks = async (file, fields, onProgress) => {
+  const { data: session } = await apiWithRetry(() =>
+    api.post('/recordings/uploads/', {
+      file_name: file.name,
+      total_size: file.size,
+      content_type: file.type,
+      ...fields,
+    })
+  );
+  const sessionUrl = `/recordings/uploads/${session.session_id}/`;
+  let offset = session.offset;
+  let failures = 0;
+
+  while (offset < file.size) {
+    const end = Math.min(offset + FILE_CONFIG.CHUNK_SIZE, file.size);
+    try {
+      const { data } = await api.put(sessionUrl, file.slice(offset, end), {
+        headers: {
+          'Content-Type': 'application/octet-stream',
+          'Content-Range': `bytes ${offset}-${end - 1}/${file.size}`,
+        },
+      });
+      offset = data.offset;
+      failures = 0;
+      if (onProgress) {
+        onProgress({ loaded: offset, total: file.size });
+      }
+    } catch (error) {
+      failures += 1;
+      if (failures >= API_CONFIG.RETRY_ATTEMPTS) {
+        throw error;
+      }
+      await new Promise(resolve => setTimeout(resolve, API_CONFIG.RETRY_DELAY * Math.pow(2, failures - 1)));
+      const { data } = await apiWithRetry(() => api.get(sessionUrl));
+      offset = data.offset;
+    }
+  }
+
+  return apiWithRetry(() => api.post(`${sessionUrl}finalize/`));
+};
+
 // Recordings API
 export const recordingsAPI = {
   upload: (formData, onProgress) => {
@@ -117,50 +160,134 @@ export const recordingsAPI = {
     );
   },
   
+  resumableUpload: (file, fields, onProgress) => uploadInChunks(file, fields, onProgress),
+  
+  // Uploads files one by one and reports them like the bulk-upload endpoint
+  resumableBulkUpload: async (files, fields, onProgress) => {
+    const results = [];
+    const warnings = [];
+    const errors = [];
+
+    for (let i = 0; i < files.length; i++) {
+      const fileFields = { ...fields };
+      if (files.length > 1 && fields.anonymous_name) {
+        fileFields.anonymous_name = `${fields.anonymous_name}_${i + 1}`;
+      }
+      try {
+        const { data } = await uploadInChunks(files[i], fileFields, onProgress);
+        results.push({
+          file_index: i,
+          file_name: files[i].name,
+          recording_id: data.recording_id,
+          status: 'success',
+        });
+        const originalDuration = data.original_duration ?? data.duration;
+        if (originalDuration > RECORDING_CONFIG.MAX_DURATION) {
+          warnings.push({
+            file_index: i,
+            file_name: files[i].name,
+            type: 'duration_warning',
+            original_duration: originalDuration,
+            recommended_duration: RECORDING_CONFIG.MAX_DURATION,
+            truncated: Boolean(data.was_truncated),
+          });
+        }
+      } catch (error) {
+        errors.push({ file_index: i, file_name: files[i].name, error: error.message });
+      }
+    }
+
+    return {
+      data: {
+        success: results.length > 0,
+        summary: {
+          total_files: files.length,
+          successful_uploads: results.length,
+          warnings: warnings.length,
+          errors: errors.length,
+        },
+        results,
+        warnings,
+        errors,
+      },
+    };
+  },
+  
   list: (params) => {
+    // params: list filters, cursor / page, page_size (up to 1000), and fields / omit, e.g. { fields: 'recording_id,duration' }
     return apiWithRetry(() => api.get('/recordings/list/', { 
       params,
       timeout: 10000 // Faster timeout for list requests
     }));
   },
   
-  detail: (recordingId) => {
-    return apiWithRetry(() => api.get(`/recordings/detail/${recordingId}/`));
+  detail: (recordingId, params = {}) => {
+    return apiWithRetry(() => api.get(`/recordings/detail/${recordingId}/`, {
+      params // { fields: 'recording_id,duration' } or { omit: 'canonical_file_url' }
+    }));
   },
   
-  userRecordings: () => {
-    return apiWithRetry(() => api.get('/recordings/my-recordings/'));
+  userRecordings: (params) => {
+    // params: { cursor } from the next/previous links, { count: 'approximate' | 'none' }, { page_size: 100 }
+    return apiWithRetry(() => api.get('/recordings/my-recordings/', { params }));
+  },
+  
+  peaks: (recordingId, resolution = 400) => {
+    return apiWithRetry(() => api.get(`/recordings/peaks/${recordingId}/`, {
+      params: { resolution }
+    }));
+  },
+  
+  similar: (recordingId, k = 20, exact = false) => {
+    return apiWithRetry(() => api.get(`/recordings/similar/${recordingId}/`, {
+      params: exact ? { k, exact: true } : { k }
+    }));
   },
   
   stats: () => {
     return apiWithRetry(() => api.get('/recordings/stats/'));
   },
   
+  statsDistribution: (params = {}) => {
+    return apiWithRetry(() => api.get('/recordings/stats/distribution/', {
+      params // { field: 'duration', bins: 20 }
+    }));
+  },
+  
+  statsTimeseries: (bucket = 'day', params = {}) => {
+    return apiWithRetry(() => api.get('/recordings/stats/timeseries/', {
+      params: { bucket, ...params } // from / to as ISO dates
+    }));
+  },
+  
   delete: (recordingId) => {
     return apiWithRetry(() => api.delete(`/recordings/delete/${recordingId}/`));
   },
   
-  exportCSV: () => {
+  exportCSV: (params = {}) => {
     return apiWithRetry(() => 
       api.get('/recordings/export-csv/', {
+        params, // list filters, e.g. { snr_db_min: 10, clipping_ratio_max: 0.001 }
         responseType: 'blob',
         timeout: 60000, // 1 minute for large exports
       })
     );
   },
   
-  exportHTML: () => {
+  exportHTML: (params = {}) => {
     return apiWithRetry(() => 
       api.get('/recordings/export-html/', {
+        params,
         responseType: 'blob',
         timeout: 60000,
       })
     );
   },
   
-  exportZIP: () => {
+  exportZIP: (params = {}) => {
     return apiWithRetry(() => 
       api.get('/recordings/export-zip/', {
+        params,
         responseType: 'blob',
         timeout: 120000, // 2 minutes for ZIP exports
       })
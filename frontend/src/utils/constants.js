@@ -13,6 +13,7 @@ export const API_CONFIG = {
 // File Upload Configuration
 export const FILE_CONFIG = {
   MAX_SIZE: 50 * 1024 * 1024, // 50MB
+  CHUNK_SIZE: 1024 * 1024, // 1MB per resumable upload request
   ALLOWED_FORMATS: ['wav', 'mp3', 'webm', 'ogg', 'm4a'],
   ALLOWED_MIME_TYPES: [
     'audio/wav', 'audio/wave', 'audio/x-wav',